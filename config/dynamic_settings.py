@@ -73,17 +73,42 @@ class DynamicSettings:
                 "allowed_extensions": [".srt"],
                 "cleanup_delay_minutes": 5,
                 "max_processing_time_minutes": 30,
-                "temp_file_retention_hours": 2
+                "temp_file_retention_hours": 2,
+                "checkpoint_retention_hours": 24,
+                "release_match_threshold": 0.5,
+                "release_retention_days": 30
             },
             
             # تنظیمات ترجمه
             "translation_settings": {
                 "default_model": "gpt-3.5-turbo",
+                "provider": "openai",
+                "fast_model": "gpt-4o-mini",
+                "complexity_threshold": 0.45,
                 "max_tokens": 4000,
                 "temperature": 0.3,
                 "batch_size": 10,
+                "min_batch_size": 4,
+                "max_batch_size": 40,
+                "target_p95_latency_seconds": 30,
+                "hedge_requests": False,
+                "hedge_budget_ratio": 0.05,
+                "max_concurrent_requests": 5,
                 "retry_attempts": 3,
-                "timeout_seconds": 60
+                "timeout_seconds": 60,
+                "max_connections": 20,
+                "max_keepalive_connections": 10,
+                "keepalive_expiry_seconds": 30,
+                "warm_up_timeout_seconds": 10,
+                "input_price_per_1k_tokens": 0.0005,
+                "output_price_per_1k_tokens": 0.0015,
+                "output_token_ratio": 1.5,
+                "memory_similarity_threshold": 0.9,
+                "memory_max_entries": 50000,
+                "memory_fuzzy_reuse": False,
+                "target_languages": [],
+                "bulk_poll_interval_seconds": 60,
+                "bulk_max_wait_hours": 24
             },
             
             # تنظیمات امنیتی
@@ -141,7 +166,11 @@ class DynamicSettings:
                 "max_concurrent_users": 100,
                 "max_queue_size": 1000,
                 "worker_threads": 4,
-                "memory_limit_mb": 512
+                "memory_limit_mb": 512,
+                "plan_priorities": {"yearly": 0, "monthly": 1, "free": 2},
+                "queue_aging_seconds": 120,
+                "plan_weights": {"yearly": 4, "monthly": 2, "free": 1},
+                "free_shed_ratio": 0.8
             }
         }
     
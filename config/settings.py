@@ -11,6 +11,7 @@ class Settings:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
     OPENAI_MAX_TOKENS = int(os.getenv('OPENAI_MAX_TOKENS', 4000))
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
     
     # Translation Settings
     TARGET_LANGUAGE = os.getenv('TARGET_LANGUAGE', 'Persian')
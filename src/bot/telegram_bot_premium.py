@@ -2,15 +2,16 @@ import logging
 import os
 import asyncio
 import time
-from typing import Dict, Any
-from telegram import Update, Document, InlineKeyboardButton, InlineKeyboardMarkup
+from typing import Dict, Any, Optional
+from telegram import Update, Document, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaDocument
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
 from telegram.constants import ParseMode
 import aiofiles
 
 from config import settings, get_dynamic_settings
-from ..services import TranslationService, UserService, AdminService
+from ..services import TranslationService, UserService, AdminService, TranslationJob
 from ..database import get_database
+from ..translation import PRIORITY_PREMIUM, PRIORITY_FREE, Deadline
 from ..utils import (
     InputValidator, ValidationError, handle_errors, 
     get_error_handler, DatabaseError, TranslationError,
@@ -53,7 +54,8 @@ class TelegramBotPremium:
         try:
             settings.validate()
             
-            self.application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+            # پردازش همزمان پیام‌ها تا لغو و پیش‌نمایش پشت ترجمه‌های طولانی منتظر نمانند
+            self.application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).concurrent_updates(True).build()
             
             # Add handlers
             self.application.add_handler(CommandHandler("start", self.start_command))
@@ -224,7 +226,7 @@ class TelegramBotPremium:
             reply_markup=reply_markup
         )
     
-    @handle_errors(ValidationError, FileProcessingError, TranslationError, reraise=False)
+    @handle_errors((ValidationError, FileProcessingError, TranslationError), reraise=False)
     async def handle_srt_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle SRT file uploads with subscription check"""
         try:
@@ -233,7 +235,7 @@ class TelegramBotPremium:
             user_id = validator.validate_user_id(update.effective_user.id)
             document: Document = update.message.document
             user_id = update.effective_user.id
-            start_time = time.time()
+            file_info = None
             
             # بررسی مجوز ترجمه
             permission = await self.user_service.check_translation_permission(user_id)
@@ -265,11 +267,13 @@ class TelegramBotPremium:
                     await update.message.reply_text(permission['message'])
                 return
             
-            # بررسی امکان آپلود
-            can_upload = await self.translation_service.can_user_upload(user_id)
+            # بررسی امکان آپلود (تا سقف فایل‌های همزمان طرح کاربر)
+            plan_type = permission.get('plan_type', permission['type'])
+            max_files = self.translation_service.get_max_concurrent_files(plan_type)
+            can_upload = await self.translation_service.can_user_upload(user_id, max_files)
             if not can_upload:
                 await update.message.reply_text(
-                    "⏳ شما در حال حاضر فایل دیگری در حال پردازش دارید.\n"
+                    f"⏳ شما در حال حاضر {max_files} فایل در حال پردازش دارید (حداکثر طرح شما).\n"
                     "لطفاً منتظر بمانید تا پردازش تکمیل شود یا از `/cleanup` استفاده کنید."
                 )
                 return
@@ -281,15 +285,28 @@ class TelegramBotPremium:
                 )
                 return
             
+            # کنترل پذیرش پیش از دانلود؛ در شلوغی اول کارهای رایگان رد می‌شوند
+            admission = self.translation_service.check_admission(user_id, plan_type)
+            if not admission['allowed']:
+                await update.message.reply_text(admission['message'])
+                return
+            
             # آماده‌سازی آپلود
             try:
                 file_info = await self.translation_service.prepare_file_upload(
-                    user_id, document.file_name, document.file_size
+                    user_id, document.file_name, document.file_size, max_files
                 )
             except Exception as e:
                 await update.message.reply_text(f"❌ {str(e)}")
                 return
             
+            # حالت انبوه (غیرفوری و ارزان‌تر) با نوشتن bulk در کپشن فایل
+            bulk = (
+                self.translation_service.dynamic_settings.is_feature_enabled('bulk_mode')
+                and (update.message.caption or '').strip().lower() in ('bulk', '/bulk', 'انبوه')
+            )
+            bulk_note = "\n📦 حالت انبوه: نتیجه ممکن است تا چند ساعت طول بکشد" if bulk else ""
+            
             # پیام شروع پردازش
             status_message = f"""
 📥 **شروع پردازش فایل**
@@ -297,31 +314,116 @@ class TelegramBotPremium:
 📄 نام: {document.file_name}
 📊 حجم: {document.file_size / 1024:.1f} کیلوبایت
 👤 نوع حساب: {permission['type'].upper()}
-🆔 شناسه: {file_info['file_id'][:8]}...
+🆔 شناسه: {file_info['file_id'][:8]}...{bulk_note}
 
 ⏳ در حال دانلود...
             """
             
+            file_id = file_info['file_id']
+            cancel_markup = InlineKeyboardMarkup([[
+                InlineKeyboardButton("⛔ لغو ترجمه", callback_data=f"cancel_job:{file_id}")
+            ]])
             status_msg = await update.message.reply_text(
                 status_message,
-                parse_mode=ParseMode.MARKDOWN
+                parse_mode=ParseMode.MARKDOWN,
+                reply_markup=cancel_markup
             )
             
             # دانلود فایل
-            await self.translation_service.file_manager.start_file_download(user_id)
+            await self.translation_service.file_manager.start_file_download(user_id, file_id)
             file = await context.bot.get_file(document.file_id)
             await file.download_to_drive(file_info['file_path'])
-            await self.translation_service.file_manager.complete_file_download(user_id)
+            await self.translation_service.file_manager.complete_file_download(user_id, file_id)
+            
+            # تخمین هزینه و زمان پیش از شروع ترجمه
+            estimate = await self.translation_service.estimate_user_file(user_id, file_info['file_path'], file_id)
+            if estimate:
+                status_message = status_message.replace(
+                    "⏳ در حال دانلود...",
+                    f"{self._format_estimate(estimate)}\n\n⏳ در حال دانلود..."
+                )
             
+            # ثبت کار در صف ترجمه؛ ترجمه و ارسال توسط کارگرهای صف انجام می‌شود
+            queue_reported = asyncio.Event()
+            
+            async def run_job():
+                await queue_reported.wait()
+                await self._run_translation_job(
+                    update, status_msg, status_message, cancel_markup, document,
+                    file_info['file_path'], file_id, permission, job.deadline
+                )
+            
+            async def on_cancel(reason: str):
+                # در پاکسازی، فایل‌ها توسط خود دستور پاک می‌شوند
+                if reason != 'user_cleanup':
+                    await self.translation_service.cleanup_user_data(user_id, file_id)
+                if reason == 'deadline':
+                    await update.message.reply_text(
+                        "⌛ به دلیل شلوغی، ترجمه این فایل در زمان مجاز پردازش ممکن نبود و شروع نشد.\n"
+                        "🔄 لطفاً کمی بعد دوباره ارسال کنید."
+                    )
+                else:
+                    await update.message.reply_text("⛔ ترجمه پیش از شروع لغو شد.")
+            
+            # مهلت کار از لحظه ثبت در صف؛ کار انبوه مهلت جداگانه خود را دارد
+            job = TranslationJob(
+                user_id, run_job, on_cancel, plan_type=plan_type, job_id=file_id,
+                deadline=None if bulk else self.translation_service.create_job_deadline(),
+                eta_seconds=estimate['eta_seconds'] if estimate else None
+            )
+            try:
+                position = await self.translation_service.enqueue_user_file(job, bulk)
+                queue_note = "📦 در انتظار پاسخ Batch API" if bulk else f"🕒 در صف ترجمه - نوبت شما: {position}"
+                await status_msg.edit_text(
+                    status_message.replace("⏳ در حال دانلود...", queue_note),
+                    parse_mode=ParseMode.MARKDOWN,
+                    reply_markup=cancel_markup
+                )
+            finally:
+                queue_reported.set()
+        
+        except Exception as e:
+            await self._report_job_failure(update, user_id, e, file_info['file_id'] if file_info else None)
+    
+    async def _run_translation_job(self, update: Update, status_msg, status_message: str,
+                                   cancel_markup: InlineKeyboardMarkup, document: Document, file_path: str,
+                                   file_id: str, permission: Dict[str, Any],
+                                   deadline: Optional[Deadline] = None):
+        """ترجمه و ارسال فایل کاربر (اجرا در کارگر صف ترجمه)"""
+        user_id = update.effective_user.id
+        start_time = time.time()
+        try:
             # بهروزرسانی وضعیت
             await status_msg.edit_text(
                 status_message.replace("⏳ در حال دانلود...", "🔄 در حال ترجمه..."),
-                parse_mode=ParseMode.MARKDOWN
+                parse_mode=ParseMode.MARKDOWN,
+                reply_markup=cancel_markup
             )
             
-            # پردازش فایل
-            output_file_path = await self.translation_service.process_user_file(
-                user_id, file_info['file_path']
+            # پردازش فایل با گزارش پیشرفت
+            progress_state = {'last_update': 0.0}
+            
+            async def report_progress(completed: int, total: int):
+                now = time.time()
+                if completed < total and now - progress_state['last_update'] < 3:
+                    return
+                progress_state['last_update'] = now
+                percent = completed * 100 // total if total else 100
+                await status_msg.edit_text(
+                    status_message.replace(
+                        "⏳ در حال دانلود...",
+                        f"🔄 در حال ترجمه... {completed}/{total} ({percent}%)"
+                    ),
+                    parse_mode=ParseMode.MARKDOWN,
+                    reply_markup=cancel_markup
+                )
+            
+            output_file_paths = await self.translation_service.process_user_file(
+                user_id, file_path, progress_callback=report_progress,
+                priority=PRIORITY_FREE if permission['type'] == 'free' else PRIORITY_PREMIUM,
+                plan_type=permission.get('plan_type', permission['type']),
+                file_id=file_id,
+                deadline=deadline
             )
             
             # ثبت استفاده
@@ -336,10 +438,19 @@ class TelegramBotPremium:
                 parse_mode=ParseMode.MARKDOWN
             )
             
-            async with aiofiles.open(output_file_path, 'rb') as f:
-                file_content = await f.read()
+            # خواندن همه خروجی‌ها (یک فایل برای هر زبان مقصد)
+            output_files = []
+            base_name, extension = os.path.splitext(document.file_name)
+            languages = self.translation_service.get_target_languages()
+            for output_file_path, language in zip(output_file_paths, languages):
+                async with aiofiles.open(output_file_path, 'rb') as f:
+                    file_content = await f.read()
             
-            output_filename = f"translated_{document.file_name}"
+                if len(output_file_paths) == 1:
+                    output_filename = f"translated_{document.file_name}"
+                else:
+                    output_filename = f"translated_{base_name}_{language.lower().replace(' ', '_')}{extension}"
+                output_files.append((file_content, output_filename))
             
             # پیام نهایی بر اساس نوع حساب
             if permission['type'] == 'free':
@@ -365,12 +476,25 @@ class TelegramBotPremium:
 🙏 از سرویس ما استفاده کردید، ممنون!
                 """
             
-            await update.message.reply_document(
-                document=file_content,
-                filename=output_filename,
-                caption=caption,
-                parse_mode=ParseMode.MARKDOWN
-            )
+            if len(output_files) == 1:
+                file_content, output_filename = output_files[0]
+                await update.message.reply_document(
+                    document=file_content,
+                    filename=output_filename,
+                    caption=caption,
+                    parse_mode=ParseMode.MARKDOWN
+                )
+            else:
+                # ارسال همه زبان‌ها با هم در یک گروه (کپشن روی آخرین فایل)
+                await update.message.reply_media_group(media=[
+                    InputMediaDocument(
+                        media=file_content,
+                        filename=output_filename,
+                        caption=caption if position == len(output_files) - 1 else None,
+                        parse_mode=ParseMode.MARKDOWN
+                    )
+                    for position, (file_content, output_filename) in enumerate(output_files)
+                ])
             
             # حذف پیام وضعیت
             try:
@@ -379,19 +503,44 @@ class TelegramBotPremium:
                 pass
             
         except Exception as e:
-            logger.error(f"File handling failed for user {user_id}: {str(e)}")
-            
-            # پاکسازی در صورت خطا
-            try:
-                await self.translation_service.cleanup_user_data(user_id)
-            except:
-                pass
-            
+            await self._report_job_failure(update, user_id, e, file_id)
+            # صف نتیجه کار را برای آمار و یادگیری زمان اجرا لازم دارد
+            raise
+    
+    async def _report_job_failure(self, update: Update, user_id: int, e: Exception, file_id: Optional[str] = None):
+        """پاکسازی و اطلاع‌رسانی خطای کار ترجمه به کاربر"""
+        logger.error(f"File handling failed for user {user_id}: {str(e)}")
+        
+        # پاکسازی همین کار در صورت خطا (کارهای دیگر کاربر ادامه می‌یابند)
+        try:
+            if file_id:
+                await self.translation_service.cleanup_user_data(user_id, file_id)
+        except:
+            pass
+        
+        if getattr(e, 'error_code', None) == 'TRANSLATION_CANCELLED':
             await update.message.reply_text(
-                f"❌ خطا در پردازش فایل: {str(e)}\n\n"
-                "🔄 لطفاً دوباره تلاش کنید.\n"
-                "📞 در صورت تکرار مشکل، با پشتیبانی تماس بگیرید."
+                "⛔ ترجمه لغو شد.\n"
+                "💾 بخش ترجمه شده ذخیره شد؛ با ارسال دوباره همین فایل، ترجمه ادامه می‌یابد."
             )
+            return
+        
+        if getattr(e, 'error_code', None) == 'DEADLINE_INFEASIBLE':
+            await update.message.reply_text(f"⌛ {str(e)}")
+            return
+        
+        resumable = getattr(e, 'details', {}).get('resumable_subtitles', 0)
+        resume_hint = (
+            f"💾 {resumable} خط ترجمه شده ذخیره شد؛ با ارسال دوباره همین فایل، ترجمه ادامه می‌یابد.\n"
+            if resumable else ""
+        )
+        
+        await update.message.reply_text(
+            f"❌ خطا در پردازش فایل: {str(e)}\n\n"
+            f"{resume_hint}"
+            "🔄 لطفاً دوباره تلاش کنید.\n"
+            "📞 در صورت تکرار مشکل، با پشتیبانی تماس بگیرید."
+        )
     
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle inline keyboard callbacks"""
@@ -422,6 +571,13 @@ class TelegramBotPremium:
                     parse_mode=ParseMode.MARKDOWN
                 )
         
+        elif data == "cancel_job" or data.startswith("cancel_job:"):
+            file_id = data.split(":", 1)[1] if ":" in data else None
+            if await self.translation_service.cancel_user_job(user_id, file_id=file_id):
+                await query.edit_message_text("⛔ در حال لغو ترجمه...")
+            else:
+                await query.edit_message_text("ℹ️ کاری برای لغو وجود ندارد.")
+        
         elif data == "refresh_profile":
             # بهروزرسانی پروفایل
             await self.profile_command(update, context)
@@ -466,6 +622,13 @@ class TelegramBotPremium:
             return
         
         stats = await self.admin_service.get_system_stats()
+        queue_stats = self.translation_service.job_queue.get_stats()
+        admission_stats = self.translation_service.admission.get_stats()
+        tier_lines = "\n".join(
+            f"• {self._get_plan_name(plan)}: {tier['queued']} در انتظار، "
+            f"میانگین انتظار {tier['avg_wait_seconds']:.1f} ثانیه"
+            for plan, tier in queue_stats['tiers'].items()
+        )
         
         stats_message = f"""
 📊 **آمار سیستم**
@@ -481,6 +644,18 @@ class TelegramBotPremium:
 
 **درآمد:**
 • کل: {stats['revenue']['total']:,} تومان
+
+**صف ترجمه:**
+• در حال اجرا: {queue_stats['running']}/{queue_stats['workers']}
+• در انتظار: {queue_stats['queued']}
+• میانگین انتظار: {queue_stats['avg_wait_seconds']:.1f} ثانیه
+• تکمیل شده: {queue_stats['completed']} | ناموفق: {queue_stats['failed']} | لغو شده: {queue_stats['cancelled']}
+• حذف شده به دلیل مهلت: {queue_stats['expired']} | ضریب خطای تخمین: {queue_stats['eta_scale']:.2f}
+{tier_lines}
+
+**بار سیستم:**
+• صف: {admission_stats['queue_load']:.0%} | کاربران: {admission_stats['users_load']:.0%} | حافظه: {admission_stats['memory_load']:.0%}
+• پذیرفته: {admission_stats['admitted']} | رد شده: {admission_stats['rejected']}
         """
         
         await update.message.reply_text(
@@ -554,6 +729,16 @@ class TelegramBotPremium:
             await update.message.reply_text("❌ شناسه کاربر نامعتبر.")
     
     # Helper methods
+    def _format_estimate(self, estimate: Dict[str, Any]) -> str:
+        """قالب‌بندی تخمین کار برای نمایش به کاربر"""
+        eta = estimate['eta_seconds']
+        eta_text = f"{eta:.0f} ثانیه" if eta < 60 else f"{eta / 60:.1f} دقیقه"
+        return (
+            f"🧮 تخمین: {estimate['requests']} درخواست، حدود {estimate['total_tokens']:,} توکن "
+            f"(${estimate['estimated_cost_usd']:.4f})\n"
+            f"⏱️ زمان تخمینی ترجمه: {eta_text}"
+        )
+    
     def _get_role_emoji(self, role: str) -> str:
         """دریافت ایموجی نقش"""
         emojis = {
@@ -575,6 +760,7 @@ class TelegramBotPremium:
     def _get_plan_name(self, plan_type: str) -> str:
         """دریافت نام طرح اشتراک"""
         names = {
+            'free': 'رایگان',
             'monthly': 'ماهانه',
             'yearly': 'سالانه'
         }
@@ -622,20 +808,21 @@ class TelegramBotPremium:
         try:
             user_id = update.effective_user.id
             
-            # دریافت وضعیت کاربر
-            user_file_info = await self.translation_service.file_manager.get_user_file_info(user_id)
-            can_upload = await self.translation_service.can_user_upload(user_id)
+            # دریافت وضعیت کاربر (همه کارهای همزمان)
+            user_files = await self.translation_service.file_manager.get_user_files(user_id)
             permission = await self.user_service.check_translation_permission(user_id)
+            max_files = self.translation_service.get_max_concurrent_files(permission.get('plan_type', permission.get('type')))
+            can_upload = await self.translation_service.can_user_upload(user_id, max_files)
             
-            if user_file_info:
+            if user_files:
+                active_count = self.translation_service.file_manager.count_active_files(user_id)
+                file_sections = "\n\n".join(self._format_file_status(user_id, file_info) for file_info in user_files)
                 status_message = f"""
-📊 **وضعیت فایل فعلی:**
+📊 **وضعیت فایل‌های شما ({active_count}/{max_files} همزمان):**
 
-**فایل:** {user_file_info['original_filename']}
-**وضعیت:** {user_file_info['status']}
-**حجم:** {user_file_info['file_size'] / 1024:.1f} کیلوبایت
-**زمان ایجاد:** {user_file_info['created_at'].strftime('%H:%M:%S')}
+{file_sections}
 
+**آماده آپلود:** {'✅ بله' if can_upload else '❌ خیر'}
 **مجوز ترجمه:** {'✅ دارد' if permission['allowed'] else '❌ ندارد'}
 **نوع حساب:** {permission.get('type', 'نامشخص').upper()}
                 """
@@ -661,6 +848,21 @@ class TelegramBotPremium:
                 f"❌ خطا در دریافت وضعیت: {str(e)}"
             )
     
+    def _format_file_status(self, user_id: int, file_info: Dict[str, Any]) -> str:
+        """وضعیت یک کار کاربر برای دستور /status"""
+        queue_position = self.translation_service.job_queue.position(user_id, file_info['file_id'])
+        lines = [
+            f"**فایل:** {file_info['original_filename']}",
+            f"**وضعیت:** {file_info['status']}",
+            f"**حجم:** {file_info['file_size'] / 1024:.1f} کیلوبایت",
+            f"**زمان ایجاد:** {file_info['created_at'].strftime('%H:%M:%S')}"
+        ]
+        if queue_position:
+            lines.append(f"**نوبت در صف:** {queue_position}")
+        if file_info.get('estimate'):
+            lines.append(self._format_estimate(file_info['estimate']))
+        return "\n".join(lines)
+    
     async def cleanup_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /cleanup command"""
         try:
@@ -735,6 +937,11 @@ class TelegramBotPremium:
         try:
             logger.info("Starting premium Telegram bot...")
             await self.application.initialize()
+            
+            # آماده‌سازی اتصال‌ها و کش پیش از دریافت اولین پیام
+            await self.translation_service.warm_up()
+            self.translation_service.job_queue.start()
+            
             await self.application.start()
             await self.application.updater.start_polling()
             
@@ -749,6 +956,7 @@ class TelegramBotPremium:
             logger.error(f"Bot runtime error: {str(e)}")
         finally:
             await self.application.stop()
+            await self.translation_service.shutdown()
     
     def run(self):
         """Run the bot (synchronous wrapper)"""
@@ -1,4 +1,7 @@
 from .translation_service import TranslationService
 from .user_service import UserService, AdminService
+from .job_queue import TranslationJob, TranslationJobQueue
+from .admission import AdmissionController
 
-__all__ = ['TranslationService', 'UserService', 'AdminService']
\ No newline at end of file
+__all__ = ['TranslationService', 'UserService', 'AdminService', 'TranslationJob', 'TranslationJobQueue',
+           'AdmissionController']
\ No newline at end of file
@@ -0,0 +1,137 @@
+import logging
+import math
+import os
+from typing import Dict, Any, Optional
+
+from .job_queue import TranslationJobQueue
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - ویندوز
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+def current_rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB, or None where it cannot be read"""
+    try:
+        # /proc مقدار فعلی را می‌دهد؛ ru_maxrss فقط بیشینه تاکنون است
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # لینوکس کیلوبایت و macOS بایت گزارش می‌دهد
+    return peak / (1024 * 1024) if peak > 1 << 30 else peak / 1024
+
+class AdmissionController:
+    """
+    Decides whether a new upload may enter the translation queue
+
+    Load is measured on three axes against ``performance_settings``: jobs
+    waiting in the queue (``max_queue_size``), users with a job in flight
+    (``max_concurrent_users``) and process RSS (``memory_limit_mb``). The
+    lowest subscription tier is turned away once any axis passes
+    ``free_shed_ratio`` of its limit; paying plans only at the limit itself.
+    A refused upload is never downloaded, and the user is told roughly how
+    long to wait before trying again.
+    """
+    
+    def __init__(self, job_queue: TranslationJobQueue, file_manager, max_concurrent_users: int = 100,
+                 memory_limit_mb: Optional[float] = 512, free_shed_ratio: float = 0.8):
+        self.job_queue = job_queue
+        self.file_manager = file_manager
+        self.max_concurrent_users = max(1, max_concurrent_users)
+        self.memory_limit_mb = memory_limit_mb
+        self.free_shed_ratio = min(max(free_shed_ratio, 0.0), 1.0)
+        self.stats = {'admitted': 0, 'rejected': 0}
+        self.rejections: Dict[str, int] = {}
+    
+    def _active_users(self, user_id: Optional[int] = None) -> int:
+        """Users with a job in flight, plus the caller when they have none yet"""
+        active = sum(1 for uid in list(self.file_manager.active_files)
+                     if self.file_manager.count_active_files(uid))
+        if user_id is not None and not self.file_manager.count_active_files(user_id):
+            active += 1
+        return active
+    
+    def load(self, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Usage of each limit as a fraction (1.0 means exactly at the limit)
+
+        With ``user_id`` the load is measured as if that user's upload had
+        already been queued.
+        """
+        incoming = 0 if user_id is None else 1
+        rss_mb = current_rss_mb()
+        return {
+            'queue': (self.job_queue.queued + incoming) / self.job_queue.max_size,
+            'users': self._active_users(user_id) / self.max_concurrent_users,
+            'memory': rss_mb / self.memory_limit_mb if rss_mb is not None and self.memory_limit_mb else 0.0,
+            'rss_mb': round(rss_mb, 1) if rss_mb is not None else None
+        }
+    
+    def _retry_after(self, reason: str, user_id: int, limit: float) -> float:
+        """Estimated seconds until the saturated axis drops back under ``limit``"""
+        if reason == 'queue':
+            excess = self.job_queue.queued + 1 - math.floor(limit * self.job_queue.max_size)
+        elif reason == 'users':
+            excess = self._active_users(user_id) - math.floor(limit * self.max_concurrent_users)
+        else:
+            # حافظه با پایان کارهای در حال اجرا آزاد می‌شود
+            excess = self.job_queue.workers
+        return self.job_queue.estimate_wait(max(1, excess))
+    
+    def check(self, user_id: int, plan_type: Optional[str] = 'free') -> Dict[str, Any]:
+        """
+        Admission decision for a new upload
+
+        Returns:
+            ``allowed`` with, when refused, ``reason`` (queue, users or memory),
+            ``retry_after_seconds`` and a message for the user
+        """
+        # طرح ناشناخته مانند پایین‌ترین طرح رفتار می‌شود
+        shed = plan_type not in self.job_queue.plan_priorities or plan_type == self.job_queue.lowest_plan
+        limit = self.free_shed_ratio if shed else 1.0
+        load = self.load(user_id)
+        
+        saturated = [axis for axis in ('memory', 'queue', 'users') if load[axis] > limit]
+        if not saturated:
+            self.stats['admitted'] += 1
+            return {'allowed': True, 'load': load}
+        
+        reason = saturated[0]
+        retry_after = self._retry_after(reason, user_id, limit)
+        self.stats['rejected'] += 1
+        key = f"{reason}:{'shed' if shed and load[reason] <= 1.0 else 'full'}"
+        self.rejections[key] = self.rejections.get(key, 0) + 1
+        logger.warning(f"Upload of user {user_id} ({plan_type}) refused on {reason} load "
+                       f"{load[reason]:.2f} (limit {limit:.2f}), retry in ~{retry_after:.0f}s")
+        
+        minutes = max(1, math.ceil(retry_after / 60))
+        message = f"⏳ سرویس در حال حاضر شلوغ است. لطفاً حدود {minutes} دقیقه دیگر دوباره فایل را ارسال کنید."
+        if shed and load[reason] <= 1.0:
+            message += "\n💎 کاربران دارای اشتراک در زمان شلوغی همچنان پذیرفته می‌شوند."
+        return {
+            'allowed': False,
+            'reason': reason,
+            'retry_after_seconds': round(retry_after),
+            'message': message,
+            'load': load
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Current load and admission outcomes"""
+        load = self.load()
+        return {
+            'queue_load': round(load['queue'], 3),
+            'users_load': round(load['users'], 3),
+            'memory_load': round(load['memory'], 3),
+            'rss_mb': load['rss_mb'],
+            'admitted': self.stats['admitted'],
+            'rejected': self.stats['rejected'],
+            'rejections': dict(self.rejections)
+        }
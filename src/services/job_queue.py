@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, List, Tuple
+
+from ..translation import Deadline
+from ..utils import TranslationError, CancellationError
+
+logger = logging.getLogger(__name__)
+
+class TranslationJob:
+    """
+    One queued translation job
+
+    ``run`` does the whole job (translate and deliver) and reports its own
+    errors to the user, then re-raises them so the queue records the
+    outcome and learns run times only from successful jobs. ``on_cancel``
+    is awaited instead when the job is cancelled while still waiting in the
+    queue. ``deadline`` starts at submission
+    and ``eta_seconds`` is the estimator's prediction of the run time.
+    """
+    
+    def __init__(self, user_id: int, run: Callable[[], Awaitable[Any]],
+                 on_cancel: Optional[Callable[[str], Awaitable[Any]]] = None,
+                 plan_type: str = 'free', job_id: Optional[str] = None,
+                 deadline: Optional[Deadline] = None, eta_seconds: Optional[float] = None):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.user_id = user_id
+        self.run = run
+        self.on_cancel = on_cancel
+        self.plan_type = plan_type
+        self.deadline = deadline
+        self.eta_seconds = eta_seconds
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+
+# ترتیب پیش‌فرض طرح‌ها (عدد کمتر یعنی اولویت بالاتر)
+DEFAULT_PLAN_PRIORITIES = {'yearly': 0, 'monthly': 1, 'free': 2}
+
+class TranslationJobQueue:
+    """
+    Bounded priority queue of translation jobs served by a fixed pool of workers
+
+    Update handlers only validate and download the upload, then submit a
+    job and return its queue position. At most ``workers`` jobs translate
+    at once whatever the update concurrency of the bot, and at most
+    ``max_size`` jobs wait; further submissions are refused.
+
+    Waiting jobs are kept in one FIFO per subscription plan. A free worker
+    takes the job with the best effective priority: the plan's rank minus
+    one level for every ``aging_seconds`` the job has waited, so a free
+    trial is eventually served even while paying users keep arriving.
+
+    Jobs with a deadline are scheduled by slack: time left minus predicted
+    run time, where the prediction is the job's estimate scaled by how long
+    finished jobs actually took against their own estimates. A job whose
+    slack is below ``urgent_seconds`` jumps the plan order (least slack
+    first), so jobs with plenty of slack never push it past its deadline.
+    A job that cannot finish in time even if started at once is refused on
+    submission, and one whose slack runs out while waiting is dropped
+    instead of being started.
+
+    Work that waits for hours without using translator slots (a Batch API
+    submission) is parked: it runs as its own task and the job joins the
+    queue only once that wait is over, so it never holds a worker.
+    """
+    
+    def __init__(self, workers: int = 4, max_size: int = 1000,
+                 plan_priorities: Optional[Dict[str, int]] = None, aging_seconds: float = 120.0,
+                 urgent_seconds: Optional[float] = None):
+        self.workers = max(1, workers)
+        self.max_size = max(1, max_size)
+        self.plan_priorities = dict(plan_priorities or DEFAULT_PLAN_PRIORITIES)
+        self.aging_seconds = aging_seconds
+        self.urgent_seconds = urgent_seconds
+        self.lowest_plan = max(self.plan_priorities, key=self.plan_priorities.get)
+        self._pending: Dict[str, deque] = {plan: deque() for plan in self.plan_priorities}
+        self._running: Dict[str, TranslationJob] = {}
+        self._parked: Dict[str, Tuple[TranslationJob, asyncio.Task]] = {}
+        self._available: Optional[asyncio.Condition] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'cancelled': 0, 'rejected': 0, 'expired': 0}
+        self.served = {plan: 0 for plan in self.plan_priorities}
+        self.wait_seconds = {plan: 0.0 for plan in self.plan_priorities}
+        self.run_seconds = 0.0
+        self.runs = 0
+        # نسبت زمان واقعی اجرا به تخمین (میانگین نمایی کارهای اخیر)
+        self.eta_scale = 1.0
+    
+    def start(self):
+        """Start the worker pool inside the running event loop"""
+        if self._worker_tasks:
+            return
+        self._available = asyncio.Condition()
+        self._worker_tasks = [asyncio.create_task(self._worker(number)) for number in range(self.workers)]
+        logger.info(f"Translation job queue started with {self.workers} workers")
+    
+    async def stop(self):
+        """Stop the workers; running and parked jobs are cancelled"""
+        tasks = self._worker_tasks + [task for _, task in self._parked.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._parked.clear()
+    
+    def _tier(self, job: TranslationJob) -> str:
+        # طرح ناشناخته با پایین‌ترین اولویت صف می‌شود
+        return job.plan_type if job.plan_type in self.plan_priorities else self.lowest_plan
+    
+    def predicted_run_seconds(self, job: TranslationJob) -> float:
+        """Run time of a job from its estimate corrected by the live estimate error"""
+        return (job.eta_seconds or 0.0) * self.eta_scale
+    
+    def slack(self, job: TranslationJob) -> Optional[float]:
+        """Seconds the job can still wait and finish in time, None without a deadline"""
+        remaining = job.deadline.remaining() if job.deadline else None
+        if remaining is None:
+            return None
+        return remaining - self.predicted_run_seconds(job)
+    
+    def _effective_priority(self, job: TranslationJob, now: float) -> Tuple[int, float, float]:
+        slack = self.slack(job)
+        urgent = self.urgent_seconds if self.urgent_seconds is not None else (self.avg_run_seconds or 60.0)
+        if slack is not None and slack < urgent:
+            # کار در خطر از دست دادن مهلت: کمترین زمان آزاد اول
+            return 0, slack, job.enqueued_at
+        rank = self.plan_priorities[self._tier(job)]
+        if self.aging_seconds:
+            rank -= (now - job.enqueued_at) / self.aging_seconds
+        return 1, rank, job.enqueued_at
+    
+    def _waiting(self) -> List[TranslationJob]:
+        return [job for jobs in self._pending.values() for job in jobs]
+    
+    def _serving_order(self) -> List[TranslationJob]:
+        """Waiting jobs in the order workers would take them now"""
+        now = time.monotonic()
+        return sorted(self._waiting(), key=lambda job: self._effective_priority(job, now))
+    
+    @property
+    def queued(self) -> int:
+        return sum(len(jobs) for jobs in self._pending.values())
+    
+    async def submit(self, job: TranslationJob) -> int:
+        """
+        Queue a job
+
+        Returns:
+            1-based position among waiting jobs
+
+        Raises:
+            TranslationError: QUEUE_FULL when max_size jobs are already waiting,
+                DEADLINE_INFEASIBLE when the job cannot finish in time even if started now
+        """
+        self.start()
+        if self.queued >= self.max_size:
+            self.stats['rejected'] += 1
+            raise TranslationError("صف ترجمه پر است، لطفاً کمی بعد دوباره تلاش کنید", "QUEUE_FULL",
+                                   {'queued_jobs': self.queued})
+        
+        slack = self.slack(job)
+        if slack is not None and slack < 0:
+            self.stats['rejected'] += 1
+            raise TranslationError(
+                "ترجمه این فایل در زمان مجاز پردازش به پایان نمی‌رسد؛ لطفاً فایل کوچک‌تری ارسال کنید",
+                "DEADLINE_INFEASIBLE",
+                {'predicted_seconds': round(self.predicted_run_seconds(job)),
+                 'deadline_seconds': round(job.deadline.remaining())}
+            )
+        
+        async with self._available:
+            self._pending[self._tier(job)].append(job)
+            self.stats['submitted'] += 1
+            self._available.notify()
+        
+        position = self._serving_order().index(job) + 1
+        logger.info(f"Queued {job.plan_type} translation job {job.job_id} for user {job.user_id} "
+                    f"at position {position}")
+        return position
+    
+    def park(self, job: TranslationJob, prepare: Callable[[], Awaitable[Any]]):
+        """Run ``prepare`` outside the worker pool, then submit the job"""
+        self.start()
+        self._parked[job.job_id] = (job, asyncio.create_task(self._run_parked(job, prepare)))
+        logger.info(f"Parked {job.plan_type} translation job {job.job_id} for user {job.user_id}")
+    
+    async def _run_parked(self, job: TranslationJob, prepare: Callable[[], Awaitable[Any]]):
+        try:
+            await prepare()
+        except CancellationError:
+            return
+        except Exception as e:
+            # کار با ترجمه آنلاین ادامه می‌یابد
+            logger.warning(f"Preparation of job {job.job_id} failed: {str(e)}")
+        finally:
+            self._parked.pop(job.job_id, None)
+        
+        job.enqueued_at = time.monotonic()
+        try:
+            await self.submit(job)
+        except TranslationError as e:
+            logger.error(f"Parked job {job.job_id} could not be queued: {str(e)}")
+            if job.on_cancel:
+                await self._notify_cancel(job, e.error_code or 'rejected')
+    
+    @property
+    def parked(self) -> int:
+        return len(self._parked)
+    
+    @staticmethod
+    def _matches(job: TranslationJob, user_id: int, job_id: Optional[str]) -> bool:
+        return job.user_id == user_id and (job_id is None or job.job_id == job_id)
+    
+    def position(self, user_id: int, job_id: Optional[str] = None) -> Optional[int]:
+        """
+        Position of a waiting job in serving order
+
+        Without ``job_id`` the user's first waiting job is used. Returns 0
+        while the job is running and None when it is not queued at all.
+        """
+        for position, job in enumerate(self._serving_order(), 1):
+            if self._matches(job, user_id, job_id):
+                return position
+        if any(self._matches(job, user_id, job_id) for job in self._running.values()):
+            return 0
+        return None
+    
+    def cancel(self, user_id: int, reason: str = 'user', job_id: Optional[str] = None) -> bool:
+        """Drop the user's waiting and parked jobs (or just ``job_id``) and notify each of them; running jobs are left alone"""
+        cancelled = [job for job in self._waiting() if self._matches(job, user_id, job_id)]
+        for job in cancelled:
+            self._pending[self._tier(job)].remove(job)
+        for parked_id, (job, task) in list(self._parked.items()):
+            if self._matches(job, user_id, job_id):
+                task.cancel()
+                del self._parked[parked_id]
+                cancelled.append(job)
+        
+        for job in cancelled:
+            self.stats['cancelled'] += 1
+            if job.on_cancel:
+                asyncio.create_task(self._notify_cancel(job, reason))
+        
+        if cancelled:
+            logger.info(f"Removed {len(cancelled)} queued jobs of user {user_id} ({reason})")
+        return bool(cancelled)
+    
+    async def _notify_cancel(self, job: TranslationJob, reason: str):
+        try:
+            await job.on_cancel(reason)
+        except Exception as e:
+            logger.error(f"Cancel handler of job {job.job_id} failed: {str(e)}")
+    
+    def _drop_expired(self):
+        """Drop waiting jobs that can no longer finish before their deadline"""
+        for job in self._waiting():
+            slack = self.slack(job)
+            if slack is not None and slack < 0:
+                self._pending[self._tier(job)].remove(job)
+                self.stats['expired'] += 1
+                logger.warning(f"Dropped job {job.job_id} of user {job.user_id}: deadline can no longer be met")
+                if job.on_cancel:
+                    asyncio.create_task(self._notify_cancel(job, 'deadline'))
+    
+    def _pop_next(self) -> Optional[TranslationJob]:
+        self._drop_expired()
+        # کار فوری ممکن است وسط صف طرح خود باشد، پس همه کارهای منتظر مقایسه می‌شوند
+        now = time.monotonic()
+        waiting = self._waiting()
+        if not waiting:
+            return None
+        job = min(waiting, key=lambda candidate: self._effective_priority(candidate, now))
+        self._pending[self._tier(job)].remove(job)
+        return job
+    
+    async def _next_job(self) -> TranslationJob:
+        async with self._available:
+            while True:
+                await self._available.wait_for(lambda: self.queued > 0)
+                job = self._pop_next()
+                if job:
+                    return job
+    
+    async def _worker(self, number: int):
+        while True:
+            job = await self._next_job()
+            job.started_at = time.monotonic()
+            tier = self._tier(job)
+            self.served[tier] += 1
+            self.wait_seconds[tier] += job.started_at - job.enqueued_at
+            self._running[job.job_id] = job
+            try:
+                await job.run()
+                self.stats['completed'] += 1
+                self._learn_eta(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # خطای کار نباید کارگر را متوقف کند
+                if self._is_cancellation(e):
+                    self.stats['cancelled'] += 1
+                    logger.info(f"Translation job {job.job_id} cancelled while running in worker {number}")
+                else:
+                    self.stats['failed'] += 1
+                    logger.error(f"Translation job {job.job_id} failed in worker {number}: {str(e)}")
+            finally:
+                self.run_seconds += time.monotonic() - job.started_at
+                self.runs += 1
+                self._running.pop(job.job_id, None)
+    
+    @staticmethod
+    def _is_cancellation(error: Exception) -> bool:
+        """Whether a job ended because the user cancelled it rather than by failing"""
+        return isinstance(error, CancellationError) or getattr(error, 'error_code', None) == 'TRANSLATION_CANCELLED'
+    
+    def _learn_eta(self, job: TranslationJob):
+        """Fold the run time of a successful job into ``eta_scale``"""
+        if not job.eta_seconds:
+            return
+        ratio = (time.monotonic() - job.started_at) / job.eta_seconds
+        self.eta_scale = min(10.0, max(0.25, 0.7 * self.eta_scale + 0.3 * ratio))
+    
+    @property
+    def avg_run_seconds(self) -> Optional[float]:
+        """Mean run time of finished jobs, or None before the first one"""
+        return self.run_seconds / self.runs if self.runs else None
+    
+    def estimate_wait(self, position: int, default_run_seconds: float = 60.0) -> float:
+        """Rough seconds until the job at ``position`` starts, from the mean run time so far"""
+        run_seconds = self.avg_run_seconds or default_run_seconds
+        if position <= 0:
+            return 0.0
+        # هر دور، همه کارگرها یک کار را تمام می‌کنند
+        return -(-position // self.workers) * run_seconds
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool size, queue depth and job outcomes, overall and per plan"""
+        now = time.monotonic()
+        served = sum(self.served.values())
+        tiers = {}
+        for plan, jobs in self._pending.items():
+            tiers[plan] = {
+                'queued': len(jobs),
+                'oldest_wait_seconds': round(now - jobs[0].enqueued_at, 3) if jobs else 0.0,
+                'served': self.served[plan],
+                'avg_wait_seconds': round(self.wait_seconds[plan] / self.served[plan], 3) if self.served[plan] else 0.0
+            }
+        return {
+            'workers': self.workers,
+            'running': len(self._running),
+            'queued': self.queued,
+            'parked': self.parked,
+            'max_size': self.max_size,
+            'submitted': self.stats['submitted'],
+            'completed': self.stats['completed'],
+            'failed': self.stats['failed'],
+            'cancelled': self.stats['cancelled'],
+            'rejected': self.stats['rejected'],
+            'expired': self.stats['expired'],
+            'eta_scale': round(self.eta_scale, 3),
+            'avg_wait_seconds': round(sum(self.wait_seconds.values()) / served, 3) if served else 0.0,
+            'avg_run_seconds': round(self.avg_run_seconds or 0.0, 3),
+            'tiers': tiers
+        }
\ No newline at end of file
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple
+
+from ..subtitle import SRTParser, MarkupTokenizer, LineClassifier
+from ..translation import BaseTranslator, Deadline, JobFlow, PRIORITY_PREMIUM
+from ..utils.checkpoint_manager import JobCheckpoint
+
+logger = logging.getLogger(__name__)
+
+_END = object()  # نشانگر پایان صف
+
+class PipelineTarget:
+    """One output language of a pipeline run with its own checkpoint and markup handling"""
+    
+    def __init__(self, language: str, output_path: str, checkpoint: Optional[JobCheckpoint] = None,
+                 tokenizer: Optional[MarkupTokenizer] = None):
+        self.language = language
+        self.output_path = output_path
+        self.checkpoint = checkpoint
+        self.tokenizer = tokenizer or MarkupTokenizer(LineClassifier(language))
+        self.stats = {'total_subtitles': 0, 'total_duration_ms': 0, 'batches': 0,
+                      'resumed_subtitles': 0, 'skipped_subtitles': 0}
+
+class TranslationPipeline:
+    """
+    Staged parse → translate → write pipeline for a single subtitle file
+
+    Parsing, batch translation and output writing run concurrently and are
+    connected by bounded queues. A window semaphore caps the number of
+    batches that are parsed but not yet written, so memory stays
+    proportional to the in-flight window instead of the file size.
+    
+    Without a fixed ``batch_size`` every batch is cut at the translator's
+    current (adaptively tuned) batch size.
+    
+    When a checkpoint is given, cues it already holds are reused and every
+    newly translated batch is recorded as soon as it completes. Formatting
+    tags are lifted out before translation and markup-only or sound-effect
+    cues are written unchanged. A ``deadline`` bounds every translation
+    request, so a job that runs out of time fails with its completed
+    batches already checkpointed. With a ``flow`` the job's batches share
+    the translator's request slots fairly with other running jobs.
+    
+    ``run_targets`` translates the file into several languages at once: the
+    file is parsed and cut into batches a single time and every batch is
+    translated into all targets concurrently, each target writing its own
+    output file.
+    """
+    
+    def __init__(self, srt_parser: SRTParser, translator: BaseTranslator, target_language: str,
+                 batch_size: Optional[int] = None, window_batches: int = None,
+                 checkpoint: Optional[JobCheckpoint] = None,
+                 tokenizer: Optional[MarkupTokenizer] = None,
+                 priority: int = PRIORITY_PREMIUM, deadline: Optional[Deadline] = None,
+                 flow: Optional[JobFlow] = None):
+        self.srt_parser = srt_parser
+        self.checkpoint = checkpoint
+        self.tokenizer = tokenizer or MarkupTokenizer(LineClassifier(target_language))
+        self.translator = translator
+        self.target_language = target_language
+        self.priority = priority
+        self.deadline = deadline
+        self.flow = flow
+        self.batch_size = max(1, batch_size) if batch_size else None
+        self.workers = max(1, getattr(translator, 'max_concurrency', 5))
+        self.window_batches = max(self.workers, window_batches or self.workers * 2)
+    
+    async def run(self, input_path: str, output_path: str,
+                  progress_callback: Optional[Callable[[int], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """
+        Translate input_path into output_path progressively
+
+        Args:
+            input_path: Path to the source SRT file
+            output_path: Path of the translated SRT file
+            progress_callback: Awaitable called with the number of written cues
+
+        Returns:
+            Summary statistics of the written file
+        """
+        target = PipelineTarget(self.target_language, output_path, self.checkpoint, self.tokenizer)
+        results = await self.run_targets(input_path, [target], progress_callback)
+        return results[self.target_language]
+    
+    async def run_targets(self, input_path: str, targets: List[PipelineTarget],
+                          progress_callback: Optional[Callable[[int], Awaitable[None]]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Translate input_path into every target language from a single parse
+
+        Args:
+            input_path: Path to the source SRT file
+            targets: Output languages with their paths and checkpoints
+            progress_callback: Awaitable called with the number of cues written to every output
+
+        Returns:
+            Summary statistics per target language
+        """
+        # مترجم تا پایان کار باز می‌ماند، حتی اگر در این میان جایگزین شود
+        async with self.translator.in_use():
+            return await self._run_targets(input_path, targets, progress_callback)
+    
+    async def _run_targets(self, input_path: str, targets: List[PipelineTarget],
+                           progress_callback: Optional[Callable[[int], Awaitable[None]]]) -> Dict[str, Dict[str, Any]]:
+        window = asyncio.Semaphore(self.window_batches)
+        parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers)
+        translated_queues = [asyncio.Queue(maxsize=self.workers) for _ in targets]
+        
+        # یک دسته پس از نوشته شدن در همه خروجی‌ها از پنجره آزاد می‌شود
+        unwritten: Dict[int, int] = {}
+        progress = {'reported': 0}
+        
+        async def on_written(sequence: int):
+            unwritten[sequence] = unwritten.get(sequence, len(targets)) - 1
+            if unwritten[sequence]:
+                return
+            del unwritten[sequence]
+            window.release()
+            
+            written = min(target.stats['total_subtitles'] for target in targets)
+            if progress_callback and written > progress['reported']:
+                progress['reported'] = written
+                await progress_callback(written)
+        
+        parser_task = asyncio.create_task(self._parse_stage(input_path, parsed_queue, window))
+        translator_tasks = [
+            asyncio.create_task(self._translate_stage(parsed_queue, targets, translated_queues))
+            for _ in range(self.workers)
+        ]
+        writer_tasks = [
+            asyncio.create_task(self._write_stage(target, queue, on_written))
+            for target, queue in zip(targets, translated_queues)
+        ]
+        tasks = [parser_task, *translator_tasks, *writer_tasks]
+        
+        try:
+            # منتظر پایان مراحل تجزیه و ترجمه؛ خطای هر مرحله فوراً منتشر می‌شود
+            producers = {parser_task, *translator_tasks}
+            remaining = set(tasks)
+            while producers & remaining:
+                done, remaining = await asyncio.wait(remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            
+            # اعلام پایان به نویسنده‌ها
+            for queue in translated_queues:
+                await queue.put(_END)
+            await asyncio.gather(*writer_tasks)
+        except BaseException:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        
+        return {target.language: target.stats for target in targets}
+    
+    async def _parse_stage(self, input_path: str, parsed_queue: asyncio.Queue, window: asyncio.Semaphore):
+        """Read the source file lazily and queue numbered batches"""
+        sequence = 0
+        position = 0
+        batch = []
+        for entries in self.srt_parser.iter_file(input_path, self.batch_size or 50):
+            for entry in entries:
+                batch.append(entry)
+                if len(batch) >= (self.batch_size or self.translator.batch_size):
+                    await window.acquire()
+                    await parsed_queue.put((sequence, position, batch))
+                    sequence += 1
+                    position += len(batch)
+                    batch = []
+        
+        if batch:
+            await window.acquire()
+            await parsed_queue.put((sequence, position, batch))
+        
+        for _ in range(self.workers):
+            await parsed_queue.put(_END)
+    
+    async def _translate_stage(self, parsed_queue: asyncio.Queue, targets: List[PipelineTarget],
+                               translated_queues: List[asyncio.Queue]):
+        """Translate queued batches into every target and pass them on to the writers"""
+        while True:
+            item = await parsed_queue.get()
+            if item is _END:
+                return
+            
+            sequence, position, batch = item
+            results = await asyncio.gather(*(
+                self._translate_entries(target, position, batch) for target in targets
+            ))
+    
+            for queue, translations in zip(translated_queues, results):
+                # هر خروجی نسخه جداگانه‌ای از زیرنویس‌ها را ویرایش می‌کند
+                entries = batch if len(targets) == 1 else [dict(entry) for entry in batch]
+                await queue.put((sequence, entries, translations))
+    
+    async def _translate_entries(self, target: PipelineTarget, position: int,
+                                 batch: List[Dict[str, Any]]) -> List[str]:
+        """Translate the cues of a batch that the target's checkpoint does not already hold"""
+        translations: List[Optional[str]] = [None] * len(batch)
+        missing = []
+        
+        for offset in range(len(batch)):
+            saved = target.checkpoint.get(position + offset) if target.checkpoint else None
+            if saved is None:
+                missing.append(offset)
+            else:
+                translations[offset] = saved
+        
+        target.stats['resumed_subtitles'] += len(batch) - len(missing)
+        if not missing:
+            return translations
+        
+        # جداسازی تگ‌ها و رد کردن خطوط بدون متن قابل ترجمه
+        markup = target.tokenizer.prepare_batch([batch[offset]['text'] for offset in missing])
+        target.stats['skipped_subtitles'] += markup.skipped
+        
+        translated_core = []
+        if markup.texts:
+            translated_core = await self.translator.translate_batch(
+                markup.texts, target.language, self.priority, self.deadline, self.flow
+            )
+        results = markup.restore(translated_core)
+        
+        for offset, translated_text in zip(missing, results):
+            translations[offset] = translated_text
+        
+        # ثبت فوری دسته ترجمه شده در چک‌پوینت
+        if target.checkpoint:
+            target.checkpoint.record({position + offset: translations[offset] for offset in missing})
+        
+        return translations
+    
+    async def _write_stage(self, target: PipelineTarget, translated_queue: asyncio.Queue,
+                           on_written: Callable[[int], Awaitable[None]]):
+        """Write a target's translated batches to disk in their original order"""
+        pending: Dict[int, Tuple[List[Dict[str, Any]], List[str]]] = {}
+        next_sequence = 0
+        stats = target.stats
+        
+        with open(target.output_path, 'w', encoding='utf-8') as output_file:
+            while True:
+                item = await translated_queue.get()
+                if item is _END:
+                    break
+                
+                sequence, batch, translations = item
+                pending[sequence] = (batch, translations)
+                
+                # نوشتن دسته‌ها به ترتیب اصلی به محض آماده شدن
+                while next_sequence in pending:
+                    batch, translations = pending.pop(next_sequence)
+                    self._apply_translations(batch, translations)
+                    output_file.write(self.srt_parser.create_srt_content(batch))
+                    output_file.flush()
+                    
+                    stats['batches'] += 1
+                    stats['total_subtitles'] += len(batch)
+                    stats['total_duration_ms'] += sum(
+                        entry.get('timing_info', {}).get('duration_ms', 0) for entry in batch
+                    )
+                    await on_written(next_sequence)
+                    next_sequence += 1
+        
+        if pending:
+            raise Exception(f"Pipeline ended with {len(pending)} unwritten batches")
+    
+    def _apply_translations(self, batch: List[Dict[str, Any]], translations: List[str]):
+        """Replace cue text in place while keeping the original timing"""
+        for position, entry in enumerate(batch):
+            if position < len(translations) and translations[position] is not None:
+                entry['text'] = translations[position].strip()
+                entry['translated'] = True
@@ -1,24 +1,49 @@
 import logging
-from typing import List, Dict, Any
-from ..translation import TranslatorFactory
-from ..subtitle import SRTParser, SubtitleTimingManager
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Iterator, Set
+from ..translation import (
+    TranslatorFactory, JobEstimator, Deadline, JobFlow, BulkTranslator, OpenAIBulkBackend,
+    get_client_registry, get_translation_memory, PRIORITY_INTERACTIVE, PRIORITY_PREMIUM
+)
+from ..subtitle import SRTParser, SubtitleTimingManager, MarkupTokenizer, LineClassifier
+from .translation_pipeline import TranslationPipeline, PipelineTarget
+from .job_queue import TranslationJob, TranslationJobQueue
+from .admission import AdmissionController
 from ..utils import (
     get_file_manager, InputValidator, ValidationError,
     handle_errors, TranslationError, FileProcessingError,
-    get_error_handler
+    get_error_handler, get_checkpoint_manager, get_release_index,
+    CancellationToken, CancellationError
 )
 from config import settings, get_dynamic_settings
 import os
+import time
 import asyncio
+import functools
 
 logger = logging.getLogger(__name__)
 
+# نمونه کوچک برای اجرای مسیرهای تجزیه و جداسازی تگ پیش از اولین درخواست
+WARM_UP_SRT = """1
+00:00:01,000 --> 00:00:02,500
+<i>Hello there.</i>
+
+2
+00:00:03,000 --> 00:00:04,000
+♪ ♪
+
+3
+00:00:04,500 --> 00:00:06,000
+{\\an8}Where is {0}the car?
+"""
+
 class TranslationService:
     """Main service for handling subtitle translation workflow with file management"""
     
     def __init__(self):
         self.srt_parser = SRTParser()
         self.timing_manager = SubtitleTimingManager()
+        self.markup_tokenizer = MarkupTokenizer(LineClassifier(settings.TARGET_LANGUAGE))
+        self.tokenizers = {settings.TARGET_LANGUAGE: self.markup_tokenizer}
         self.validator = InputValidator()
         self.dynamic_settings = get_dynamic_settings()
         self.error_handler = get_error_handler()
@@ -27,7 +52,52 @@ class TranslationService:
         max_file_size = self.dynamic_settings.get('file_settings.max_file_size_mb', settings.MAX_FILE_SIZE_MB)
         self.file_manager = get_file_manager(settings.TEMP_DIR, max_file_size)
         
+        # چک‌پوینت کارهای ترجمه برای ادامه پس از خطا یا ری‌استارت
+        self.checkpoint_manager = get_checkpoint_manager(
+            os.path.join(settings.TEMP_DIR, 'checkpoints'),
+            self.dynamic_settings.get('file_settings.checkpoint_retention_hours', 24)
+        )
+        
+        # اثر انگشت متنی کارهای تکمیل شده برای استفاده مجدد در نسخه‌های مشابه
+        self.release_index = get_release_index(
+            os.path.join(settings.TEMP_DIR, 'releases'),
+            self.dynamic_settings.get('file_settings.release_match_threshold', 0.5),
+            self.dynamic_settings.get('file_settings.release_retention_days', 30)
+        )
+        
+        # Shared HTTP connection pools for all translators
+        self.client_registry = get_client_registry(
+            max_connections=self.dynamic_settings.get('translation_settings.max_connections', 20),
+            max_keepalive_connections=self.dynamic_settings.get('translation_settings.max_keepalive_connections', 10),
+            keepalive_expiry=self.dynamic_settings.get('translation_settings.keepalive_expiry_seconds', 30)
+        )
+        
+        # حافظه ترجمه مشترک برای خطوط تکراری و مشابه بین فایل‌ها
+        self.translation_memory = get_translation_memory(
+            os.path.join(settings.TEMP_DIR, 'translation_memory'),
+            threshold=self.dynamic_settings.get('translation_settings.memory_similarity_threshold', 0.9),
+            max_entries=self.dynamic_settings.get('translation_settings.memory_max_entries', 50000),
+            fuzzy_reuse=bool(self.dynamic_settings.get('translation_settings.memory_fuzzy_reuse', False))
+        )
+        
+        # صف کارهای ترجمه با تعداد کارگر ثابت و اولویت بر اساس طرح اشتراک
+        self.job_queue = TranslationJobQueue(
+            workers=self.dynamic_settings.get('performance_settings.worker_threads', 4),
+            max_size=self.dynamic_settings.get('performance_settings.max_queue_size', 1000),
+            plan_priorities=self.dynamic_settings.get('performance_settings.plan_priorities'),
+            aging_seconds=self.dynamic_settings.get('performance_settings.queue_aging_seconds', 120)
+        )
+        
+        # کنترل پذیرش آپلودها در زمان شلوغی (اول کاربران رایگان کنار گذاشته می‌شوند)
+        self.admission = AdmissionController(
+            self.job_queue, self.file_manager,
+            max_concurrent_users=self.dynamic_settings.get('performance_settings.max_concurrent_users', 100),
+            memory_limit_mb=self.dynamic_settings.get('performance_settings.memory_limit_mb', 512),
+            free_shed_ratio=self.dynamic_settings.get('performance_settings.free_shed_ratio', 0.8)
+        )
+        
         self.translator = None
+        self._retiring: Set[asyncio.Task] = set()
         self._initialize_translator()
     
     def _initialize_translator(self):
@@ -36,10 +106,24 @@ class TranslationService:
             translator_config = {
                 'api_key': settings.OPENAI_API_KEY,
                 'model': settings.OPENAI_MODEL,
-                'max_tokens': settings.OPENAI_MAX_TOKENS
+                'max_tokens': settings.OPENAI_MAX_TOKENS,
+                'base_url': settings.OPENAI_BASE_URL,
+                'batch_size': self.dynamic_settings.get('translation_settings.batch_size', 10),
+                'min_batch_size': self.dynamic_settings.get('translation_settings.min_batch_size', 4),
+                'max_batch_size': self.dynamic_settings.get('translation_settings.max_batch_size', 40),
+                'target_p95_latency_seconds': self.dynamic_settings.get('translation_settings.target_p95_latency_seconds', 30),
+                'max_concurrency': self.dynamic_settings.get('translation_settings.max_concurrent_requests', 5),
+                'timeout_seconds': self.dynamic_settings.get('translation_settings.timeout_seconds', 60),
+                'warm_up_timeout_seconds': self.dynamic_settings.get('translation_settings.warm_up_timeout_seconds', 10),
+                'hedge_requests': self.dynamic_settings.get('translation_settings.hedge_requests', False),
+                'hedge_budget_ratio': self.dynamic_settings.get('translation_settings.hedge_budget_ratio', 0.05),
+                'fast_model': self.dynamic_settings.get('translation_settings.fast_model', 'gpt-4o-mini'),
+                'complexity_threshold': self.dynamic_settings.get('translation_settings.complexity_threshold', 0.45)
             }
             
-            self.translator = TranslatorFactory.create_translator('openai', translator_config)
+            provider = self.dynamic_settings.get('translation_settings.provider', 'openai')
+            self.translator = TranslatorFactory.create_translator(provider, translator_config)
+            self.translator.set_memory(self.translation_memory)
             logger.info(f"Initialized translator: {self.translator.get_provider_name()}")
             
         except Exception as e:
@@ -74,10 +158,7 @@ class TranslationService:
             
             # Translate texts
             logger.info(f"Translating {len(texts_to_translate)} subtitle entries")
-            translated_texts = await self.translator.translate_batch(
-                texts_to_translate, 
-                settings.TARGET_LANGUAGE
-            )
+            translated_texts = await self._translate_texts(texts_to_translate)
             
             # Update subtitles with translated texts
             for i, translated_text in enumerate(translated_texts):
@@ -105,7 +186,7 @@ class TranslationService:
             logger.error(f"Translation service failed: {str(e)}")
             raise Exception(f"Translation failed: {str(e)}")
     
-    @handle_errors(TranslationError, FileProcessingError, reraise=True)
+    @handle_errors((TranslationError, FileProcessingError), reraise=True)
     async def get_translation_preview(self, input_file_path: str, max_lines: int = 5) -> List[Dict[str, str]]:
         """
         Get a preview of translation for the first few lines
@@ -133,10 +214,7 @@ class TranslationService:
             texts_to_translate = [subtitle['text'] for subtitle in preview_subtitles]
             
             # Translate preview texts
-            translated_texts = await self.translator.translate_batch(
-                texts_to_translate, 
-                settings.TARGET_LANGUAGE
-            )
+            translated_texts = await self._translate_texts(texts_to_translate, PRIORITY_INTERACTIVE)
             
             # Create preview result
             preview_result = []
@@ -157,6 +235,23 @@ class TranslationService:
             self.error_handler.log_error(e, {'method': 'get_translation_preview'})
             raise TranslationError(f"Preview failed: {str(e)}")
     
+    async def _translate_texts(self, texts: List[str], priority: int = PRIORITY_PREMIUM) -> List[str]:
+        """Translate cue texts with their markup lifted out and reinserted"""
+        markup = self.markup_tokenizer.prepare_batch(texts)
+        translated_core = []
+        if markup.texts:
+            translated_core = await self.translator.translate_batch(markup.texts, settings.TARGET_LANGUAGE, priority)
+        return markup.restore(translated_core)
+    
+    def _create_estimator(self) -> JobEstimator:
+        """Build a job estimator for the current translator and pricing"""
+        return JobEstimator(
+            self.translator,
+            input_price_per_1k=self.dynamic_settings.get('translation_settings.input_price_per_1k_tokens', 0.0005),
+            output_price_per_1k=self.dynamic_settings.get('translation_settings.output_price_per_1k_tokens', 0.0015),
+            output_token_ratio=self.dynamic_settings.get('translation_settings.output_token_ratio', 1.5)
+        )
+    
     def get_translator_info(self) -> Dict[str, Any]:
         """Get information about the current translator"""
         try:
@@ -166,22 +261,28 @@ class TranslationService:
                 return {
                     'provider': self.translator.get_provider_name(),
                     'target_language': target_lang,
-                    'available_providers': TranslatorFactory.get_available_providers()
+                    'available_providers': TranslatorFactory.get_available_providers(),
+                    'metrics': self.translator.get_metrics()
                 }
             return {'provider': 'None', 'error': 'Translator not initialized'}
         except Exception as e:
             logger.error(f"Failed to get translator info: {str(e)}")
             return {'error': str(e)}
     
-    @handle_errors(ValidationError, TranslationError, reraise=True)
+    @handle_errors((ValidationError, TranslationError), reraise=True)
     def change_translator(self, provider: str, config: Dict[str, Any]):
         """Change the translation provider"""
         try:
             validated_provider = self.validator.validate_string(provider, "provider")
             validated_config = self.validator.validate_dict(config, "config")
             
+            previous_translator = self.translator
             self.translator = TranslatorFactory.create_translator(validated_provider, validated_config)
+            self.translator.set_memory(self.translation_memory)
             logger.info(f"Changed translator to: {self.translator.get_provider_name()}")
+            
+            if previous_translator is not None:
+                self._retire_translator(previous_translator)
         except (ValidationError, TranslationError) as e:
             self.error_handler.log_error(e, {'method': 'change_translator'})
             raise
@@ -190,21 +291,116 @@ class TranslationService:
             self.error_handler.log_error(e, {'method': 'change_translator'})
             raise TranslationError(f"Translator change failed: {str(e)}")
     
+    def _retire_translator(self, translator):
+        """Release the pooled connections of a replaced translator once its in-flight jobs finish"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(translator.close())
+            return
+        
+        async def close_when_idle():
+            await translator.wait_idle()
+            await translator.close()
+            logger.info(f"Retired translator {translator.get_provider_name()} closed")
+        
+        task = loop.create_task(close_when_idle())
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+    
+    def _get_tokenizer(self, language: str) -> MarkupTokenizer:
+        """Markup tokenizer with the line classifier of a target language"""
+        if language not in self.tokenizers:
+            self.tokenizers[language] = MarkupTokenizer(LineClassifier(language))
+        return self.tokenizers[language]
+    
+    async def warm_up(self) -> Dict[str, Any]:
+        """
+        Prepare everything the first request would otherwise pay for
+
+        Opens provider connections, copies the hottest translation-memory
+        lines into the translator cache and builds the parser and tokenizers
+        of every target language on a sample file. Failures are logged and
+        never block startup.
+        """
+        started = time.monotonic()
+        report: Dict[str, Any] = {}
+        languages = self.get_target_languages()
+        
+        try:
+            sample_path = os.path.join(settings.TEMP_DIR, 'warm_up.srt')
+            with open(sample_path, 'w', encoding='utf-8') as f:
+                f.write(WARM_UP_SRT)
+            try:
+                texts = self._read_texts(sample_path)
+                for language in languages:
+                    self._get_tokenizer(language).prepare_batch(texts)
+            finally:
+                os.remove(sample_path)
+            report['tokenizers'] = len(self.tokenizers)
+        except Exception as e:
+            logger.warning(f"Warm-up of parser and tokenizers failed: {str(e)}")
+        
+        # کش ترجمه با پرکاربردترین خطوط حافظه ترجمه پر می‌شود
+        try:
+            per_language = max(1, self.translator.cache.maxsize // max(1, len(languages)))
+            report['cached_lines'] = sum(
+                self.translator.prime_cache(self.translation_memory.hot_entries(language, per_language), language)
+                for language in languages
+            )
+        except Exception as e:
+            logger.warning(f"Warm-up of translation cache failed: {str(e)}")
+        
+        # گرم کردن اتصال‌ها نباید راه‌اندازی ربات را در صورت در دسترس نبودن سرویس‌دهنده متوقف کند
+        warm_up_timeout = self.dynamic_settings.get('translation_settings.warm_up_timeout_seconds', 10)
+        try:
+            report['connections'] = await asyncio.wait_for(self.translator.warm_up(), warm_up_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up of translator connections gave up after {warm_up_timeout}s")
+        except Exception as e:
+            logger.warning(f"Warm-up of translator connections failed: {str(e)}")
+        
+        report['seconds'] = round(time.monotonic() - started, 2)
+        logger.info(f"Translation service warmed up: {report}")
+        return report
+    
+    async def shutdown(self):
+        """Close the active translator and every pooled HTTP client"""
+        try:
+            await self.job_queue.stop()
+            for task in list(self._retiring):
+                # اتصالات این مترجم‌ها با close_all بسته می‌شوند
+                task.cancel()
+            if self.translator:
+                await self.translator.close()
+            await self.client_registry.close_all()
+            await asyncio.get_running_loop().run_in_executor(None, self.translation_memory.flush)
+            logger.info("Translation service shut down")
+        except Exception as e:
+            logger.error(f"Translation service shutdown failed: {str(e)}")
+    
     # متدهای مدیریت فایل
     
-    @handle_errors(ValidationError, FileProcessingError, reraise=False)
-    async def can_user_upload(self, user_id: int) -> bool:
-        """بررسی امکان آپلود فایل برای کاربر"""
+    def get_max_concurrent_files(self, plan_type: Optional[str]) -> int:
+        """سقف فایل‌های همزمان کاربر بر اساس طرح اشتراک (max_concurrent_files)"""
+        plan = self.dynamic_settings.get_subscription_plan(plan_type) if plan_type and plan_type != 'free' else None
+        plan = plan or self.dynamic_settings.get('free_plan', {}) or {}
+        return max(1, int(plan.get('max_concurrent_files', 1)))
+    
+    @handle_errors((ValidationError, FileProcessingError), reraise=False)
+    async def can_user_upload(self, user_id: int, max_files: int = 1) -> bool:
+        """بررسی امکان آپلود فایل برای کاربر (حداکثر max_files کار همزمان)"""
         try:
             # Input validation
             validated_user_id = self.validator.validate_user_id(user_id)
-            return await self.file_manager.can_upload_file(validated_user_id)
+            return await self.file_manager.can_upload_file(validated_user_id, max_files)
         except ValidationError as e:
             self.error_handler.log_error(e, {'user_id': user_id, 'method': 'can_user_upload'})
             return False
     
-    @handle_errors(ValidationError, FileProcessingError, reraise=False)
-    async def prepare_file_upload(self, user_id: int, filename: str, file_size: int) -> Dict[str, Any]:
+    @handle_errors((ValidationError, FileProcessingError), reraise=True)
+    async def prepare_file_upload(self, user_id: int, filename: str, file_size: int,
+                                  max_files: int = 1) -> Dict[str, Any]:
         """آماده‌سازی آپلود فایل"""
         try:
             # Input validation
@@ -213,7 +409,7 @@ class TranslationService:
             validated_file_size = self.validator.validate_file_size(file_size)
             
             return await self.file_manager.prepare_user_upload(
-                validated_user_id, validated_filename, validated_file_size
+                validated_user_id, validated_filename, validated_file_size, max_files
             )
         except ValidationError as e:
             self.error_handler.log_error(e, {
@@ -224,81 +420,288 @@ class TranslationService:
             })
             raise FileProcessingError(f"اعتبارسنجی ناموفق: {str(e)}")
     
-    @handle_errors(TranslationError, FileProcessingError, reraise=True)
-    async def process_user_file(self, user_id: int, file_path: str) -> str:
+    async def estimate_user_file(self, user_id: int, file_path: str,
+                                 file_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
-        پردازش کام�� فایل کاربر با مدیریت تایمینگ دقیق
+        تخمین تعداد درخواست، توکن، هزینه و زمان ترجمه پیش از شروع
         
         Args:
             user_id: شناسه کاربر
             file_path: مسیر فایل دانلود شده
+            file_id: شناسه کار کاربر (پیش‌فرض آخرین فایل)
             
         Returns:
-            مسیر فایل ترجمه شده
+            تخمین کار یا None در صورت خطا
         """
+        try:
+            validated_user_id = self.validator.validate_user_id(user_id)
+            
+            texts = []
+            for batch in self.srt_parser.iter_file(file_path, getattr(self.translator, 'batch_size', 10)):
+                texts.extend(self.markup_tokenizer.prepare_batch([entry['text'] for entry in batch]).texts)
+            
+            estimate = self._create_estimator().estimate_languages(texts, self.get_target_languages())
+            await self.file_manager.update_file_info(validated_user_id, file_id, estimate=estimate)
+            logger.info(f"Job estimate for user {validated_user_id}: {estimate}")
+            return estimate
+        except Exception as e:
+            # تخمین اختیاری است و نباید مانع ترجمه شود
+            logger.warning(f"Job estimate failed for user {user_id}: {str(e)}")
+            return None
+    
+    def _log_estimate_error(self, user_id: int, estimate: Optional[Dict[str, Any]],
+                            flow: JobFlow, elapsed_seconds: float):
+        """ثبت خطای تخمین در مقایسه با مقادیر واقعی همین کار (شمارش شده روی flow)"""
+        if not estimate:
+            return
+        
+        actual_requests = flow.requests
+        actual_tokens = flow.total_tokens
+        
+        def error(estimated, actual):
+            return f"{(estimated - actual) / actual:+.0%}" if actual else "n/a"
+        
+        logger.info(
+            f"Estimate vs actual for user {user_id}: "
+            f"eta {estimate['eta_seconds']}s/{elapsed_seconds:.1f}s ({error(estimate['eta_seconds'], elapsed_seconds)}), "
+            f"requests {estimate['requests']}/{actual_requests} ({error(estimate['requests'], actual_requests)}), "
+            f"tokens {estimate['total_tokens']}/{actual_tokens} ({error(estimate['total_tokens'], actual_tokens)})"
+        )
+    
+    def check_admission(self, user_id: int, plan_type: Optional[str]) -> Dict[str, Any]:
+        """بررسی پذیرش آپلود جدید بر اساس عمق صف، کاربران فعال و حافظه پروسه"""
+        return self.admission.check(user_id, plan_type)
+    
+    def create_job_deadline(self) -> Deadline:
+        """مهلت کار ترجمه از لحظه ثبت در صف (max_processing_time_minutes)"""
+        max_minutes = self.dynamic_settings.get('file_settings.max_processing_time_minutes', 30)
+        return Deadline(max_minutes * 60 if max_minutes else None)
+    
+    async def enqueue_user_file(self, job: TranslationJob, bulk: bool = False) -> int:
+        """
+        ثبت فایل دانلود شده کاربر در صف ترجمه و برگرداندن نوبت آن
+        
+        کار انبوه ابتدا خارج از کارگرهای صف منتظر Batch API می‌ماند و پس از آن
+        برای ترجمه خطوط باقی‌مانده وارد صف می‌شود (نوبت 0).
+        """
+        hold_minutes = 0
+        if bulk:
+            max_minutes = self.dynamic_settings.get('file_settings.max_processing_time_minutes', 30) or 30
+            hold_minutes = self.dynamic_settings.get('translation_settings.bulk_max_wait_hours', 24) * 60 + max_minutes
+        if not await self.file_manager.queue_file_processing(job.user_id, job.job_id, hold_minutes):
+            raise FileProcessingError("فایل کاربر آماده ترجمه نیست")
+        
+        if bulk:
+            self.job_queue.park(job, lambda: self.translate_user_file_in_bulk(job.user_id, job.job_id))
+            return 0
+        return await self.job_queue.submit(job)
+    
+    async def translate_user_file_in_bulk(self, user_id: int, file_id: str):
+        """ترجمه خطوط فایل کاربر از طریق Batch API و ثبت در چک‌پوینت (پیش از ورود کار به صف)"""
+        validated_user_id = self.validator.validate_user_id(user_id)
+        file_info = await self.file_manager.get_user_file_info(validated_user_id, file_id)
+        if not file_info:
+            raise FileProcessingError("اطلاعات فایل کاربر یافت نشد")
+        
+        file_path = file_info['file_path']
+        total_subtitles = self.srt_parser.count_entries(file_path)
+        if not total_subtitles:
+            return
+        
+        # چک‌پوینت‌ها همان‌هایی هستند که ترجمه آنلاین بعداً از آن‌ها ادامه می‌دهد
+        targets = [
+            PipelineTarget(
+                language, None,
+                self.checkpoint_manager.open_checkpoint(
+                    validated_user_id, file_path, language, total_subtitles, owner=file_id
+                ),
+                self._get_tokenizer(language)
+            )
+            for language in self.get_target_languages()
+        ]
+        logger.info(f"Translating {total_subtitles} subtitle entries for user {validated_user_id} in bulk mode")
+        cancel_token = file_info.get('cancel_token') or CancellationToken()
+        try:
+            await cancel_token.run(self._translate_in_bulk(self._read_texts(file_path), targets))
+        finally:
+            for target in targets:
+                self.checkpoint_manager.release(target.checkpoint)
+    
+    def _plan_weight(self, plan_type: Optional[str]) -> float:
+        """وزن صف‌بندی منصفانه درخواست‌های یک کار بر اساس طرح اشتراک"""
+        weights = self.dynamic_settings.get('performance_settings.plan_weights', {}) or {}
+        return float(weights.get(plan_type or 'free', 1.0))
+    
+    def get_target_languages(self) -> List[str]:
+        """زبان‌های مقصد ترجمه (زبان اصلی و زبان‌های اضافی تنظیمات)"""
+        languages = [settings.TARGET_LANGUAGE]
+        for language in self.dynamic_settings.get('translation_settings.target_languages', []) or []:
+            if language and language not in languages:
+                languages.append(language)
+        return languages
+    
+    @handle_errors((TranslationError, FileProcessingError), reraise=True)
+    async def process_user_file(self, user_id: int, file_path: str,
+                                progress_callback: Optional[Callable[[int, int], Awaitable[None]]] = None,
+                                priority: int = PRIORITY_PREMIUM,
+                                target_languages: Optional[List[str]] = None,
+                                plan_type: Optional[str] = None,
+                                file_id: Optional[str] = None, deadline: Optional[Deadline] = None) -> List[str]:
+        """
+        پردازش کامل فایل کاربر با مدیریت تایمینگ دقیق
+        
+        Args:
+            user_id: شناسه کاربر
+            file_path: مسیر فایل دانلود شده
+            progress_callback: تابع async برای گزارش پیشرفت (تعداد ترجمه شده، کل)
+            priority: اولویت درخواست‌های ترجمه (بر اساس نوع حساب کاربر)
+            target_languages: زبان‌های مقصد؛ فایل یک بار تجزیه و دسته‌بندی و به همه زبان‌ها ترجمه می‌شود
+            plan_type: طرح اشتراک کاربر؛ وزن سهم کار از ظرفیت مترجم را تعیین می‌کند
+            file_id: شناسه کار کاربر در مدیر فایل (پیش‌فرض آخرین فایل)
+            deadline: مهلت کار از زمان ثبت در صف (پیش‌فرض max_processing_time_minutes از همین لحظه)
+            
+        Returns:
+            مسیر فایل‌های ترجمه شده به ترتیب زبان‌ها
+        """
+        targets: List[PipelineTarget] = []
         try:
             # Input validation
             validated_user_id = self.validator.validate_user_id(user_id)
+            languages = list(dict.fromkeys(target_languages or self.get_target_languages()))
+            
+            # مهلت کل کار؛ هر درخواست ترجمه حداکثر تا پایان این مهلت منتظر می‌ماند
+            max_minutes = self.dynamic_settings.get('file_settings.max_processing_time_minutes', 30)
+            deadline = deadline or Deadline(max_minutes * 60 if max_minutes else None)
+            
+            # کار مشخص کاربر (با چند فایل همزمان، پاکسازی خطا فقط همین کار را حذف می‌کند)
+            file_info = await self.file_manager.get_user_file_info(validated_user_id, file_id)
+            if not file_info:
+                raise FileProcessingError("اطلاعات فایل کاربر یافت نشد")
+            file_id = file_info['file_id']
             
             # شروع پردازش
-            await self.file_manager.start_file_processing(validated_user_id)
+            await self.file_manager.start_file_processing(
+                validated_user_id, timeout_minutes=max_minutes or 30, file_id=file_id
+            )
             
             # اعتبارسنجی فایل
             if not self.srt_parser.validate_srt_file(file_path):
                 raise FileProcessingError("فرمت فایل SRT نامعتبر است")
             
-            # تجزیه فایل با حفظ تایمینگ دقیق
-            logger.info(f"Parsing SRT file for user {validated_user_id}: {file_path}")
-            original_subtitles = self.srt_parser.parse_file(file_path)
-            
-            if not original_subtitles:
+            total_subtitles = self.srt_parser.count_entries(file_path)
+            if not total_subtitles:
                 raise FileProcessingError("هیچ زیرنویسی در فایل یافت نشد")
             
-            # استخراج متن‌ها برای ترجمه
-            texts_to_translate = [subtitle['text'] for subtitle in original_subtitles]
-            
-            # ترجمه متن‌ها
-            logger.info(f"Translating {len(texts_to_translate)} subtitle entries for user {validated_user_id}")
-            try:
-                translated_texts = await self.translator.translate_batch(
-                    texts_to_translate, 
-                    settings.TARGET_LANGUAGE
-                )
-            except Exception as e:
-                raise TranslationError(f"خطا در ترجمه: {str(e)}")
-            
-            # حفظ تایمینگ اصلی در ترجمه
-            translated_subtitles = self.timing_manager.preserve_timing_in_translation(
-                original_subtitles, 
-                translated_texts
-            )
-            
             # تولید مسیر فایل خروجی
-            file_info = await self.file_manager.get_user_file_info(validated_user_id)
-            if not file_info:
-                raise FileProcessingError("اطلاعات فایل کاربر یافت نشد")
-            
             base_name = os.path.splitext(file_info['original_filename'])[0]
-            output_file_path = os.path.join(
-                settings.OUTPUT_DIR,
-                f"user_{validated_user_id}",
-                f"{base_name}_persian.srt"
-            )
+            output_dir = os.path.join(settings.OUTPUT_DIR, f"user_{validated_user_id}", file_id)
             
             # ایجاد دایرکتوری خروجی
-            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+            os.makedirs(output_dir, exist_ok=True)
+            
+            # اثر انگشت متن به صورت جریانی و خارج از event loop محاسبه می‌شود
+            loop = asyncio.get_running_loop()
+            fingerprint = await loop.run_in_executor(None, self.release_index.fingerprint, self._iter_texts(file_path))
+            for language in languages:
+                # بارگذاری چک‌پوینت قبلی همین فایل و زبان (در صورت وجود)
+                checkpoint = self.checkpoint_manager.open_checkpoint(
+                    validated_user_id, file_path, language, total_subtitles, owner=file_id
+                )
+                if checkpoint.resumed_count:
+                    logger.info(f"Resuming job {checkpoint.job_id} ({language}) for user {validated_user_id}: "
+                                f"{checkpoint.resumed_count}/{total_subtitles} already translated")
+            
+                # استفاده از ترجمه نسخه مشابه (تایمینگ متفاوت) در صورت وجود
+                release_id = None
+                if checkpoint.resumed_count < total_subtitles:
+                    release_id = self.release_index.find_match(fingerprint, language)
+                if release_id:
+                    aligned = await loop.run_in_executor(
+                        None, self.release_index.align_release, release_id, self._iter_texts(file_path)
+                    )
+                    reused = {position: text for position, text in aligned.items() if checkpoint.get(position) is None}
+                    if reused:
+                        checkpoint.record(reused)
+                        logger.info(f"Reusing {len(reused)} {language} translations from a matching release "
+                                    f"for user {validated_user_id}")
+                
+                tokenizer = self._get_tokenizer(language)
+                output_file_path = os.path.join(output_dir, f"{base_name}_{language.lower().replace(' ', '_')}.srt")
+                targets.append(PipelineTarget(language, output_file_path, checkpoint, tokenizer))
+            
+            # تجزیه، ترجمه و نوشتن همزمان با حفظ تایمینگ اصلی
+            logger.info(f"Translating {total_subtitles} subtitle entries into {', '.join(languages)} "
+                        f"for user {validated_user_id}: {file_path}")
+            
+            async def on_progress(written: int):
+                if progress_callback:
+                    await self._report_progress(progress_callback, written, total_subtitles)
+            
+            flow = JobFlow(file_id, self._plan_weight(plan_type))
+            started = time.monotonic()
+            cancel_token = file_info.get('cancel_token') or CancellationToken()
+            job_ids = [target.checkpoint.job_id for target in targets]
+            try:
+                pipeline = TranslationPipeline(
+                    self.srt_parser,
+                    self.translator,
+                    languages[0],
+                    priority=priority,
+                    deadline=deadline,
+                    flow=flow
+                )
+                pipeline_stats = await cancel_token.run(pipeline.run_targets(file_path, targets, on_progress))
+            except CancellationError:
+                if cancel_token.reason == 'timeout':
+                    # لغو توسط پاکسازی زمان‌بندی شده یعنی پایان مهلت پردازش، نه لغو کاربر
+                    logger.warning(f"Translation job {job_ids[0]} for user {validated_user_id} cancelled "
+                                   f"after its processing time ran out")
+                    raise TranslationError(
+                        "زمان مجاز پردازش به پایان رسید",
+                        "TRANSLATION_TIMEOUT",
+                        {'job_id': job_ids[0], 'resumable_subtitles': targets[0].checkpoint.resumed_count}
+                    )
+                logger.info(f"Translation job {job_ids[0]} for user {validated_user_id} cancelled: {cancel_token.reason}")
+                raise TranslationError(
+                    "ترجمه لغو شد",
+                    "TRANSLATION_CANCELLED",
+                    {'job_id': job_ids[0], 'resumable_subtitles': targets[0].checkpoint.resumed_count,
+                     'reason': cancel_token.reason}
+                )
+            except Exception as e:
+                if deadline.expired:
+                    # پایان مهلت کار؛ دسته‌های ترجمه شده در چک‌پوینت باقی می‌مانند
+                    logger.warning(f"Translation job {job_ids[0]} for user {validated_user_id} ran out of time "
+                                   f"({max_minutes} minutes)")
+                    raise TranslationError(
+                        "زمان مجاز پردازش به پایان رسید",
+                        "TRANSLATION_TIMEOUT",
+                        {'job_id': job_ids[0], 'resumable_subtitles': targets[0].checkpoint.resumed_count}
+                    )
+                raise TranslationError(
+                    f"خطا در ترجمه: {str(e)}",
+                    "TRANSLATION_INTERRUPTED",
+                    {'job_id': job_ids[0], 'resumable_subtitles': targets[0].checkpoint.resumed_count}
+                )
             
-            # ذخیره فایل ترجمه شده
-            final_path = self.srt_parser.save_srt_file(translated_subtitles, output_file_path)
+            for target in targets:
+                await loop.run_in_executor(None, functools.partial(
+                    self.release_index.store, target.checkpoint.job_id, self._iter_texts(file_path),
+                    self._iter_texts(target.output_path), target.language, fingerprint
+                ))
+                target.checkpoint.discard()
+            output_paths = [target.output_path for target in targets]
+            final_path = output_paths[0]
             
             # تکمیل پردازش
-            await self.file_manager.complete_file_processing(validated_user_id, final_path)
+            await self.file_manager.complete_file_processing(validated_user_id, final_path, output_paths, file_id)
             
-            # تحلیل آماری نهایی
-            timing_stats = self.timing_manager.analyze_timing_statistics(translated_subtitles)
-            logger.info(f"Translation completed for user {validated_user_id}: {timing_stats}")
+            # آمار نهایی (محاسبه شده به صورت تدریجی در مرحله نوشتن)
+            logger.info(f"Translation completed for user {validated_user_id}: {pipeline_stats}")
+            self._log_estimate_error(validated_user_id, file_info.get('estimate'), flow,
+                                     time.monotonic() - started)
             
-            return final_path
+            return output_paths
             
         except (ValidationError, TranslationError, FileProcessingError) as e:
             self.error_handler.log_error(e, {
@@ -307,7 +710,7 @@ class TranslationService:
                 'method': 'process_user_file'
             })
             # پاکسازی در صورت خطا
-            await self.file_manager.cleanup_user_files(user_id, force=True)
+            await self.file_manager.cleanup_user_files(user_id, force=True, file_id=file_id)
             raise
         except Exception as e:
             logger.error(f"File processing failed for user {user_id}: {str(e)}")
@@ -317,10 +720,69 @@ class TranslationService:
                 'method': 'process_user_file'
             })
             # پاکسازی در صورت خطا
-            await self.file_manager.cleanup_user_files(user_id, force=True)
+            await self.file_manager.cleanup_user_files(user_id, force=True, file_id=file_id)
             raise FileProcessingError(f"پردازش فایل ناموفق: {str(e)}")
+        finally:
+            # چک‌پوینت‌های باقی‌مانده برای ادامه با ارسال دوباره فایل آزاد می‌شوند
+            for target in targets:
+                self.checkpoint_manager.release(target.checkpoint)
+    
+    async def _translate_in_bulk(self, source_texts: List[str], targets: List[PipelineTarget]):
+        """ترجمه خطوط باقی‌مانده همه زبان‌ها از طریق Batch API و ثبت در چک‌پوینت"""
+        client = self.client_registry.acquire(settings.OPENAI_API_KEY, settings.OPENAI_BASE_URL)
+        try:
+            bulk_translator = BulkTranslator(
+                OpenAIBulkBackend(client, settings.OPENAI_MODEL, settings.OPENAI_MAX_TOKENS),
+                batch_size=self.dynamic_settings.get('translation_settings.max_batch_size', 40),
+                poll_interval=self.dynamic_settings.get('translation_settings.bulk_poll_interval_seconds', 60),
+                max_wait_seconds=self.dynamic_settings.get('translation_settings.bulk_max_wait_hours', 24) * 3600
+            )
+            
+            async def translate_target(target: PipelineTarget):
+                positions = [position for position in range(len(source_texts)) if target.checkpoint.get(position) is None]
+                markup = target.tokenizer.prepare_batch([source_texts[position] for position in positions])
+                try:
+                    translations = await bulk_translator.translate(markup.texts, target.language)
+                except Exception as e:
+                    # خطای Batch API مانع کار نمی‌شود؛ همه خطوط به صورت آنلاین ترجمه می‌شوند
+                    logger.warning(f"Bulk translation failed for job {target.checkpoint.job_id}, "
+                                   f"falling back to online requests: {str(e)}")
+                    return
+                
+                # فقط خطوط ترجمه شده ثبت می‌شوند
+                recorded = {}
+                for index in markup.pending:
+                    extracted = markup.extracted[index]
+                    if extracted.core in translations:
+                        recorded[positions[index]] = target.tokenizer.restore(translations[extracted.core], extracted)
+                if recorded:
+                    target.checkpoint.record(recorded)
+                logger.info(f"Bulk translated {len(recorded)}/{len(positions)} {target.language} subtitles "
+                            f"for job {target.checkpoint.job_id}")
+            
+            await asyncio.gather(*(translate_target(target) for target in targets))
+        finally:
+            await self.client_registry.release(client)
+    
+    def _iter_texts(self, file_path: str) -> Iterator[str]:
+        """پیمایش متن زیرنویس‌های فایل بدون نگه‌داشتن کل فایل در حافظه"""
+        for batch in self.srt_parser.iter_file(file_path, 500):
+            for entry in batch:
+                yield entry['text']
     
-    @handle_errors(TranslationError, FileProcessingError, reraise=True)
+    def _read_texts(self, file_path: str) -> List[str]:
+        """خواندن متن همه زیرنویس‌های فایل"""
+        return list(self._iter_texts(file_path))
+    
+    async def _report_progress(self, progress_callback: Callable[[int, int], Awaitable[None]],
+                               completed: int, total: int):
+        """گزارش پیشرفت بدون توقف ترجمه در صورت خطای callback"""
+        try:
+            await progress_callback(completed, total)
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {str(e)}")
+    
+    @handle_errors((TranslationError, FileProcessingError), reraise=True)
     async def get_user_preview(self, user_id: int, max_lines: int = 3) -> List[Dict[str, str]]:
         """
         دریافت پیش‌نمایش ترجمه برای کاربر
@@ -354,10 +816,7 @@ class TranslationService:
             texts_to_translate = [subtitle['text'] for subtitle in preview_subtitles]
             
             # ترجمه پیش‌نمایش
-            translated_texts = await self.translator.translate_batch(
-                texts_to_translate, 
-                settings.TARGET_LANGUAGE
-            )
+            translated_texts = await self._translate_texts(texts_to_translate, PRIORITY_INTERACTIVE)
             
             # تولید نتیجه پیش‌نمایش
             preview_result = []
@@ -383,17 +842,36 @@ class TranslationService:
             raise TranslationError(f"تولید پیش‌نمایش ناموفق: {str(e)}")
     
     @handle_errors(FileProcessingError, reraise=False)
-    async def cleanup_user_data(self, user_id: int) -> bool:
-        """پاکسازی داده‌های کاربر"""
+    async def cleanup_user_data(self, user_id: int, file_id: Optional[str] = None) -> bool:
+        """پاکسازی داده‌های کاربر (بدون file_id همه کارهای کاربر)"""
         try:
             validated_user_id = self.validator.validate_user_id(user_id)
-            success = await self.file_manager.cleanup_user_files(validated_user_id)
-            logger.info(f"Cleanup {'successful' if success else 'failed'} for user {validated_user_id}")
-            return success
+            
+            # کار در صف هنوز شروع نشده و فایل‌هایش همین‌جا پاک می‌شوند؛
+            # کار در حال اجرا لغو می‌شود و فایل‌ها را خودش پاک می‌کند
+            queued = self.job_queue.cancel(validated_user_id, 'user_cleanup', file_id)
+            running = await self.file_manager.cancel_user_job(validated_user_id, 'user_cleanup', file_id)
+            if running:
+                logger.info(f"Running jobs cancelled by cleanup for user {validated_user_id}")
+            
+            success = await self.file_manager.cleanup_user_files(validated_user_id, file_id=file_id)
+            logger.info(f"Cleanup {'successful' if success else 'deferred to running jobs'} for user {validated_user_id}")
+            return success or queued or running
         except ValidationError as e:
             self.error_handler.log_error(e, {'user_id': user_id, 'method': 'cleanup_user_data'})
             return False
     
+    async def cancel_user_job(self, user_id: int, reason: str = 'user', file_id: Optional[str] = None) -> bool:
+        """لغو کار ترجمه در صف یا در حال اجرای کاربر (بدون file_id همه کارها)"""
+        try:
+            validated_user_id = self.validator.validate_user_id(user_id)
+            queued = self.job_queue.cancel(validated_user_id, reason, file_id)
+            running = await self.file_manager.cancel_user_job(validated_user_id, reason, file_id)
+            return queued or running
+        except ValidationError as e:
+            self.error_handler.log_error(e, {'user_id': user_id, 'method': 'cancel_user_job'})
+            return False
+    
     async def get_system_status(self) -> Dict[str, Any]:
         """دریافت وضعیت سیستم"""
         try:
@@ -403,6 +881,11 @@ class TranslationService:
             return {
                 'file_manager': file_stats,
                 'translator': translator_info,
+                'job_queue': self.job_queue.get_stats(),
+                'admission': self.admission.get_stats(),
+                'connection_pool': self.client_registry.get_stats(),
+                'translation_memory': self.translation_memory.get_stats(),
+                'release_index': self.release_index.get_stats(),
                 'settings': {
                     'max_file_size_mb': settings.MAX_FILE_SIZE_MB,
                     'target_language': settings.TARGET_LANGUAGE,
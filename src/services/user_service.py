@@ -129,6 +129,7 @@ class UserService:
                     return {
                         'allowed': True,
                         'type': 'premium',
+                        'plan_type': user['plan_type'],
                         'message': f'اشتراک {user["plan_type"]} فعال است',
                         'remaining_days': (end_date - datetime.now()).days
                     }
@@ -139,6 +140,7 @@ class UserService:
                 return {
                     'allowed': True,
                     'type': 'free',
+                    'plan_type': 'free',
                     'message': f'شما {remaining} ترجمه رایگان باقی‌مانده دارید',
                     'remaining_free': remaining
                 }
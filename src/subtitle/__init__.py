@@ -1,4 +1,6 @@
 from .srt_parser import SRTParser
 from .timing_manager import SubtitleTimingManager
+from .markup import MarkupTokenizer, MarkupBatch
+from .line_classifier import LineClassifier
 
-__all__ = ['SRTParser', 'SubtitleTimingManager']
\ No newline at end of file
+__all__ = ['SRTParser', 'SubtitleTimingManager', 'MarkupTokenizer', 'MarkupBatch', 'LineClassifier']
\ No newline at end of file
@@ -0,0 +1,69 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+class LineClassifier:
+    """
+    Cheap local check for cue texts that need no translation
+
+    Lines are classified by the Unicode script of their letters: a line
+    written mostly in the target language's script, or one without any
+    letters outside URLs and release credits, is left untouched. Script
+    detection is disabled for Latin-script targets, where it cannot tell
+    the source and target apart.
+    """
+    
+    SCRIPT_RANGES: Dict[str, List[Tuple[int, int]]] = {
+        'arabic': [(0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+        'cyrillic': [(0x0400, 0x052F)],
+        'greek': [(0x0370, 0x03FF)],
+        'hebrew': [(0x0590, 0x05FF)],
+        'devanagari': [(0x0900, 0x097F)],
+        'thai': [(0x0E00, 0x0E7F)],
+        'hangul': [(0x1100, 0x11FF), (0x3130, 0x318F), (0xAC00, 0xD7AF)],
+        'cjk': [(0x3040, 0x30FF), (0x3400, 0x4DBF), (0x4E00, 0x9FFF)]
+    }
+    
+    LANGUAGE_SCRIPTS = {
+        'persian': 'arabic', 'farsi': 'arabic', 'arabic': 'arabic', 'urdu': 'arabic', 'pashto': 'arabic',
+        'russian': 'cyrillic', 'ukrainian': 'cyrillic', 'bulgarian': 'cyrillic', 'serbian': 'cyrillic',
+        'greek': 'greek', 'hebrew': 'hebrew', 'hindi': 'devanagari', 'marathi': 'devanagari',
+        'thai': 'thai', 'korean': 'hangul', 'chinese': 'cjk', 'japanese': 'cjk'
+    }
+    
+    URL_PATTERN = re.compile(r'(?:https?://|www\.)\S+|\b[\w.-]+\.(?:com|org|net|io|ir|tv|info)\b|\S+@\S+\.\w+|@\w+', re.IGNORECASE)
+    CREDIT_PATTERN = re.compile(
+        r'\b(?:subtitles?|subs|synced|sync|corrected|corrections|ripped|encoded|translated|downloaded)\b.*\bby\b',
+        re.IGNORECASE
+    )
+    
+    def __init__(self, target_language: str = "Persian", target_script_ratio: float = 0.6):
+        self.target_language = target_language
+        self.target_script = self.LANGUAGE_SCRIPTS.get(target_language.strip().lower())
+        self.target_ranges = self.SCRIPT_RANGES.get(self.target_script, [])
+        self.target_script_ratio = target_script_ratio
+    
+    def _in_target_script(self, char: str) -> bool:
+        code = ord(char)
+        return any(start <= code <= end for start, end in self.target_ranges)
+    
+    def classify(self, text: str) -> Optional[str]:
+        """Return why a line can skip translation, or None if it needs translating"""
+        without_urls = self.URL_PATTERN.sub(' ', text)
+        letters = [char for char in without_urls if char.isalpha()]
+        
+        if not letters:
+            return 'url' if without_urls != text else 'no_letters'
+        
+        if without_urls != text and self.CREDIT_PATTERN.search(text):
+            return 'credit'
+        
+        if self.target_ranges:
+            in_target = sum(1 for char in letters if self._in_target_script(char))
+            if in_target / len(letters) >= self.target_script_ratio:
+                return 'target_script'
+        
+        return None
+    
+    def needs_translation(self, text: str) -> bool:
+        """Check whether a cue text has content to translate"""
+        return self.classify(text) is None
@@ -0,0 +1,160 @@
+import re
+from typing import List, Dict, Any, Optional
+import logging
+from .line_classifier import LineClassifier
+
+logger = logging.getLogger(__name__)
+
+class ExtractedMarkup:
+    """Cue text with its formatting tags lifted out"""
+    
+    __slots__ = ('original', 'core', 'prefix', 'suffix', 'inline_tags', 'passthrough')
+    
+    def __init__(self, original: str, core: str, prefix: str = '', suffix: str = '',
+                 inline_tags: Optional[List[str]] = None, passthrough: bool = False):
+        self.original = original
+        self.core = core
+        self.prefix = prefix
+        self.suffix = suffix
+        self.inline_tags = inline_tags or []
+        self.passthrough = passthrough
+
+class MarkupBatch:
+    """A batch of cue texts prepared for translation"""
+    
+    def __init__(self, tokenizer: 'MarkupTokenizer', extracted: List[ExtractedMarkup]):
+        self.tokenizer = tokenizer
+        self.extracted = extracted
+        self.pending = [i for i, item in enumerate(extracted) if not item.passthrough]
+    
+    @property
+    def texts(self) -> List[str]:
+        """Clean texts that still need translation"""
+        return [self.extracted[i].core for i in self.pending]
+    
+    @property
+    def skipped(self) -> int:
+        """Number of lines that bypass translation"""
+        return len(self.extracted) - len(self.pending)
+    
+    def restore(self, translations: List[str]) -> List[str]:
+        """Merge translations of pending texts back with their markup"""
+        results = [item.original for item in self.extracted]
+        for position, translated in zip(self.pending, translations):
+            results[position] = self.tokenizer.restore(translated, self.extracted[position])
+        return results
+
+class MarkupTokenizer:
+    """
+    Strip subtitle formatting before translation and reinsert it afterwards
+
+    Tags wrapping the whole cue (e.g. ``<i>...</i>`` or ``{\\an8}``) are kept
+    aside without sending anything to the model. Tags inside the text are
+    replaced by short ``{n}`` placeholders. Cues that are only markup, music
+    notes or a bracketed sound effect bypass translation entirely, as do
+    cues the optional line classifier reports as untranslatable.
+    """
+    
+    # HTML-style tags (<i>, </font>, <font color="...">) and ASS override blocks ({\an8})
+    TAG_PATTERN = re.compile(r'</?[a-zA-Z][^<>]*>|\{\\[^{}]*\}')
+    LEADING_TAGS = re.compile(r'^(?:\s*(?:</?[a-zA-Z][^<>]*>|\{\\[^{}]*\}))+\s*')
+    TRAILING_TAGS = re.compile(r'\s*(?:(?:</?[a-zA-Z][^<>]*>|\{\\[^{}]*\})\s*)+$')
+    PLACEHOLDER_PATTERN = re.compile(r'\{(\d+)\}')
+    SFX_PATTERN = re.compile(r'^\s*(?:\[([^\[\]]*)\]|\(([^()]*)\))\s*$')
+    SENTENCE_PUNCTUATION = re.compile(r'[.,;:?!¿¡]')
+    SFX_MAX_WORDS = 4
+    NON_LINGUISTIC_PATTERN = re.compile(r'^[\s♪♫♬♩#*~\-–—.…,!?]*$')
+    
+    def __init__(self, classifier: Optional[LineClassifier] = None):
+        self.classifier = classifier
+    
+    def extract(self, text: str) -> ExtractedMarkup:
+        """Lift formatting tags out of a cue text"""
+        if not text or self.PLACEHOLDER_PATTERN.search(text):
+            # متن شامل الگوی placeholder است؛ بدون تغییر ارسال می‌شود
+            return ExtractedMarkup(text, text, passthrough=self._is_passthrough(text or ''))
+        
+        prefix_match = self.LEADING_TAGS.match(text)
+        prefix = prefix_match.group(0) if prefix_match else ''
+        remainder = text[len(prefix):]
+        
+        suffix_match = self.TRAILING_TAGS.search(remainder)
+        suffix = suffix_match.group(0) if suffix_match else ''
+        body = remainder[:len(remainder) - len(suffix)] if suffix else remainder
+        
+        inline_tags: List[str] = []
+        
+        def to_placeholder(match: re.Match) -> str:
+            inline_tags.append(match.group(0))
+            return f"{{{len(inline_tags) - 1}}}"
+        
+        core = self.TAG_PATTERN.sub(to_placeholder, body)
+        passthrough = self._is_passthrough(self.PLACEHOLDER_PATTERN.sub('', core))
+        return ExtractedMarkup(text, core, prefix, suffix, inline_tags, passthrough)
+    
+    def restore(self, translated: str, extracted: ExtractedMarkup) -> str:
+        """Reinsert the markup of a cue into its translation"""
+        if extracted.passthrough:
+            return extracted.original
+        
+        used = set()
+        
+        def from_placeholder(match: re.Match) -> str:
+            index = int(match.group(1))
+            if index < len(extracted.inline_tags) and index not in used:
+                used.add(index)
+                return extracted.inline_tags[index]
+            return ''
+        
+        body = self.PLACEHOLDER_PATTERN.sub(from_placeholder, translated.strip()) if extracted.inline_tags else translated.strip()
+        
+        # تگ‌هایی که مدل حذف کرده: بازکننده‌ها به ابتدا و بسته‌کننده‌ها به انتها
+        missing = [extracted.inline_tags[i] for i in range(len(extracted.inline_tags)) if i not in used]
+        if missing:
+            logger.debug(f"Restoring {len(missing)} dropped tags for: {extracted.original[:50]}")
+            opening = ''.join(tag for tag in missing if not tag.startswith('</'))
+            closing = ''.join(tag for tag in missing if tag.startswith('</'))
+            body = f"{opening}{body}{closing}"
+        
+        return f"{extracted.prefix}{body}{extracted.suffix}"
+    
+    def prepare_batch(self, texts: List[str]) -> MarkupBatch:
+        """Extract markup from a list of cue texts"""
+        return MarkupBatch(self, [self.extract(text) for text in texts])
+    
+    def _is_passthrough(self, text: str) -> bool:
+        """Check whether a tag-free text has nothing to translate"""
+        if self.NON_LINGUISTIC_PATTERN.match(text) or self._is_sound_effect(text):
+            return True
+        return bool(self.classifier and not self.classifier.needs_translation(text))
+    
+    def _is_sound_effect(self, text: str) -> bool:
+        """
+        Check whether a bracketed cue is a sound effect rather than dialogue
+
+        Only short descriptions without sentence punctuation, all-caps
+        captions and music-marked lines count; a parenthesized sentence such
+        as an aside or a whisper is still translated.
+        """
+        match = self.SFX_PATTERN.match(text)
+        if not match:
+            return False
+        content = (match.group(1) if match.group(1) is not None else match.group(2)).strip()
+        if not content or any(note in content for note in '♪♫♬♩'):
+            return True
+        if content.isupper():
+            return True
+        return len(content.split()) <= self.SFX_MAX_WORDS and not self.SENTENCE_PUNCTUATION.search(content)
+    
+    def get_token_savings(self, texts: List[str]) -> Dict[str, Any]:
+        """Characters removed from the model input by markup extraction"""
+        batch = self.prepare_batch(texts)
+        original_chars = sum(len(text) for text in texts)
+        sent_chars = sum(len(text) for text in batch.texts)
+        return {
+            'lines': len(texts),
+            'skipped_lines': batch.skipped,
+            'original_chars': original_chars,
+            'sent_chars': sent_chars,
+            'saved_chars': original_chars - sent_chars
+        }
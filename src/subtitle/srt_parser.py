@@ -1,5 +1,6 @@
+import codecs
 import pysrt
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 import logging
 import os
 from datetime import timedelta
@@ -10,6 +11,9 @@ logger = logging.getLogger(__name__)
 class SRTParser:
     """Parser for SRT subtitle files with precise timing management"""
     
+    # بایت‌های ابتدای فایل که برای تشخیص کدگذاری خوانده می‌شوند
+    ENCODING_SNIFF_BYTES = 64 * 1024
+    
     def __init__(self):
         self.subtitles = None
         self.original_encoding = 'utf-8'
@@ -34,25 +38,7 @@ class SRTParser:
                 raise Exception("Could not parse SRT file with any supported encoding")
             
             # Convert to our internal format with precise timing
-            parsed_subtitles = []
-            for i, subtitle in enumerate(self.subtitles):
-                # تولید خط تایمینگ
-                timing_line = f"{self._time_to_string(subtitle.start)} --> {self._time_to_string(subtitle.end)}"
-                
-                # تجزیه دقیق تایمینگ
-                timing_info = self.timing_manager.parse_timing_line(timing_line)
-                
-                subtitle_entry = {
-                    'index': subtitle.index,
-                    'start_time': self._time_to_string(subtitle.start),
-                    'end_time': self._time_to_string(subtitle.end),
-                    'text': subtitle.text.replace('\n', ' ').strip(),  # Clean up line breaks
-                    'original_text': subtitle.text,  # Keep original for reference
-                    'timing_info': timing_info,  # اطلاعات دقیق تایمینگ
-                    'original_timing_line': timing_line  # خط تایمینگ اصلی
-                }
-                
-                parsed_subtitles.append(subtitle_entry)
+            parsed_subtitles = [self._to_entry(subtitle) for subtitle in self.subtitles]
             
             # اعتبارسنجی تایمینگ
             timing_errors = self.timing_manager.validate_timing_sequence(parsed_subtitles)
@@ -73,6 +59,68 @@ class SRTParser:
             logger.error(f"Failed to parse SRT file: {str(e)}")
             raise Exception(f"SRT parsing failed: {str(e)}")
     
+    def iter_file(self, file_path: str, batch_size: int = 10) -> Iterator[List[Dict[str, Any]]]:
+        """Parse SRT file lazily and yield subtitle entries in batches of batch_size"""
+        try:
+            encoding = self._detect_encoding(file_path)
+            batch = []
+            
+            with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+                for subtitle in pysrt.stream(f):
+                    batch.append(self._to_entry(subtitle))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+            
+            if batch:
+                yield batch
+        
+        except Exception as e:
+            logger.error(f"Failed to stream SRT file: {str(e)}")
+            raise Exception(f"SRT parsing failed: {str(e)}")
+    
+    def count_entries(self, file_path: str) -> int:
+        """Count subtitle entries cheaply by their timing lines"""
+        encoding = self._detect_encoding(file_path)
+        # متن زیرنویس ممکن است خودش شامل «-->» باشد؛ فقط خطوط زمان‌بندی کامل شمرده می‌شوند
+        time_pattern = self.timing_manager.time_pattern
+        with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+            return sum(1 for line in f if time_pattern.match(line.strip()))
+    
+    def _detect_encoding(self, file_path: str) -> str:
+        """Find the first supported encoding that decodes the start of the file"""
+        with open(file_path, 'rb') as f:
+            raw = f.read(self.ENCODING_SNIFF_BYTES)
+        
+        for encoding in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
+            try:
+                # کاراکتر چندبایتی بریده شده در انتهای نمونه خطا محسوب نمی‌شود
+                codecs.getincrementaldecoder(encoding)().decode(raw, final=False)
+                self.original_encoding = encoding
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        
+        raise Exception("Could not parse SRT file with any supported encoding")
+    
+    def _to_entry(self, subtitle) -> Dict[str, Any]:
+        """Convert a pysrt item to our internal format with precise timing"""
+        # تولید خط تایمینگ
+        timing_line = f"{self._time_to_string(subtitle.start)} --> {self._time_to_string(subtitle.end)}"
+        
+        # تجزیه دقیق تایمینگ
+        timing_info = self.timing_manager.parse_timing_line(timing_line)
+        
+        return {
+            'index': subtitle.index,
+            'start_time': self._time_to_string(subtitle.start),
+            'end_time': self._time_to_string(subtitle.end),
+            'text': subtitle.text.replace('\n', ' ').strip(),  # Clean up line breaks
+            'original_text': subtitle.text,  # Keep original for reference
+            'timing_info': timing_info,  # اطلاعات دقیق تایمینگ
+            'original_timing_line': timing_line  # خط تایمینگ اصلی
+        }
+    
     def create_srt_content(self, subtitles: List[Dict[str, Any]]) -> str:
         """Create SRT content from subtitle entries"""
         try:
@@ -1,5 +1,17 @@
 from .base import BaseTranslator
 from .openai_translator import OpenAITranslator
+from .cascade_translator import CascadeTranslator
 from .translator_factory import TranslatorFactory
+from .client_pool import ClientRegistry, get_client_registry
+from .metrics import TranslatorMetrics
+from .estimator import JobEstimator
+from .translation_memory import TranslationMemory, get_translation_memory
+from .dispatcher import PriorityDispatcher, JobFlow, PRIORITY_INTERACTIVE, PRIORITY_PREMIUM, PRIORITY_FREE
+from .deadline import Deadline
+from .prompts import PromptTemplate
+from .bulk import BulkBackend, OpenAIBulkBackend, LocalBulkBackend, BulkTranslator
 
-__all__ = ['BaseTranslator', 'OpenAITranslator', 'TranslatorFactory']
\ No newline at end of file
+__all__ = ['BaseTranslator', 'OpenAITranslator', 'CascadeTranslator', 'TranslatorFactory', 'ClientRegistry', 'get_client_registry',
+           'TranslatorMetrics', 'JobEstimator', 'TranslationMemory', 'get_translation_memory',
+           'PriorityDispatcher', 'JobFlow', 'PRIORITY_INTERACTIVE', 'PRIORITY_PREMIUM', 'PRIORITY_FREE', 'Deadline', 'PromptTemplate',
+           'BulkBackend', 'OpenAIBulkBackend', 'LocalBulkBackend', 'BulkTranslator']
\ No newline at end of file
@@ -1,7 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Iterable, Tuple, Optional
+import asyncio
 import hashlib
-from cachetools import TTLCache, cachedmethod
+import time
+from contextlib import asynccontextmanager
+from cachetools import TTLCache
+from .metrics import TranslatorMetrics
+from .batch_tuner import BatchSizeTuner
+from .dispatcher import PriorityDispatcher, JobFlow, PRIORITY_PREMIUM, current_flow
+from .tokens import estimate_tokens
+from .deadline import Deadline
 
 class BaseTranslator(ABC):
     """Base class for all translation providers with caching"""
@@ -9,49 +17,235 @@ class BaseTranslator(ABC):
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.cache = TTLCache(maxsize=1000, ttl=3600)  # Cache for 1 hour
+        self.batch_tuner = BatchSizeTuner(
+            config.get('batch_size', 10),
+            config.get('min_batch_size'),
+            config.get('max_batch_size'),
+            target_p95_seconds=config.get('target_p95_latency_seconds', 30.0)
+        )
+        self.max_concurrency = max(1, int(config.get('max_concurrency', 5)))
+        self.dispatcher = PriorityDispatcher(self.max_concurrency)
+        self.metrics = TranslatorMetrics()
+        self.hedge_requests = bool(config.get('hedge_requests', False))
+        self.hedge_budget_ratio = float(config.get('hedge_budget_ratio', 0.05))
+        self.request_timeout = config.get('timeout_seconds')
+        self.memory = None
+        self._users = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+    
+    @property
+    def batch_size(self) -> int:
+        """Lines packed per provider request, tuned online when bounds allow"""
+        return self.batch_tuner.batch_size
+    
+    def set_memory(self, memory):
+        """Attach a translation memory consulted before any provider request"""
+        self.memory = memory
+    
+    @asynccontextmanager
+    async def in_use(self):
+        """Mark the translator busy for the duration of a job so ``wait_idle`` waits for it"""
+        self._users += 1
+        self._idle.clear()
+        try:
+            yield self
+        finally:
+            self._users -= 1
+            if not self._users:
+                self._idle.set()
+    
+    async def wait_idle(self):
+        """Wait until no job or request is using the translator"""
+        await self._idle.wait()
     
     def _get_cache_key(self, text: str, target_language: str) -> str:
         """Generate cache key"""
         return hashlib.md5(f"{text}_{target_language}".encode()).hexdigest()
     
-    @cachedmethod(lambda self: self.cache, key=lambda self, text, target_language: self._get_cache_key(text, target_language))
+    def prime_cache(self, pairs: Iterable[Tuple[str, str]], target_language: str) -> int:
+        """Seed the cache with known (source, translation) pairs; returns the number stored"""
+        primed = 0
+        for source, translation in pairs:
+            self.cache[self._get_cache_key(source, target_language)] = translation
+            primed += 1
+        return primed
+    
     async def translate_text(self, text: str, target_language: str = "Persian") -> str:
         """Translate a single text string with caching"""
-        return await self._translate_text_impl(text, target_language)
+        key = self._get_cache_key(text, target_language)
+        if key in self.cache:
+            return self.cache[key]
+        
+        async with self.in_use():
+            translated = await self._translate_text_impl(text, target_language)
+        self.cache[key] = translated
+        return translated
     
     @abstractmethod
     async def _translate_text_impl(self, text: str, target_language: str) -> str:
         """Implementation of text translation"""
         pass
     
-    async def translate_batch(self, texts: List[str], target_language: str = "Persian") -> List[str]:
+    async def translate_batch(self, texts: List[str], target_language: str = "Persian",
+                              priority: int = PRIORITY_PREMIUM, deadline: Optional[Deadline] = None,
+                              flow: Optional[JobFlow] = None) -> List[str]:
         """Translate multiple text strings in batch with caching"""
-        translated = []
-        uncached_texts = []
-        uncached_indices = []
+        translated = list(texts)
+        async with self.in_use():
+            async for index, translation in self.translate_stream(texts, target_language, priority, deadline, flow):
+                translated[index] = translation
+        return translated
+    
+    async def translate_stream(self, texts: List[str], target_language: str = "Persian",
+                               priority: int = PRIORITY_PREMIUM,
+                               deadline: Optional[Deadline] = None,
+                               flow: Optional[JobFlow] = None) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Translate texts and yield (index, translation) pairs as each batch completes
+
+        Cached lines and translation memory hits are yielded first, duplicate
+        lines are translated once and the remaining unique lines are packed
+        into batches of ``batch_size``. Requests take slots from the
+        translator-wide dispatcher, which keeps at most ``max_concurrency``
+        in flight across all callers and serves higher priority lanes first;
+        within a lane the batches of each job's ``flow`` get a weighted fair
+        share of the slots.
+        
+        Every request is bounded by ``timeout_seconds`` and by the time left
+        on the job's ``deadline``; running out raises TimeoutError.
+        """
+        pending: Dict[str, List[int]] = {}
         
         for i, text in enumerate(texts):
             key = self._get_cache_key(text, target_language)
             if key in self.cache:
-                translated.append(self.cache[key])
+                yield i, self.cache[key]
             else:
-                uncached_texts.append(text)
-                uncached_indices.append(i)
+                pending.setdefault(text, []).append(i)
         
-        if uncached_texts:
-            batch_translated = await self._translate_batch_impl(uncached_texts, target_language)
-            for idx, trans in zip(uncached_indices, batch_translated):
-                key = self._get_cache_key(texts[idx], target_language)
-                self.cache[key] = trans
-                translated.insert(idx, trans)  # Note: this assumes translated is built in order
+        if pending and self.memory is not None:
+            unseen = list(pending.keys())
+            for position, translation in self.memory.lookup_batch(unseen, target_language).items():
+                text = unseen[position]
+                self.cache[self._get_cache_key(text, target_language)] = translation
+                for index in pending.pop(text):
+                    yield index, translation
         
-        return translated
+        if not pending:
+            return
+        
+        unique_texts = list(pending.keys())
+        batches = [
+            unique_texts[i:i + self.batch_size]
+            for i in range(0, len(unique_texts), self.batch_size)
+        ]
+        async def run_batch(batch: List[str]) -> Tuple[List[str], List[str]]:
+            if deadline is not None:
+                deadline.check()
+            async with self.dispatcher.slot(priority, flow, len(batch)):
+                if flow is not None:
+                    # مصرف توکن درخواست (و درخواست پشتیبان آن) به همین کار نسبت داده می‌شود
+                    flow.requests += 1
+                    current_flow.set(flow)
+                started = time.monotonic()
+                tokens = sum(estimate_tokens(text) for text in batch)
+                timeout = deadline.timeout(self.request_timeout) if deadline is not None else self.request_timeout
+                try:
+                    translations = await asyncio.wait_for(self._translate_with_hedge(batch, target_language), timeout)
+                except Exception:
+                    latency = time.monotonic() - started
+                    self.metrics.record_batch(len(batch), tokens, latency, success=False)
+                    self.batch_tuner.observe(len(batch), tokens, latency, success=False)
+                    raise
+                latency = time.monotonic() - started
+                # خطوط برگشتی بدون تغییر معمولاً نتیجه خطای تجزیه پاسخ هستند
+                unparsed = sum(1 for text, translated in zip(batch, translations) if translated.strip() == text.strip())
+                self.metrics.record_batch(len(batch), tokens, latency)
+                self.batch_tuner.observe(len(batch), tokens, latency, unparsed=unparsed)
+                return batch, translations
+        
+        tasks = [asyncio.create_task(run_batch(batch)) for batch in batches]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                batch, translations = await next_done
+                if self.memory is not None:
+                    self.memory.add_batch([
+                        (text, translation) for text, translation in zip(batch, translations)
+                        if translation.strip() != text.strip()
+                    ], target_language)
+                    if self.memory.flush_due:
+                        # نوشتن روی دیسک نباید حلقه رویداد را برای کارهای دیگر متوقف کند
+                        asyncio.get_running_loop().run_in_executor(None, self.memory.flush)
+                for text, translation in zip(batch, translations):
+                    self.cache[self._get_cache_key(text, target_language)] = translation
+                    for index in pending[text]:
+                        yield index, translation
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    async def _translate_with_hedge(self, texts: List[str], target_language: str) -> List[str]:
+        """
+        Send a batch, re-issuing it once if it runs past the p95 latency for its size
+
+        The first successful response wins and the other request is
+        cancelled. Hedges are capped at ``hedge_budget_ratio`` of all requests
+        and take a dispatcher slot of their own, so a hedge is skipped when
+        no slot is free instead of exceeding ``max_concurrency``.
+        """
+        delay = None
+        if self.hedge_requests and self.metrics.totals['hedges'] < self.hedge_budget_ratio * self.metrics.totals['requests']:
+            delay = self.metrics.latency_percentile_for_size(95, len(texts))
+        if delay is None:
+            return await self._translate_batch_impl(texts, target_language)
+        
+        primary = asyncio.create_task(self._translate_batch_impl(texts, target_language))
+        pending = {primary}
+        try:
+            # لغو در حین انتظار نباید درخواست اصلی را رها کند
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            
+            if not self.dispatcher.try_acquire():
+                return await primary
+            hedge = asyncio.create_task(self._hedge_batch_impl(texts, target_language))
+            hedge.add_done_callback(lambda _: self.dispatcher.release())
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                successful = [task for task in done if task.exception() is None]
+                if successful or not pending:
+                    winner = successful[0] if successful else done.pop()
+                    self.metrics.record_hedge(won=winner is hedge)
+                    return winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _hedge_batch_impl(self, texts: List[str], target_language: str) -> List[str]:
+        """Backend used for hedged requests; the same provider by default"""
+        return await self._translate_batch_impl(texts, target_language)
     
     @abstractmethod
     async def _translate_batch_impl(self, texts: List[str], target_language: str) -> List[str]:
         """Implementation of batch translation"""
         pass
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """Request metrics of the translator"""
+        return {**self.metrics.snapshot(), **self.batch_tuner.get_stats(), 'lanes': self.dispatcher.get_stats()}
+    
+    async def warm_up(self) -> Dict[str, Any]:
+        """Open provider connections ahead of the first request"""
+        return {}
+    
+    async def close(self):
+        """Release network resources held by the translator"""
+        pass
+    
     @abstractmethod
     def get_provider_name(self) -> str:
         """Return the name of the translation provider"""
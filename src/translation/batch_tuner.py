@@ -0,0 +1,87 @@
+from typing import Dict, Any, Optional, List
+
+class BatchSizeTuner:
+    """
+    Tune the number of lines packed per request from observed behaviour
+
+    After every ``window`` requests the tuner looks at the requests sent at
+    the current size. Errors, lines returned untranslated or a p95 latency
+    above the target shrink the size sharply. Otherwise it hill-climbs on
+    tokens per request-second, growing while throughput improves and
+    turning back when it drops. The size always stays within bounds.
+    """
+    
+    def __init__(self, initial: int = 10, min_size: Optional[int] = None, max_size: Optional[int] = None,
+                 window: int = 8, target_p95_seconds: float = 30.0, max_failure_rate: float = 0.1,
+                 step: float = 0.25):
+        initial = max(1, int(initial))
+        self.min_size = max(1, int(min_size or initial))
+        self.max_size = max(self.min_size, int(max_size or initial))
+        self.batch_size = min(self.max_size, max(self.min_size, initial))
+        self.window = window
+        self.target_p95_seconds = target_p95_seconds
+        self.max_failure_rate = max_failure_rate
+        self.step = step
+        
+        self.samples: List[Dict[str, Any]] = []
+        self.direction = 1
+        self.last_throughput: Optional[float] = None
+        self.adjustments = 0
+        self.last_reason = 'initial'
+    
+    @property
+    def adaptive(self) -> bool:
+        return self.min_size < self.max_size
+    
+    def observe(self, lines: int, tokens: int, latency_seconds: float, success: bool = True, unparsed: int = 0):
+        """Record one request sent at the current batch size"""
+        if not self.adaptive:
+            return
+        
+        self.samples.append({'lines': lines, 'tokens': tokens, 'latency': latency_seconds,
+                             'success': success, 'unparsed': unparsed})
+        if len(self.samples) >= self.window:
+            self._adjust()
+            self.samples.clear()
+    
+    def _adjust(self):
+        samples = self.samples
+        failure_rate = sum(1 for sample in samples if not sample['success']) / len(samples)
+        lines = sum(sample['lines'] for sample in samples if sample['success'])
+        unparsed_rate = sum(sample['unparsed'] for sample in samples) / lines if lines else 0.0
+        
+        latencies = sorted(sample['latency'] for sample in samples if sample['success'])
+        p95 = latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+        busy = sum(sample['latency'] for sample in samples if sample['success'])
+        throughput = sum(sample['tokens'] for sample in samples if sample['success']) / busy if busy else 0.0
+        
+        if failure_rate > self.max_failure_rate or unparsed_rate > self.max_failure_rate:
+            new_size = self.batch_size * (1 - 2 * self.step)
+            self.direction, self.last_throughput = -1, None
+            self.last_reason = 'failures'
+        elif p95 > self.target_p95_seconds:
+            new_size = self.batch_size * (1 - 2 * self.step)
+            self.direction, self.last_throughput = -1, None
+            self.last_reason = 'tail_latency'
+        else:
+            if self.last_throughput is not None and throughput < self.last_throughput * 0.97:
+                self.direction = -self.direction
+            self.last_throughput = throughput
+            new_size = self.batch_size * (1 + self.step * self.direction)
+            self.last_reason = 'throughput'
+        
+        new_size = min(self.max_size, max(self.min_size, int(round(new_size))))
+        if new_size == self.batch_size:
+            return
+        
+        self.batch_size = new_size
+        self.adjustments += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Current batch size and tuning state"""
+        return {
+            'batch_size': self.batch_size,
+            'batch_size_bounds': [self.min_size, self.max_size],
+            'batch_adjustments': self.adjustments,
+            'batch_adjustment_reason': self.last_reason
+        }
@@ -0,0 +1,258 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from .prompts import PromptTemplate
+
+logger = logging.getLogger(__name__)
+
+BULK_PENDING = 'pending'
+BULK_COMPLETED = 'completed'
+BULK_FAILED = 'failed'
+
+class BulkBackend(ABC):
+    """
+    Offline batch endpoint that accepts many chat requests at once
+
+    A submitted batch is answered some time later; the caller polls its
+    state and fetches the replies keyed by each request's ``custom_id``.
+    """
+    
+    @abstractmethod
+    async def submit(self, requests: List[Dict[str, Any]]) -> str:
+        """Submit ``{'custom_id', 'messages'}`` requests and return the batch id"""
+        pass
+    
+    @abstractmethod
+    async def poll(self, batch_id: str) -> str:
+        """Return BULK_PENDING, BULK_COMPLETED or BULK_FAILED"""
+        pass
+    
+    @abstractmethod
+    async def fetch_results(self, batch_id: str) -> Dict[str, str]:
+        """Reply text of every answered request, keyed by custom_id"""
+        pass
+    
+    async def cancel(self, batch_id: str):
+        """Stop a batch that is no longer needed"""
+        pass
+    
+    @staticmethod
+    def parse_output(content: str) -> Dict[str, str]:
+        """Read a batch output file in the chat completions batch format"""
+        results = {}
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                body = (record.get('response') or {}).get('body') or {}
+                choices = body.get('choices') or []
+                if choices:
+                    results[record['custom_id']] = choices[0]['message']['content']
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Skipping malformed batch output line: {str(e)}")
+        return results
+
+class OpenAIBulkBackend(BulkBackend):
+    """OpenAI Batch API: JSONL upload, 24h completion window, output file download"""
+    
+    STATES = {
+        'completed': BULK_COMPLETED,
+        'failed': BULK_FAILED,
+        'expired': BULK_FAILED,
+        'cancelling': BULK_FAILED,
+        'cancelled': BULK_FAILED
+    }
+    
+    def __init__(self, client, model: str, max_tokens: int = 4000, temperature: float = 0.3):
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+    
+    async def submit(self, requests: List[Dict[str, Any]]) -> str:
+        lines = [
+            json.dumps({
+                'custom_id': request['custom_id'],
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {
+                    'model': self.model,
+                    'messages': request['messages'],
+                    'max_tokens': self.max_tokens,
+                    'temperature': self.temperature
+                }
+            }, ensure_ascii=False)
+            for request in requests
+        ]
+        upload = await self.client.files.create(
+            file=('subtitles.jsonl', '\n'.join(lines).encode('utf-8')),
+            purpose='batch'
+        )
+        batch = await self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        return batch.id
+    
+    async def poll(self, batch_id: str) -> str:
+        batch = await self.client.batches.retrieve(batch_id)
+        return self.STATES.get(batch.status, BULK_PENDING)
+    
+    async def fetch_results(self, batch_id: str) -> Dict[str, str]:
+        batch = await self.client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            return {}
+        content = await self.client.files.content(batch.output_file_id)
+        return self.parse_output(content.text)
+    
+    async def cancel(self, batch_id: str):
+        await self.client.batches.cancel(batch_id)
+
+class LocalBulkBackend(BulkBackend):
+    """
+    File-based stand-in for a batch endpoint
+
+    Requests are written to ``<id>.input.jsonl``. The first poll answers
+    them with ``respond`` and writes ``<id>.output.jsonl`` in the same format
+    as the hosted endpoint; a request whose response raises is left out.
+    """
+    
+    def __init__(self, directory: str, respond: Callable[[List[Dict[str, str]]], Awaitable[str]]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.respond = respond
+    
+    async def submit(self, requests: List[Dict[str, Any]]) -> str:
+        batch_id = uuid.uuid4().hex[:16]
+        with open(self.directory / f"{batch_id}.input.jsonl", 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(request, ensure_ascii=False) + '\n' for request in requests))
+        return batch_id
+    
+    async def poll(self, batch_id: str) -> str:
+        output_path = self.directory / f"{batch_id}.output.jsonl"
+        if output_path.exists():
+            return BULK_COMPLETED
+        
+        input_path = self.directory / f"{batch_id}.input.jsonl"
+        if not input_path.exists():
+            return BULK_FAILED
+        
+        lines = []
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                request = json.loads(line)
+                try:
+                    content = await self.respond(request['messages'])
+                except Exception as e:
+                    logger.warning(f"Local batch request {request['custom_id']} failed: {str(e)}")
+                    continue
+                lines.append(json.dumps({
+                    'custom_id': request['custom_id'],
+                    'response': {'body': {'choices': [{'message': {'content': content}}]}}
+                }, ensure_ascii=False))
+        
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        return BULK_COMPLETED
+    
+    async def fetch_results(self, batch_id: str) -> Dict[str, str]:
+        output_path = self.directory / f"{batch_id}.output.jsonl"
+        if not output_path.exists():
+            return {}
+        with open(output_path, 'r', encoding='utf-8') as f:
+            return self.parse_output(f.read())
+
+class BulkTranslator:
+    """
+    Translate a whole job through an offline batch endpoint
+
+    Unique lines are packed into compact numbered requests, submitted as a
+    single batch and polled until the endpoint finishes. Only lines that
+    came back translated are returned, so the caller can send the rest
+    through the regular online path.
+    """
+    
+    def __init__(self, backend: BulkBackend, batch_size: int = 40, poll_interval: float = 60.0,
+                 max_wait_seconds: float = 24 * 3600, prompts: Optional[PromptTemplate] = None):
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.max_wait_seconds = max_wait_seconds
+        self.prompts = prompts or PromptTemplate()
+        self.stats = {'batches': 0, 'requests': 0, 'lines': 0, 'translated_lines': 0, 'failed_batches': 0}
+    
+    async def translate(self, texts: List[str], target_language: str) -> Dict[str, str]:
+        """
+        Translate texts in one offline batch
+
+        Returns:
+            Source text -> translation for every line the batch translated
+        """
+        unique_texts = list(dict.fromkeys(text for text in texts if text))
+        if not unique_texts:
+            return {}
+        
+        packed = [unique_texts[i:i + self.batch_size] for i in range(0, len(unique_texts), self.batch_size)]
+        requests = [
+            {'custom_id': str(number), 'messages': self.prompts.batch_messages(batch, target_language)}
+            for number, batch in enumerate(packed)
+        ]
+        batch_id = await self.backend.submit(requests)
+        self.stats['batches'] += 1
+        self.stats['requests'] += len(requests)
+        self.stats['lines'] += len(unique_texts)
+        logger.info(f"Submitted bulk batch {batch_id}: {len(unique_texts)} lines in {len(requests)} requests")
+        
+        try:
+            state = await self._wait(batch_id)
+        except asyncio.CancelledError:
+            await self._cancel_quietly(batch_id)
+            raise
+        
+        if state != BULK_COMPLETED:
+            self.stats['failed_batches'] += 1
+            raise Exception(f"Bulk batch {batch_id} did not complete ({state})")
+        
+        replies = await self.backend.fetch_results(batch_id)
+        translations = {}
+        for number, batch in enumerate(packed):
+            reply = replies.get(str(number))
+            if not reply:
+                continue
+            for text, translated in zip(batch, self.prompts.parse_batch(reply, batch)):
+                # خطوط بدون ترجمه برای مسیر آنلاین باقی می‌مانند
+                if translated.strip() != text.strip():
+                    translations[text] = translated
+        
+        self.stats['translated_lines'] += len(translations)
+        logger.info(f"Bulk batch {batch_id} translated {len(translations)}/{len(unique_texts)} lines")
+        return translations
+    
+    async def _wait(self, batch_id: str) -> str:
+        """Poll the batch until it finishes or the wait limit passes"""
+        started = time.monotonic()
+        while True:
+            state = await self.backend.poll(batch_id)
+            if state != BULK_PENDING:
+                return state
+            if time.monotonic() - started >= self.max_wait_seconds:
+                await self._cancel_quietly(batch_id)
+                return BULK_FAILED
+            await asyncio.sleep(self.poll_interval)
+    
+    async def _cancel_quietly(self, batch_id: str):
+        try:
+            await self.backend.cancel(batch_id)
+        except Exception as e:
+            logger.warning(f"Failed to cancel bulk batch {batch_id}: {str(e)}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Batches submitted and lines answered"""
+        return dict(self.stats)
\ No newline at end of file
@@ -0,0 +1,143 @@
+from typing import List, Dict, Any
+import asyncio
+import logging
+import re
+import time
+from .base import BaseTranslator
+from .openai_translator import OpenAITranslator
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+FAST_TIER = 'fast'
+PREMIUM_TIER = 'premium'
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+CLAUSE_PATTERN = re.compile(r'[,;:"“”—–]|\.\.\.|…')
+
+def score_complexity(text: str) -> float:
+    """Score how hard a subtitle line is to translate, from 0 (trivial) to 1"""
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return 0.0
+    
+    length = min(1.0, estimate_tokens(text) / 25)
+    clauses = min(1.0, len(CLAUSE_PATTERN.findall(text)) / 3)
+    # کلمات بلند و اسامی خاص وسط جمله معمولاً نیاز به مدل قوی‌تر دارند
+    rare = sum(1 for i, word in enumerate(words) if len(word) >= 9 or (i > 0 and word[0].isupper() and word != 'I'))
+    return round(0.5 * length + 0.25 * clauses + 0.25 * min(1.0, rare / len(words) * 2), 3)
+
+class CascadeTranslator(BaseTranslator):
+    """
+    Route easy lines to a fast model and complex lines to the premium model
+
+    Each packed batch is split by a local complexity score. Lines the fast
+    model returns untranslated, or whole fast batches that fail, are retried
+    on the premium model.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.premium_model = config.get('model', 'gpt-3.5-turbo')
+        self.fast_model = config.get('fast_model', 'gpt-4o-mini')
+        self.complexity_threshold = float(config.get('complexity_threshold', 0.45))
+        self.tiers = {
+            FAST_TIER: self._create_tier(self.fast_model),
+            PREMIUM_TIER: self._create_tier(self.premium_model)
+        }
+        self.routed = {FAST_TIER: 0, PREMIUM_TIER: 0}
+        self.escalated = 0
+    
+    def _create_tier(self, model: str) -> BaseTranslator:
+        """Create the translator serving one tier"""
+        return OpenAITranslator({**self.config, 'model': model})
+    
+    def route(self, text: str) -> str:
+        """Pick the tier for a line"""
+        return PREMIUM_TIER if score_complexity(text) >= self.complexity_threshold else FAST_TIER
+    
+    async def _translate_on_tier(self, tier: str, texts: List[str], target_language: str) -> List[str]:
+        """Translate a group of lines on one tier and record its metrics"""
+        translator = self.tiers[tier]
+        started = time.monotonic()
+        tokens = sum(estimate_tokens(text) for text in texts)
+        try:
+            translations = await translator._translate_batch_impl(texts, target_language)
+        except Exception:
+            translator.metrics.record_batch(len(texts), tokens, time.monotonic() - started, success=False)
+            raise
+        translator.metrics.record_batch(len(texts), tokens, time.monotonic() - started)
+        self.routed[tier] += len(texts)
+        return translations
+    
+    async def _translate_fast(self, texts: List[str], target_language: str) -> List[str]:
+        """Translate on the fast tier, escalating lines it could not handle"""
+        try:
+            translations = await self._translate_on_tier(FAST_TIER, texts, target_language)
+        except Exception as e:
+            logger.warning(f"Fast tier failed for {len(texts)} lines, escalating: {str(e)}")
+            self.escalated += len(texts)
+            return await self._translate_on_tier(PREMIUM_TIER, texts, target_language)
+        
+        # خطوطی که بدون ترجمه برگشته‌اند به مدل اصلی ارسال می‌شوند
+        retry = [i for i, (text, translated) in enumerate(zip(texts, translations)) if translated.strip() == text.strip()]
+        if retry:
+            self.escalated += len(retry)
+            retried = await self._translate_on_tier(PREMIUM_TIER, [texts[i] for i in retry], target_language)
+            for i, translated in zip(retry, retried):
+                translations[i] = translated
+        return translations
+    
+    async def _translate_text_impl(self, text: str, target_language: str) -> str:
+        """Translate a single line on the tier chosen by its complexity"""
+        return (await self._translate_batch_impl([text], target_language))[0]
+    
+    async def _translate_batch_impl(self, texts: List[str], target_language: str) -> List[str]:
+        """Split a packed batch by complexity and translate both groups concurrently"""
+        groups: Dict[str, List[int]] = {FAST_TIER: [], PREMIUM_TIER: []}
+        for i, text in enumerate(texts):
+            groups[self.route(text)].append(i)
+        
+        jobs = {}
+        if groups[FAST_TIER]:
+            jobs[FAST_TIER] = self._translate_fast([texts[i] for i in groups[FAST_TIER]], target_language)
+        if groups[PREMIUM_TIER]:
+            jobs[PREMIUM_TIER] = self._translate_on_tier(PREMIUM_TIER, [texts[i] for i in groups[PREMIUM_TIER]], target_language)
+        
+        results = dict(zip(jobs.keys(), await asyncio.gather(*jobs.values())))
+        
+        translated = list(texts)
+        for tier, translations in results.items():
+            for i, translation in zip(groups[tier], translations):
+                translated[i] = translation
+        return translated
+    
+    async def _hedge_batch_impl(self, texts: List[str], target_language: str) -> List[str]:
+        """Hedge a slow batch on the premium tier alone"""
+        return await self._translate_on_tier(PREMIUM_TIER, texts, target_language)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Overall metrics plus routing and per-tier measurements"""
+        return {
+            **super().get_metrics(),
+            'routed_lines': dict(self.routed),
+            'escalated_lines': self.escalated,
+            'tiers': {
+                tier: {'model': self.fast_model if tier == FAST_TIER else self.premium_model,
+                       **translator.get_metrics()}
+                for tier, translator in self.tiers.items()
+            }
+        }
+    
+    async def warm_up(self) -> Dict[str, Any]:
+        """Warm up the connections of both tiers"""
+        return {tier: await translator.warm_up() for tier, translator in self.tiers.items()}
+    
+    async def close(self):
+        """Close the translators of both tiers"""
+        for translator in self.tiers.values():
+            await translator.close()
+    
+    def get_provider_name(self) -> str:
+        """Return the name of the translation provider"""
+        return f"Cascade ({self.fast_model} → {self.premium_model})"
@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+class ClientRegistry:
+    """Registry of pooled OpenAI clients shared per (base_url, api_key)"""
+
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._clients: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._stats = {'created': 0, 'reused': 0, 'closed': 0}
+
+    def _make_key(self, api_key: str, base_url: Optional[str]) -> Tuple[str, str]:
+        """Build the registry key without keeping the raw API key around"""
+        key_digest = hashlib.sha256((api_key or '').encode()).hexdigest()[:16]
+        return (base_url or DEFAULT_BASE_URL).rstrip('/'), key_digest
+
+    def acquire(self, api_key: str, base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+        """Return a shared client for the endpoint, creating it on first use"""
+        key = self._make_key(api_key, base_url)
+        entry = self._clients.get(key)
+
+        if entry is not None:
+            entry['refs'] += 1
+            self._stats['reused'] += 1
+            return entry['client']
+
+        http_client = openai.DefaultAsyncHttpxClient(limits=self.limits)
+        client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+        self._clients[key] = {
+            'client': client,
+            'http_client': http_client,
+            'refs': 1,
+            'created_at': time.time()
+        }
+        self._stats['created'] += 1
+        logger.info(f"Created pooled OpenAI client for {key[0]} "
+                    f"(max_connections={self.limits.max_connections}, "
+                    f"keepalive={self.limits.max_keepalive_connections})")
+        return client
+
+    async def release(self, client: openai.AsyncOpenAI):
+        """Drop one reference to a client and close it once unused"""
+        for key, entry in list(self._clients.items()):
+            if entry['client'] is client:
+                entry['refs'] -= 1
+                if entry['refs'] <= 0:
+                    del self._clients[key]
+                    await self._close_entry(key, entry)
+                return
+
+    async def close_all(self):
+        """Close every pooled client regardless of outstanding references"""
+        entries = list(self._clients.items())
+        self._clients.clear()
+        for key, entry in entries:
+            await self._close_entry(key, entry)
+
+    async def _close_entry(self, key: Tuple[str, str], entry: Dict[str, Any]):
+        """Close the HTTP pool behind a registry entry"""
+        try:
+            await entry['client'].close()
+            self._stats['closed'] += 1
+            logger.info(f"Closed pooled OpenAI client for {key[0]}")
+        except Exception as e:
+            logger.error(f"Failed to close pooled client for {key[0]}: {str(e)}")
+
+    def _pool_connections(self, http_client: httpx.AsyncClient) -> Dict[str, int]:
+        """Inspect the transport pool for active and idle connection counts"""
+        pool = getattr(getattr(http_client, '_transport', None), '_pool', None)
+        connections = getattr(pool, 'connections', None) or []
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {
+            'connections': len(connections),
+            'idle': idle,
+            'active': len(connections) - idle
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return registry counters and per-endpoint pool usage"""
+        pools = []
+        for (base_url, _), entry in self._clients.items():
+            pools.append({
+                'base_url': base_url,
+                'references': entry['refs'],
+                'age_seconds': round(time.time() - entry['created_at'], 1),
+                **self._pool_connections(entry['http_client'])
+            })
+
+        return {
+            'clients': len(self._clients),
+            'max_connections': self.limits.max_connections,
+            'max_keepalive_connections': self.limits.max_keepalive_connections,
+            'keepalive_expiry': self.limits.keepalive_expiry,
+            **self._stats,
+            'pools': pools
+        }
+
+
+# سینگلتون برای استفاده در سراسر برنامه
+_client_registry = None
+
+def get_client_registry(max_connections: Optional[int] = None, max_keepalive_connections: Optional[int] = None,
+                        keepalive_expiry: Optional[float] = None) -> ClientRegistry:
+    """
+    Return the shared client registry (Singleton)
+
+    Pool limits only apply when the registry is created; omitted limits use
+    the defaults there and accept the existing registry afterwards. Limits
+    that differ from an existing registry are logged and ignored.
+    """
+    global _client_registry
+    requested = {
+        'max_connections': max_connections,
+        'max_keepalive_connections': max_keepalive_connections,
+        'keepalive_expiry': keepalive_expiry
+    }
+    if _client_registry is None:
+        _client_registry = ClientRegistry(**{name: value for name, value in requested.items() if value is not None})
+        return _client_registry
+
+    ignored = {
+        name: value for name, value in requested.items()
+        if value is not None and value != getattr(_client_registry.limits, name)
+    }
+    if ignored:
+        logger.warning(f"Client registry already created, ignoring pool limits {ignored}")
+    return _client_registry
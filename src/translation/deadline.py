@@ -0,0 +1,41 @@
+import time
+from typing import Optional
+
+class Deadline:
+    """
+    Point in time by which a whole translation job has to finish
+
+    The job creates one deadline and hands it down to every request. Each
+    provider call is bounded by the smaller of its own request timeout and
+    the time still left on the job, so a stuck call can never hold a job
+    past its deadline.
+    """
+    
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None without a limit"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+    
+    def timeout(self, request_timeout: Optional[float] = None) -> Optional[float]:
+        """Timeout for one request: the request timeout capped by the time left"""
+        remaining = self.remaining()
+        if remaining is None:
+            return request_timeout
+        if request_timeout is None:
+            return remaining
+        return min(request_timeout, remaining)
+    
+    def check(self):
+        """Raise TimeoutError once the deadline has passed"""
+        if self.expired:
+            raise TimeoutError(f"Job deadline of {self.seconds:.0f}s exceeded")
\ No newline at end of file
@@ -0,0 +1,160 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Tuple, Optional
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PREMIUM = 1
+PRIORITY_FREE = 2
+
+LANE_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_PREMIUM: 'premium',
+    PRIORITY_FREE: 'free'
+}
+
+class JobFlow:
+    """
+    Requests of one job, sharing slots with other jobs in proportion to ``weight``
+
+    The flow also counts the provider requests and tokens spent on its job,
+    unlike the translator metrics which are shared by every concurrent job.
+    """
+    
+    def __init__(self, job_id: str, weight: float = 1.0):
+        self.job_id = job_id
+        self.weight = max(weight, 0.01)
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+    
+    def record_usage(self, prompt_tokens: int, completion_tokens: int):
+        """Record token usage reported by the provider for a request of this job"""
+        self.prompt_tokens += prompt_tokens or 0
+        self.completion_tokens += completion_tokens or 0
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+# جریان کاری که درخواست فعلی برای آن ارسال می‌شود (در هر task جداگانه)
+current_flow: ContextVar[Optional[JobFlow]] = ContextVar('current_flow', default=None)
+
+class PriorityDispatcher:
+    """
+    Shared request slots for one translator, served by priority lane
+
+    At most ``capacity`` provider requests run at once across every caller
+    of the translator. When a slot frees up it goes to the waiting request
+    in the highest lane (lowest number), so interactive previews never
+    queue behind bulk batches.
+    
+    Within a lane requests are served by weighted fair queuing across jobs
+    (self-clocked). Each request of a ``JobFlow`` gets a finish tag of
+    ``max(virtual time, the job's previous tag) + cost / weight`` and the
+    lowest tag is served first, so a job with thousands of batches waiting
+    gets its weighted share of the slots instead of all of them and a small
+    job arriving later is interleaved at once. Requests without a flow are
+    tagged at the current virtual time, i.e. first come first served.
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.active = 0
+        self._waiters: List[Tuple[int, float, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self.virtual_time = 0.0
+        self._finish_tags: Dict[str, float] = {}
+        self.served = {lane: 0 for lane in LANE_NAMES}
+        self.wait_seconds = {lane: 0.0 for lane in LANE_NAMES}
+    
+    def _tag(self, flow: Optional[JobFlow], cost: float) -> float:
+        """Finish tag of the next request of a flow"""
+        if flow is None:
+            return self.virtual_time
+        start = max(self.virtual_time, self._finish_tags.get(flow.job_id, 0.0))
+        finish = start + max(cost, 1.0) / flow.weight
+        self._finish_tags[flow.job_id] = finish
+        return finish
+    
+    def _advance(self, tag: float):
+        self.virtual_time = max(self.virtual_time, tag)
+        if len(self._finish_tags) > 256:
+            # برچسب کارهای تمام شده دیگر از زمان مجازی جلوتر نیستند
+            self._finish_tags = {job_id: finish for job_id, finish in self._finish_tags.items()
+                                 if finish > self.virtual_time}
+    
+    async def acquire(self, priority: int = PRIORITY_PREMIUM, flow: Optional[JobFlow] = None, cost: float = 1.0):
+        """Wait for a request slot in the given lane; ``cost`` is the request's size (lines)"""
+        started = time.monotonic()
+        tag = self._tag(flow, cost)
+        if self.active < self.capacity and not self._has_waiters():
+            self.active += 1
+            self._advance(tag)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, tag, next(self._sequence), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                # اسلات واگذار شده ولی درخواست لغو شده است
+                if future.done() and not future.cancelled():
+                    self.release()
+                raise
+        
+        lane = priority if priority in self.served else PRIORITY_FREE
+        self.served[lane] += 1
+        self.wait_seconds[lane] += time.monotonic() - started
+    
+    def try_acquire(self) -> bool:
+        """Take a free slot without waiting; False when every slot is busy or requests are waiting"""
+        if self.active < self.capacity and not self._has_waiters():
+            self.active += 1
+            return True
+        return False
+    
+    def release(self):
+        """Free a slot and hand it to the highest waiting lane"""
+        self.active -= 1
+        while self._waiters and self.active < self.capacity:
+            _, tag, _, future = heapq.heappop(self._waiters)
+            if future.cancelled():
+                continue
+            self.active += 1
+            self._advance(tag)
+            future.set_result(None)
+    
+    def _has_waiters(self) -> bool:
+        while self._waiters and self._waiters[0][3].cancelled():
+            heapq.heappop(self._waiters)
+        return bool(self._waiters)
+    
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_PREMIUM, flow: Optional[JobFlow] = None, cost: float = 1.0):
+        """Hold a request slot for the duration of the block"""
+        await self.acquire(priority, flow, cost)
+        try:
+            yield
+        finally:
+            self.release()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Slot usage and per-lane queueing"""
+        waiting = {name: 0 for name in LANE_NAMES.values()}
+        for priority, _, _, future in self._waiters:
+            if not future.cancelled():
+                waiting[LANE_NAMES.get(priority, 'free')] += 1
+        return {
+            'capacity': self.capacity,
+            'active': self.active,
+            'waiting': waiting,
+            'virtual_time': round(self.virtual_time, 3),
+            'served': {LANE_NAMES[lane]: count for lane, count in self.served.items()},
+            'avg_wait_seconds': {
+                LANE_NAMES[lane]: round(self.wait_seconds[lane] / count, 3) if count else 0.0
+                for lane, count in self.served.items()
+            }
+        }
@@ -0,0 +1,92 @@
+import math
+from typing import Iterable, Dict, Any, List
+from .base import BaseTranslator
+from .prompts import PromptTemplate
+
+class JobEstimator:
+    """
+    Predict requests, tokens, cost and duration of a translation job
+
+    The prediction mirrors ``BaseTranslator.translate_stream``: cached and
+    duplicate lines are dropped, the rest is packed into ``batch_size``
+    requests running ``max_concurrency`` at a time. Input tokens are measured
+    on the prompts those requests would send. Request duration comes from
+    the translator's measured throughput once it has samples.
+    """
+    
+    # Numbering of each line in the reply
+    LINE_OVERHEAD_TOKENS = 2
+    
+    def __init__(self, translator: BaseTranslator, input_price_per_1k: float = 0.0005,
+                 output_price_per_1k: float = 0.0015, output_token_ratio: float = 1.5,
+                 default_tokens_per_second: float = 50.0):
+        self.translator = translator
+        self.input_price_per_1k = input_price_per_1k
+        self.output_price_per_1k = output_price_per_1k
+        self.output_token_ratio = output_token_ratio
+        self.default_tokens_per_second = default_tokens_per_second
+        self.prompts = getattr(translator, 'prompts', None) or PromptTemplate()
+    
+    def estimate(self, texts: Iterable[str], target_language: str = "Persian") -> Dict[str, Any]:
+        """Estimate a job from the texts that will be sent for translation"""
+        total_lines = 0
+        unique_texts = set()
+        cached_lines = 0
+        
+        for text in texts:
+            total_lines += 1
+            if self.translator._get_cache_key(text, target_language) in self.translator.cache:
+                cached_lines += 1
+            else:
+                unique_texts.add(text)
+        
+        prompt = self.prompts.measure_job(list(unique_texts), target_language, self.translator.batch_size)
+        line_tokens = prompt['useful_tokens']
+        requests = prompt['requests']
+        
+        input_tokens = prompt['prompt_tokens']
+        output_tokens = math.ceil(line_tokens * self.output_token_ratio) + len(unique_texts) * self.LINE_OVERHEAD_TOKENS
+        cost = input_tokens / 1000 * self.input_price_per_1k + output_tokens / 1000 * self.output_price_per_1k
+        
+        measured = self.translator.metrics.tokens_per_second()
+        tokens_per_second = measured or self.default_tokens_per_second
+        request_seconds = (line_tokens / requests / tokens_per_second) if requests else 0.0
+        waves = math.ceil(requests / self.translator.max_concurrency)
+        
+        return {
+            'total_lines': total_lines,
+            'cached_lines': cached_lines,
+            'unique_lines': len(unique_texts),
+            'requests': requests,
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens,
+            'estimated_cost_usd': round(cost, 4),
+            'eta_seconds': round(waves * request_seconds, 1),
+            'throughput_source': 'measured' if measured else 'default'
+        }
+    
+    def estimate_languages(self, texts: List[str], target_languages: List[str]) -> Dict[str, Any]:
+        """
+        Estimate a job translated into several languages
+
+        Every language sends its own requests through the same translator
+        slots, so counts, cost and duration add up across languages. With no
+        target language nothing is sent and the estimate is zero.
+        """
+        if not target_languages:
+            combined = self.estimate([])
+            combined['total_lines'] = len(texts)
+            combined['target_languages'] = []
+            return combined
+        
+        estimates = [self.estimate(texts, language) for language in target_languages]
+        combined = dict(estimates[0])
+        for estimate in estimates[1:]:
+            for key, value in estimate.items():
+                if isinstance(value, (int, float)):
+                    combined[key] += value
+        combined['estimated_cost_usd'] = round(combined['estimated_cost_usd'], 4)
+        combined['eta_seconds'] = round(combined['eta_seconds'], 1)
+        combined['target_languages'] = list(target_languages)
+        return combined
\ No newline at end of file
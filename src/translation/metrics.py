@@ -0,0 +1,114 @@
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+class TranslatorMetrics:
+    """Rolling window of provider request measurements for one translator"""
+    
+    def __init__(self, window_size: int = 200):
+        self.samples = deque(maxlen=window_size)
+        self.totals = {
+            'requests': 0,
+            'failures': 0,
+            'lines': 0,
+            'estimated_tokens': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'useful_prompt_tokens': 0,
+            'prompt_overhead_tokens': 0,
+            'hedges': 0,
+            'hedge_wins': 0
+        }
+    
+    def record_batch(self, lines: int, estimated_tokens: int, latency_seconds: float, success: bool = True):
+        """Record one provider request"""
+        self.samples.append({
+            'time': time.time(),
+            'lines': lines,
+            'tokens': estimated_tokens,
+            'latency': latency_seconds,
+            'success': success
+        })
+        self.totals['requests'] += 1
+        self.totals['lines'] += lines
+        self.totals['estimated_tokens'] += estimated_tokens
+        if not success:
+            self.totals['failures'] += 1
+    
+    def record_usage(self, prompt_tokens: int, completion_tokens: int):
+        """Record token usage reported by the provider"""
+        self.totals['prompt_tokens'] += prompt_tokens or 0
+        self.totals['completion_tokens'] += completion_tokens or 0
+    
+    def record_prompt(self, useful_tokens: int, overhead_tokens: int):
+        """Record the estimated subtitle text and instruction tokens of a request prompt"""
+        self.totals['useful_prompt_tokens'] += useful_tokens
+        self.totals['prompt_overhead_tokens'] += overhead_tokens
+    
+    def prompt_overhead_ratio(self) -> Optional[float]:
+        """Prompt tokens spent on instructions and framing per token of subtitle text"""
+        useful = self.totals['useful_prompt_tokens']
+        if not useful:
+            return None
+        return self.totals['prompt_overhead_tokens'] / useful
+    
+    def record_hedge(self, won: bool):
+        """Record a hedged request and whether it beat the original"""
+        self.totals['hedges'] += 1
+        if won:
+            self.totals['hedge_wins'] += 1
+    
+    def _successful(self):
+        return [sample for sample in self.samples if sample['success']]
+    
+    @property
+    def has_samples(self) -> bool:
+        return bool(self._successful())
+    
+    def tokens_per_second(self) -> Optional[float]:
+        """Estimated tokens processed per second by a single request"""
+        samples = self._successful()
+        busy = sum(sample['latency'] for sample in samples)
+        if not samples or busy <= 0:
+            return None
+        return sum(sample['tokens'] for sample in samples) / busy
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Request latency percentile in seconds (0-100)"""
+        latencies = sorted(sample['latency'] for sample in self._successful())
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, max(0, int(round(percentile / 100 * (len(latencies) - 1)))))
+        return latencies[index]
+    
+    def latency_percentile_for_size(self, percentile: float, lines: int, min_samples: int = 10) -> Optional[float]:
+        """Latency percentile of requests with a similar number of lines"""
+        latencies = sorted(
+            sample['latency'] for sample in self._successful()
+            if lines * 0.75 <= sample['lines'] <= lines * 1.25
+        )
+        if len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))]
+    
+    def failure_rate(self) -> float:
+        """Share of failed requests in the window"""
+        if not self.samples:
+            return 0.0
+        return sum(1 for sample in self.samples if not sample['success']) / len(self.samples)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary suitable for status reports"""
+        tokens_per_second = self.tokens_per_second()
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        overhead_ratio = self.prompt_overhead_ratio()
+        return {
+            **self.totals,
+            'window_requests': len(self.samples),
+            'tokens_per_second': round(tokens_per_second, 1) if tokens_per_second else None,
+            'latency_p50': round(p50, 2) if p50 is not None else None,
+            'latency_p95': round(p95, 2) if p95 is not None else None,
+            'failure_rate': round(self.failure_rate(), 3),
+            'prompt_overhead_per_useful_token': round(overhead_ratio, 3) if overhead_ratio is not None else None
+        }
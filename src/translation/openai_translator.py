@@ -1,8 +1,12 @@
-import openai
 from typing import List, Dict, Any
 import asyncio
 import logging
+import time
+from openai import NOT_GIVEN
 from .base import BaseTranslator
+from .dispatcher import current_flow
+from .client_pool import get_client_registry
+from .prompts import PromptTemplate
 
 logger = logging.getLogger(__name__)
 
@@ -11,25 +15,28 @@ class OpenAITranslator(BaseTranslator):
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
-        self.client = openai.AsyncOpenAI(api_key=config['api_key'])
+        self.client_registry = get_client_registry()
+        self.client = self.client_registry.acquire(config['api_key'], config.get('base_url'))
         self.model = config.get('model', 'gpt-3.5-turbo')
         self.max_tokens = config.get('max_tokens', 4000)
+        self.warm_up_timeout = config.get('warm_up_timeout_seconds', 10)
+        self.prompts = PromptTemplate()
     
-    async def translate_text(self, text: str, target_language: str = "Persian") -> str:
+    async def _translate_text_impl(self, text: str, target_language: str) -> str:
         """Translate a single text string using OpenAI"""
         try:
-            prompt = self._create_translation_prompt(text, target_language)
+            messages = self.prompts.text_messages(text, target_language)
+            self._record_prompt(messages, [text])
             
             response = await self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": f"You are a professional translator. Translate the given text to {target_language}. Maintain the original meaning and context. Only return the translated text without any additional explanations."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
                 max_tokens=self.max_tokens,
-                temperature=0.3
+                temperature=0.3,
+                timeout=self.request_timeout or NOT_GIVEN
             )
             
+            self._record_usage(response)
             translated_text = response.choices[0].message.content.strip()
             logger.info(f"Successfully translated text: {text[:50]}...")
             return translated_text
@@ -38,67 +45,80 @@ class OpenAITranslator(BaseTranslator):
             logger.error(f"Translation failed for text: {text[:50]}... Error: {str(e)}")
             raise Exception(f"Translation failed: {str(e)}")
     
-    async def translate_batch(self, texts: List[str], target_language: str = "Persian") -> List[str]:
-        """Translate multiple text strings in batch"""
+    async def _translate_batch_impl(self, texts: List[str], target_language: str) -> List[str]:
+        """Translate one packed batch of lines in a single numbered request"""
         try:
-            # For better efficiency, we can batch multiple subtitles in one request
-            if len(texts) <= 10:  # Small batch - translate together
-                return await self._translate_batch_together(texts, target_language)
-            else:  # Large batch - translate individually with concurrency
-                return await self._translate_batch_concurrent(texts, target_language)
-                
+            return await self._translate_numbered_batch(texts, target_language)
         except Exception as e:
             logger.error(f"Batch translation failed: {str(e)}")
             raise Exception(f"Batch translation failed: {str(e)}")
     
-    async def _translate_batch_together(self, texts: List[str], target_language: str) -> List[str]:
-        """Translate small batches together in one request"""
-        numbered_texts = "\n".join([f"{i+1}. {text}" for i, text in enumerate(texts)])
+    async def _translate_numbered_batch(self, texts: List[str], target_language: str) -> List[str]:
+        """Send numbered subtitle lines together and parse the numbered reply"""
+        messages = self.prompts.batch_messages(texts, target_language)
+        self._record_prompt(messages, texts)
         
-        prompt = f"""Translate the following numbered subtitle lines to {target_language}. 
-        Maintain the original meaning and context. Return only the translated lines with their numbers:
-
-{numbered_texts}"""
-
         response = await self.client.chat.completions.create(
             model=self.model,
-            messages=[
-                {"role": "system", "content": f"You are a professional subtitle translator. Translate to {target_language} maintaining timing and context."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             max_tokens=self.max_tokens,
-            temperature=0.3
+            temperature=0.3,
+            timeout=self.request_timeout or NOT_GIVEN
         )
         
-        translated_content = response.choices[0].message.content.strip()
-        
-        # Parse the numbered response back to list
-        translated_lines = []
-        for line in translated_content.split('\n'):
-            if line.strip() and '. ' in line:
-                translated_text = line.split('. ', 1)[1] if '. ' in line else line
-                translated_lines.append(translated_text.strip())
+        self._record_usage(response)
+        # خطوط پاسخ بر اساس شماره تطبیق داده می‌شوند؛ خطوط گمشده متن اصلی را نگه می‌دارند
+        return self.prompts.parse_batch(response.choices[0].message.content.strip(), texts)
         
-        # Ensure we have the same number of translations as inputs
-        while len(translated_lines) < len(texts):
-            translated_lines.append(texts[len(translated_lines)])  # Fallback to original
-            
-        return translated_lines[:len(texts)]
+    def _record_prompt(self, messages: List[Dict[str, str]], texts: List[str]):
+        """Feed the estimated prompt overhead of a request into the translator metrics"""
+        measured = self.prompts.measure(messages, texts)
+        self.metrics.record_prompt(measured['useful_tokens'], measured['overhead_tokens'])
     
-    async def _translate_batch_concurrent(self, texts: List[str], target_language: str) -> List[str]:
-        """Translate large batches with concurrent requests"""
-        semaphore = asyncio.Semaphore(5)  # Limit concurrent requests
-        
-        async def translate_with_semaphore(text):
-            async with semaphore:
-                return await self.translate_text(text, target_language)
-        
-        tasks = [translate_with_semaphore(text) for text in texts]
-        return await asyncio.gather(*tasks)
+    def _record_usage(self, response):
+        """Feed provider-reported token usage into the translator metrics and the job's flow"""
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            self.metrics.record_usage(usage.prompt_tokens, usage.completion_tokens)
+            flow = current_flow.get()
+            if flow is not None:
+                flow.record_usage(usage.prompt_tokens, usage.completion_tokens)
+    
+    async def warm_up(self) -> Dict[str, Any]:
+        """
+        Establish pooled connections with free model-list requests
+
+        DNS lookup and TLS setup happen here, once per connection the
+        translator will use concurrently, instead of inside user requests.
+        Probes are not retried and the whole warm-up gives up after
+        ``warm_up_timeout_seconds`` so an unreachable provider cannot stall
+        startup.
+        """
+        started = time.monotonic()
+        connections = min(self.max_concurrency, self.client_registry.limits.max_keepalive_connections or 1)
+        # کپی کلاینت همان استخر اتصال را به کار می‌برد
+        probe = self.client.with_options(max_retries=0)
+        try:
+            results = await asyncio.wait_for(asyncio.gather(
+                *(probe.models.list(timeout=self.warm_up_timeout) for _ in range(connections)),
+                return_exceptions=True
+            ), self.warm_up_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up: provider did not answer within {self.warm_up_timeout}s")
+            return {'connections': 0, 'seconds': round(time.monotonic() - started, 2)}
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.warning(f"Warm-up: {len(failures)}/{connections} connections failed: {str(failures[0])}")
+        return {
+            'connections': connections - len(failures),
+            'seconds': round(time.monotonic() - started, 2)
+        }
     
-    def _create_translation_prompt(self, text: str, target_language: str) -> str:
-        """Create a translation prompt for the given text"""
-        return f"Translate this subtitle text to {target_language}: {text}"
+    async def close(self):
+        """Return the pooled client to the shared registry"""
+        if self.client is not None:
+            await self.client_registry.release(self.client)
+            self.client = None
     
     def get_provider_name(self) -> str:
         """Return the name of the translation provider"""
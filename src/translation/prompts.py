@@ -0,0 +1,83 @@
+import re
+from typing import List, Dict, Any
+from .tokens import estimate_tokens
+
+# Tokens the chat format adds around each message and to prime the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+class PromptTemplate:
+    """
+    Compact chat prompts for subtitle translation
+
+    The system prompt is short and identical for every request to the same
+    language, so a provider can reuse it as a cached prefix. The user
+    message carries nothing but the lines, one per row as ``N|text``; the
+    reply uses the same form and is matched back by number, so a skipped or
+    merged line does not shift the ones after it.
+    """
+    
+    BATCH_SYSTEM = ("Translate each subtitle line to {language}. Reply only with the lines as N|translation, "
+                    "keeping the numbers and any {{0}}-style placeholders.")
+    TEXT_SYSTEM = "Translate this subtitle to {language}. Reply only with the translation."
+    REPLY_LINE = re.compile(r'^\s*(\d+)\s*[|.:)]\s?(.*)$')
+    
+    def batch_messages(self, texts: List[str], target_language: str) -> List[Dict[str, str]]:
+        """Messages for one packed batch of lines"""
+        return [
+            {"role": "system", "content": self.BATCH_SYSTEM.format(language=target_language)},
+            {"role": "user", "content": "\n".join(f"{i}|{text}" for i, text in enumerate(texts, 1))}
+        ]
+    
+    def text_messages(self, text: str, target_language: str) -> List[Dict[str, str]]:
+        """Messages for a single line"""
+        return [
+            {"role": "system", "content": self.TEXT_SYSTEM.format(language=target_language)},
+            {"role": "user", "content": text}
+        ]
+    
+    def parse_batch(self, reply: str, texts: List[str]) -> List[str]:
+        """Map a numbered reply back onto the batch; missing lines keep their source text"""
+        translations: Dict[int, str] = {}
+        current = None
+        for line in reply.splitlines():
+            match = self.REPLY_LINE.match(line)
+            if match:
+                number = int(match.group(1))
+                current = number - 1 if 1 <= number <= len(texts) else None
+                if current is not None:
+                    translations[current] = match.group(2).strip()
+            elif current is not None and line.strip():
+                # ادامه خطی که مدل آن را در چند سطر برگردانده است
+                translations[current] = f"{translations[current]} {line.strip()}".strip()
+        
+        return [translations.get(i) or text for i, text in enumerate(texts)]
+    
+    def measure(self, messages: List[Dict[str, str]], texts: List[str]) -> Dict[str, Any]:
+        """Estimated prompt tokens of a request split into subtitle text and overhead"""
+        prompt_tokens = REPLY_PRIMING_TOKENS + sum(
+            estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in messages
+        )
+        useful_tokens = sum(estimate_tokens(text) for text in texts)
+        overhead_tokens = max(0, prompt_tokens - useful_tokens)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'useful_tokens': useful_tokens,
+            'overhead_tokens': overhead_tokens,
+            'overhead_per_useful_token': round(overhead_tokens / useful_tokens, 3) if useful_tokens else None
+        }
+    
+    def measure_job(self, texts: List[str], target_language: str, batch_size: int) -> Dict[str, Any]:
+        """Prompt overhead of translating texts packed ``batch_size`` lines per request"""
+        batch_size = max(1, batch_size)
+        totals = {'requests': 0, 'prompt_tokens': 0, 'useful_tokens': 0, 'overhead_tokens': 0}
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            measured = self.measure(self.batch_messages(batch, target_language), batch)
+            totals['requests'] += 1
+            for key in ('prompt_tokens', 'useful_tokens', 'overhead_tokens'):
+                totals[key] += measured[key]
+        
+        useful = totals['useful_tokens']
+        totals['overhead_per_useful_token'] = round(totals['overhead_tokens'] / useful, 3) if useful else None
+        return totals
\ No newline at end of file
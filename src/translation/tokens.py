@@ -0,0 +1,14 @@
+import math
+
+# میانگین تقریبی کاراکتر به ازای هر توکن در tokenizerهای GPT
+LATIN_CHARS_PER_TOKEN = 4.0
+OTHER_CHARS_PER_TOKEN = 2.0
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token approximation without loading a tokenizer"""
+    if not text:
+        return 0
+    
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    other_chars = len(text) - ascii_chars
+    return max(1, math.ceil(ascii_chars / LATIN_CHARS_PER_TOKEN + other_chars / OTHER_CHARS_PER_TOKEN))
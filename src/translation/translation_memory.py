@@ -0,0 +1,297 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class MemoryEntry:
+    """A stored source line with its translation and similarity signature"""
+    
+    __slots__ = ('key', 'source', 'translation', 'shingles', 'signature')
+    
+    def __init__(self, key: str, source: str, translation: str, shingles: frozenset, signature: Tuple[int, ...]):
+        self.key = key
+        self.source = source
+        self.translation = translation
+        self.shingles = shingles
+        self.signature = signature
+
+class TranslationMemory:
+    """
+    Translation memory over previously translated subtitle lines
+
+    A stored translation is reused for a line that is identical to the
+    stored source apart from runs of whitespace; case and punctuation are
+    kept, since "Go." and "Go?" do not translate alike.
+
+    Near-duplicates are found with character n-grams of the normalized
+    line (case, punctuation, whitespace). A MinHash signature per line is
+    bucketed into LSH bands, so a lookup only compares a line with the few
+    stored lines that share a band and then checks their exact n-gram
+    Jaccard similarity. High similarity does not mean the same meaning
+    ("you can" / "you cannot"), so lines at or above ``threshold`` reuse
+    the stored translation only when ``fuzzy_reuse`` is enabled.
+
+    New lines are appended to the storage files in batches: ``add_batch``
+    only buffers them, and ``flush`` (run off the event loop once
+    ``flush_due``) writes the buffer out.
+    """
+    
+    NORMALIZE_PATTERN = re.compile(r'[^\w\s]+')
+    SPACE_PATTERN = re.compile(r'\s+')
+    MERSENNE_PRIME = (1 << 61) - 1
+    
+    def __init__(self, storage_dir: Optional[str] = None, threshold: float = 0.9, max_entries: int = 50000,
+                 ngram: int = 3, bands: int = 4, rows: int = 4, min_shingles: int = 6, fuzzy_reuse: bool = False,
+                 flush_lines: int = 200, flush_seconds: float = 5.0):
+        self.threshold = threshold
+        self.fuzzy_reuse = fuzzy_reuse
+        self.max_entries = max_entries
+        self.ngram = ngram
+        self.bands = bands
+        self.rows = rows
+        self.min_shingles = min_shingles
+        
+        rng = random.Random(7919)
+        self.permutations = [
+            (rng.randrange(1, self.MERSENNE_PRIME), rng.randrange(0, self.MERSENNE_PRIME))
+            for _ in range(bands * rows)
+        ]
+        
+        # زبان مقصد -> (متن دقیق خط -> ورودی) و باکت‌های LSH
+        self.entries: Dict[str, OrderedDict] = {}
+        self.buckets: Dict[str, Dict[Tuple[int, int], set]] = {}
+        self.stats = {'exact_hits': 0, 'fuzzy_hits': 0, 'misses': 0, 'lookups': 0, 'lookup_seconds': 0.0}
+        
+        # خطوط ذخیره نشده به تفکیک فایل؛ نوشتن از ترد دیگری انجام می‌شود
+        self.flush_lines = flush_lines
+        self.flush_seconds = flush_seconds
+        self._unsaved: Dict[Path, List[str]] = {}
+        self._unsaved_lines = 0
+        self._unsaved_since: Optional[float] = None
+        self._writing_lines = 0
+        # قفل بافر فقط لحظه‌ای گرفته می‌شود تا add_batch روی حلقه رویداد منتظر دیسک نماند
+        self._buffer_lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        
+        self.storage_dir = Path(storage_dir) if storage_dir else None
+        if self.storage_dir:
+            self.storage_dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+    
+    def normalize(self, text: str) -> str:
+        """Normalize a line for comparison"""
+        return self.SPACE_PATTERN.sub(' ', self.NORMALIZE_PATTERN.sub(' ', text.lower())).strip()
+    
+    def exact_key(self, text: str) -> str:
+        """Key of a line for exact reuse: only whitespace is collapsed"""
+        return self.SPACE_PATTERN.sub(' ', text).strip()
+    
+    def _shingles(self, key: str) -> frozenset:
+        padded = f" {key} "
+        return frozenset(
+            zlib.crc32(padded[i:i + self.ngram].encode('utf-8'))
+            for i in range(max(1, len(padded) - self.ngram + 1))
+        )
+    
+    def _signature(self, shingles: frozenset) -> Tuple[int, ...]:
+        prime = self.MERSENNE_PRIME
+        return tuple(min((a * shingle + b) % prime for shingle in shingles) for a, b in self.permutations)
+    
+    def _bands(self, signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+        return [(band, hash(signature[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+    
+    def lookup_batch(self, texts: List[str], target_language: str) -> Dict[int, str]:
+        """Find stored translations for a batch of lines; returns index -> translation"""
+        started = time.perf_counter()
+        language = self.normalize(target_language)
+        entries = self.entries.get(language)
+        hits: Dict[int, str] = {}
+        
+        if entries:
+            buckets = self.buckets[language]
+            for i, text in enumerate(texts):
+                key = self.exact_key(text)
+                entry = entries.get(key)
+                if entry is not None:
+                    self.stats['exact_hits'] += 1
+                    hits[i] = entry.translation
+                    entries.move_to_end(key)
+                    continue
+                
+                if not self.fuzzy_reuse:
+                    continue
+                match = self._fuzzy_match(self.normalize(text), entries, buckets)
+                if match is not None:
+                    self.stats['fuzzy_hits'] += 1
+                    hits[i] = match.translation
+                    entries.move_to_end(match.key)
+        
+        self.stats['misses'] += len(texts) - len(hits)
+        self.stats['lookups'] += len(texts)
+        self.stats['lookup_seconds'] += time.perf_counter() - started
+        return hits
+    
+    def _fuzzy_match(self, normalized: str, entries: OrderedDict, buckets: Dict) -> Optional[MemoryEntry]:
+        shingles = self._shingles(normalized)
+        if len(shingles) < self.min_shingles:
+            return None
+        
+        candidates = set()
+        for band_key in self._bands(self._signature(shingles)):
+            candidates.update(buckets.get(band_key, ()))
+        
+        best, best_score = None, self.threshold
+        for candidate_key in candidates:
+            candidate = entries.get(candidate_key)
+            if candidate is None:
+                continue
+            score = len(shingles & candidate.shingles) / len(shingles | candidate.shingles)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+    
+    def add_batch(self, pairs: List[Tuple[str, str]], target_language: str, persist: bool = True):
+        """Store translated lines; persisted lines are buffered until the next ``flush``"""
+        added = []
+        for source, translation in pairs:
+            if self._add(source, translation, target_language):
+                added.append((source, translation))
+        
+        if persist and added and self.storage_dir:
+            lines = [json.dumps([s, t], ensure_ascii=False) + '\n' for s, t in added]
+            with self._buffer_lock:
+                self._unsaved.setdefault(self._storage_path(target_language), []).extend(lines)
+                self._unsaved_lines += len(lines)
+                if self._unsaved_since is None:
+                    self._unsaved_since = time.monotonic()
+    
+    @property
+    def flush_due(self) -> bool:
+        """Whether enough lines are buffered, or buffered long enough, to write them out"""
+        if not self._unsaved_lines:
+            return False
+        return (self._unsaved_lines >= self.flush_lines
+                or time.monotonic() - self._unsaved_since >= self.flush_seconds)
+    
+    def flush(self):
+        """Append buffered lines to the storage files (blocking; run in an executor from async code)"""
+        with self._buffer_lock:
+            unsaved, self._unsaved = self._unsaved, {}
+            count, self._unsaved_lines = self._unsaved_lines, 0
+            self._unsaved_since = None
+            self._writing_lines += count
+        try:
+            with self._file_lock:
+                for path, lines in unsaved.items():
+                    try:
+                        with open(path, 'a', encoding='utf-8') as f:
+                            f.write(''.join(lines))
+                    except OSError as e:
+                        logger.error(f"Failed to save {len(lines)} translation memory lines to {path}: {str(e)}")
+        finally:
+            with self._buffer_lock:
+                self._writing_lines -= count
+    
+    def _add(self, source: str, translation: str, target_language: str) -> bool:
+        key = self.exact_key(source)
+        if not key or not translation:
+            return False
+        
+        language = self.normalize(target_language)
+        entries = self.entries.setdefault(language, OrderedDict())
+        buckets = self.buckets.setdefault(language, {})
+        
+        if key in entries:
+            entries.move_to_end(key)
+            entries[key].translation = translation
+            return True
+        
+        shingles = self._shingles(self.normalize(source))
+        signature = self._signature(shingles)
+        entries[key] = MemoryEntry(key, source, translation, shingles, signature)
+        for band_key in self._bands(signature):
+            buckets.setdefault(band_key, set()).add(key)
+        
+        while len(entries) > self.max_entries:
+            _, evicted = entries.popitem(last=False)
+            for band_key in self._bands(evicted.signature):
+                bucket = buckets.get(band_key)
+                if bucket is not None:
+                    bucket.discard(evicted.key)
+                    if not bucket:
+                        del buckets[band_key]
+        return True
+    
+    def hot_entries(self, target_language: str, limit: int) -> List[Tuple[str, str]]:
+        """Most recently stored or used lines of a language, newest first"""
+        entries = self.entries.get(self.normalize(target_language))
+        if not entries or limit <= 0:
+            return []
+        hot = []
+        for key in reversed(entries):
+            entry = entries[key]
+            hot.append((entry.source, entry.translation))
+            if len(hot) >= limit:
+                break
+        return hot
+    
+    def _storage_path(self, target_language: str) -> Path:
+        return self.storage_dir / f"{self.normalize(target_language).replace(' ', '_')}.jsonl"
+    
+    def _load(self):
+        """Load stored lines and compact files that outgrew the entry limit"""
+        for path in self.storage_dir.glob('*.jsonl'):
+            target_language = path.stem.replace('_', ' ')
+            lines = 0
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        lines += 1
+                        try:
+                            source, translation = json.loads(line)
+                        except (ValueError, TypeError):
+                            continue
+                        self._add(source, translation, target_language)
+            except OSError as e:
+                logger.error(f"Failed to load translation memory {path}: {str(e)}")
+                continue
+            
+            entries = self.entries.get(target_language, {})
+            if lines > len(entries) * 2:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(''.join(json.dumps([e.source, e.translation], ensure_ascii=False) + '\n' for e in entries.values()))
+            logger.info(f"Loaded {len(entries)} translation memory entries for {target_language}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rates and lookup cost of the memory"""
+        lookups = self.stats['lookups']
+        return {
+            'entries': {language: len(entries) for language, entries in self.entries.items()},
+            'exact_hits': self.stats['exact_hits'],
+            'fuzzy_hits': self.stats['fuzzy_hits'],
+            'misses': self.stats['misses'],
+            'hit_rate': round((self.stats['exact_hits'] + self.stats['fuzzy_hits']) / lookups, 3) if lookups else 0.0,
+            'avg_lookup_us': round(self.stats['lookup_seconds'] / lookups * 1e6, 1) if lookups else 0.0,
+            'threshold': self.threshold,
+            'fuzzy_reuse': self.fuzzy_reuse,
+            'unsaved_lines': self._unsaved_lines + self._writing_lines
+        }
+
+# سینگلتون برای استفاده در سراسر برنامه
+_translation_memory = None
+
+def get_translation_memory(storage_dir: str = None, threshold: float = 0.9, max_entries: int = 50000,
+                           fuzzy_reuse: bool = False) -> TranslationMemory:
+    """Return the shared translation memory (Singleton)"""
+    global _translation_memory
+    if _translation_memory is None:
+        _translation_memory = TranslationMemory(storage_dir, threshold, max_entries, fuzzy_reuse=fuzzy_reuse)
+    return _translation_memory
@@ -1,12 +1,14 @@
 from typing import Dict, Any
 from .base import BaseTranslator
 from .openai_translator import OpenAITranslator
+from .cascade_translator import CascadeTranslator
 
 class TranslatorFactory:
     """Factory class for creating translation providers"""
     
     _translators = {
         'openai': OpenAITranslator,
+        'cascade': CascadeTranslator,
         # Add more translators here in the future
         # 'google': GoogleTranslator,
         # 'azure': AzureTranslator,
@@ -3,15 +3,21 @@ from .validators import InputValidator, ValidationError
 from .error_handler import (
     ErrorHandler, get_error_handler, handle_errors,
     AISubConvertorError, DatabaseError, TranslationError,
-    FileProcessingError, ValidationError as ValidError
+    FileProcessingError, CancellationError, ValidationError as ValidError
 )
 from .backup_manager import BackupManager, get_backup_manager
+from .checkpoint_manager import CheckpointManager, JobCheckpoint, get_checkpoint_manager
+from .release_index import ReleaseIndex, get_release_index
+from .cancellation import CancellationToken
 
 __all__ = [
     'UserFileManager', 'get_file_manager',
     'InputValidator', 'ValidationError',
     'ErrorHandler', 'get_error_handler', 'handle_errors',
     'AISubConvertorError', 'DatabaseError', 'TranslationError',
-    'FileProcessingError', 'ValidError',
-    'BackupManager', 'get_backup_manager'
+    'FileProcessingError', 'CancellationError', 'ValidError',
+    'BackupManager', 'get_backup_manager',
+    'CheckpointManager', 'JobCheckpoint', 'get_checkpoint_manager',
+    'ReleaseIndex', 'get_release_index',
+    'CancellationToken'
 ]
\ No newline at end of file
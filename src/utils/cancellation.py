@@ -0,0 +1,66 @@
+"""
+Job Cancellation Tokens
+حل مشکل ادامه مصرف API توسط کارهای ترجمه پس از لغو یا پاکسازی
+"""
+
+import asyncio
+import logging
+from typing import Optional, Set, Awaitable, Any
+from .error_handler import CancellationError
+
+logger = logging.getLogger(__name__)
+
+class CancellationToken:
+    """
+    توکن لغو یک کار ترجمه
+
+    تسک‌های کار به توکن متصل می‌شوند و با فراخوانی cancel همه آن‌ها فوراً
+    لغو می‌شوند؛ لغو تسک اصلی به دسته‌های در انتظار و درخواست‌های در حال
+    اجرای API منتقل می‌شود.
+    """
+    
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._tasks: Set[asyncio.Task] = set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+    
+    def cancel(self, reason: str = 'cancelled') -> bool:
+        """لغو کار؛ در صورت لغو قبلی False"""
+        if self.cancelled:
+            return False
+        
+        self.reason = reason
+        for task in list(self._tasks):
+            if not task.done():
+                task.cancel()
+        logger.info(f"Job cancelled ({reason}), {len(self._tasks)} running tasks aborted")
+        return True
+    
+    def attach(self, task: asyncio.Task):
+        """اتصال تسک به توکن"""
+        if self.cancelled:
+            task.cancel()
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def raise_if_cancelled(self):
+        """ایجاد خطا در صورت لغو کار"""
+        if self.cancelled:
+            raise CancellationError(f"کار لغو شد: {self.reason}", "JOB_CANCELLED", {'reason': self.reason})
+    
+    async def run(self, awaitable: Awaitable[Any]) -> Any:
+        """اجرای بخشی از کار به صورت قابل لغو"""
+        self.raise_if_cancelled()
+        task = asyncio.ensure_future(awaitable)
+        self.attach(task)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            # لغو توسط توکن به خطای قابل مدیریت تبدیل می‌شود
+            if self.cancelled and task.cancelled():
+                self.raise_if_cancelled()
+            raise
@@ -0,0 +1,231 @@
+"""
+Translation Job Checkpoints
+حل مشکل از دست رفتن ترجمه‌های انجام شده در صورت خطا یا ری‌استارت
+"""
+
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+class JobCheckpoint:
+    """
+    چک‌پوینت یک کار ترجمه روی دیسک
+
+    فایل به صورت JSON Lines نوشته می‌شود: خط اول مشخصات کار (شناسه، هش
+    فایل منبع، زبان مقصد) و هر خط بعدی یک بازه ترجمه شده است، تا ثبت هر
+    دسته فقط یک append کوچک باشد.
+    """
+    
+    def __init__(self, path: Path, job_id: str, source_hash: str, target_language: str,
+                 total_subtitles: int = 0):
+        self.path = path
+        self.job_id = job_id
+        self.source_hash = source_hash
+        self.target_language = target_language
+        self.total_subtitles = total_subtitles
+        self.translations: Dict[int, str] = {}
+    
+    @property
+    def resumed_count(self) -> int:
+        """تعداد زیرنویس‌های ترجمه شده موجود در چک‌پوینت"""
+        return len(self.translations)
+    
+    def get(self, position: int) -> Optional[str]:
+        """دریافت ترجمه ذخیره شده برای موقعیت زیرنویس"""
+        return self.translations.get(position)
+    
+    def load(self) -> bool:
+        """بارگذاری بازه‌های ترجمه شده؛ در صورت عدم تطابق منبع False"""
+        if not self.path.exists():
+            return False
+        
+        truncated = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('source_hash') != self.source_hash or header.get('target_language') != self.target_language:
+                    logger.warning(f"Checkpoint {self.job_id} does not match source, starting fresh")
+                    return False
+                
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        translated_range = json.loads(line)
+                    except json.JSONDecodeError:
+                        # خط ناقص ناشی از قطع ناگهانی در نوشتن
+                        logger.warning(f"Skipping truncated checkpoint line in {self.path}")
+                        truncated = True
+                        continue
+                    start = translated_range['start']
+                    for offset, text in enumerate(translated_range['translations']):
+                        self.translations[start + offset] = text
+            
+            # بازنویسی فایل تا append بعدی به خط ناقص نچسبد
+            if truncated:
+                translations = dict(self.translations)
+                self.start()
+                self.record(translations)
+            
+            logger.info(f"Loaded checkpoint {self.job_id}: {self.resumed_count} translated subtitles")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to load checkpoint {self.job_id}: {str(e)}")
+            self.translations.clear()
+            return False
+    
+    def start(self):
+        """ایجاد فایل چک‌پوینت جدید با مشخصات کار"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = {
+            'job_id': self.job_id,
+            'source_hash': self.source_hash,
+            'target_language': self.target_language,
+            'total_subtitles': self.total_subtitles,
+            'created_at': datetime.now().isoformat()
+        }
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        self.translations.clear()
+    
+    def record(self, translations: Dict[int, str]):
+        """ثبت ترجمه‌های یک دسته به صورت بازه‌های پیوسته"""
+        if not translations:
+            return
+        
+        lines = []
+        for start, texts in self._to_ranges(translations):
+            lines.append(json.dumps({'start': start, 'translations': texts}, ensure_ascii=False))
+        
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+        
+        self.translations.update(translations)
+    
+    def _to_ranges(self, translations: Dict[int, str]) -> List[tuple]:
+        """تبدیل موقعیت‌ها به بازه‌های پیوسته (شروع، متن‌ها)"""
+        ranges = []
+        for position in sorted(translations):
+            if ranges and ranges[-1][0] + len(ranges[-1][1]) == position:
+                ranges[-1][1].append(translations[position])
+            else:
+                ranges.append((position, [translations[position]]))
+        return ranges
+    
+    def discard(self):
+        """حذف چک‌پوینت پس از تکمیل کار"""
+        try:
+            if self.path.exists():
+                self.path.unlink()
+                logger.info(f"Checkpoint {self.job_id} removed")
+        except Exception as e:
+            logger.error(f"Failed to remove checkpoint {self.job_id}: {str(e)}")
+
+class CheckpointManager:
+    """
+    مدیریت چک‌پوینت‌های کارهای ترجمه
+
+    هر چک‌پوینت باز متعلق به یک کار (owner) است؛ اگر همان فایل همزمان دوباره
+    ارسال شود، کار دوم چک‌پوینت جداگانه می‌گیرد تا دو کار در یک فایل ننویسند.
+    """
+    
+    def __init__(self, checkpoint_dir: str, retention_hours: int = 24):
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.retention_hours = retention_hours
+        # شناسه چک‌پوینت -> کار در حال استفاده از آن
+        self.owners: Dict[str, str] = {}
+    
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """محاسبه هش محتوای فایل منبع"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def make_job_id(self, user_id: int, source_hash: str, target_language: str, owner: Optional[str] = None) -> str:
+        """شناسه پایدار کار بر اساس کاربر، فایل منبع و زبان مقصد (owner برای چک‌پوینت جداگانه)"""
+        content = f"{user_id}_{source_hash}_{target_language}"
+        if owner:
+            content += f"_{owner}"
+        return hashlib.md5(content.encode()).hexdigest()[:16]
+    
+    def open_checkpoint(self, user_id: int, file_path: str, target_language: str,
+                        total_subtitles: int = 0, owner: Optional[str] = None) -> JobCheckpoint:
+        """
+        باز کردن چک‌پوینت موجود یا ایجاد چک‌پوینت جدید برای کار
+        
+        Args:
+            owner: شناسه کار؛ تا release چک‌پوینت در اختیار همین کار می‌ماند
+        """
+        self.cleanup_expired()
+        
+        source_hash = self.hash_file(file_path)
+        job_id = self.make_job_id(user_id, source_hash, target_language)
+        if owner:
+            if self.owners.get(job_id, owner) != owner:
+                # کار دیگری همین فایل را در حال ترجمه دارد
+                job_id = self.make_job_id(user_id, source_hash, target_language, owner)
+                logger.info(f"Checkpoint of this source is in use, job {owner} gets its own ({job_id})")
+            self.owners[job_id] = owner
+        checkpoint = JobCheckpoint(
+            self.checkpoint_dir / f"{job_id}.jsonl",
+            job_id, source_hash, target_language, total_subtitles
+        )
+        
+        if not checkpoint.load():
+            checkpoint.start()
+        
+        return checkpoint
+    
+    def release(self, checkpoint: JobCheckpoint):
+        """آزاد کردن چک‌پوینت پس از پایان یا توقف کار (فایل برای ادامه باقی می‌ماند)"""
+        self.owners.pop(checkpoint.job_id, None)
+    
+    def cleanup_expired(self) -> int:
+        """حذف چک‌پوینت‌های قدیمی‌تر از مدت نگهداری"""
+        cutoff = datetime.now() - timedelta(hours=self.retention_hours)
+        removed = 0
+        
+        for path in self.checkpoint_dir.glob('*.jsonl'):
+            try:
+                if datetime.fromtimestamp(path.stat().st_mtime) < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError as e:
+                logger.error(f"Failed to remove expired checkpoint {path}: {str(e)}")
+        
+        if removed:
+            logger.info(f"Removed {removed} expired checkpoints")
+        return removed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار چک‌پوینت‌های موجود"""
+        files = list(self.checkpoint_dir.glob('*.jsonl'))
+        return {
+            'checkpoints': len(files),
+            'in_use': len(self.owners),
+            'total_size_kb': round(sum(f.stat().st_size for f in files) / 1024, 1),
+            'directory': str(self.checkpoint_dir)
+        }
+
+# سینگلتون برای استفاده در سراسر برنامه
+_checkpoint_manager = None
+
+def get_checkpoint_manager(checkpoint_dir: str = None, retention_hours: int = 24) -> CheckpointManager:
+    """دریافت نمونه مدیریت چک‌پوینت (Singleton)"""
+    global _checkpoint_manager
+    if _checkpoint_manager is None:
+        if checkpoint_dir is None:
+            raise ValueError("checkpoint_dir must be provided for first initialization")
+        _checkpoint_manager = CheckpointManager(checkpoint_dir, retention_hours)
+    return _checkpoint_manager
@@ -53,6 +53,10 @@ class ExternalServiceError(AISubConvertorError):
     """خطاهای سرویس‌های خارجی"""
     pass
 
+class CancellationError(AISubConvertorError):
+    """لغو کار توسط کاربر یا سیستم"""
+    pass
+
 class ErrorHandler:
     """مدیریت پیشرفته خطاها"""
     
@@ -4,18 +4,24 @@ import asyncio
 import hashlib
 import time
 import weakref
-from typing import Dict, Optional, Set
+import uuid
+from typing import Dict, List, Optional, Set
 from pathlib import Path
 import logging
 from datetime import datetime, timedelta
 import threading
+from .cancellation import CancellationToken
 
 logger = logging.getLogger(__name__)
 
+# وضعیت‌هایی که در سقف فایل‌های همزمان کاربر شمرده می‌شوند
+ACTIVE_STATUSES = ['preparing', 'downloading', 'downloaded', 'queued', 'processing']
+
 class UserFileManager:
     """
     مدیریت فایل‌های کاربران با قابلیت‌های:
-    - فضای جداگانه برای هر کاربر
+    - فضای جداگانه برای هر کاربر و هر کار
+    - چند کار همزمان برای هر کاربر تا سقف طرح اشتراک
     - پاکسازی خودکار
     - جلوگیری از تداخل
     - محدودیت همزمانی
@@ -27,9 +33,9 @@ class UserFileManager:
         self.max_file_size_bytes = max_file_size_mb * 1024 * 1024
         
         # ردیابی فایل‌های فعال هر کاربر
-        self.active_files: Dict[int, Dict] = {}  # user_id -> file_info
+        self.active_files: Dict[int, Dict[str, Dict]] = {}  # user_id -> file_id -> file_info
         self.user_locks: Dict[int, asyncio.Lock] = {}  # user_id -> lock
-        self.cleanup_tasks: Dict[int, asyncio.Task] = {}  # user_id -> cleanup_task
+        self.cleanup_tasks: Dict[str, asyncio.Task] = {}  # file_id -> cleanup_task
         
         # ایجاد دایرکتوری اصلی
         self.base_temp_dir.mkdir(exist_ok=True)
@@ -51,8 +57,8 @@ class UserFileManager:
     
     def _generate_file_id(self, user_id: int, filename: str) -> str:
         """تولید شناسه یکتا برای فایل"""
-        timestamp = str(int(time.time()))
-        content = f"{user_id}_{filename}_{timestamp}"
+        timestamp = str(time.time_ns())
+        content = f"{user_id}_{filename}_{timestamp}_{uuid.uuid4().hex}"
         return hashlib.md5(content.encode()).hexdigest()[:12]
     
     def _sanitize_filename(self, filename: str) -> str:
@@ -75,25 +81,42 @@ class UserFileManager:
         logger.debug(f"Sanitized filename: {filename} -> {safe_filename}")
         return safe_filename
     
-    async def can_upload_file(self, user_id: int) -> bool:
-        """بررسی امکان آپلود فایل جدید برای کاربر"""
+    def _get_job_directory(self, user_id: int, file_id: str) -> Path:
+        """دایرکتوری جداگانه هر کار کاربر"""
+        job_dir = self._get_user_directory(user_id) / file_id
+        job_dir.mkdir(exist_ok=True)
+        return job_dir
+    
+    def _get_file(self, user_id: int, file_id: Optional[str] = None) -> Optional[Dict]:
+        """فایل مشخص کاربر یا آخرین فایل او در صورت نبود file_id"""
+        user_files = self.active_files.get(user_id)
+        if not user_files:
+            return None
+        if file_id is None:
+            return next(reversed(user_files.values()))
+        return user_files.get(file_id)
+    
+    def count_active_files(self, user_id: int) -> int:
+        """تعداد کارهای در جریان کاربر (از آماده‌سازی تا پایان پردازش)"""
+        return sum(
+            1 for file_info in self.active_files.get(user_id, {}).values()
+            if file_info.get('status') in ACTIVE_STATUSES
+        )
+    
+    async def can_upload_file(self, user_id: int, max_files: int = 1) -> bool:
+        """بررسی امکان آپلود فایل جدید برای کاربر (حداکثر max_files کار همزمان)"""
         if not isinstance(user_id, int) or user_id <= 0:
             return False
             
         async with self._get_user_lock(user_id):
-            # بررسی وجود فایل فعال
-            if user_id in self.active_files:
-                active_file = self.active_files[user_id]
-                # بررسی اینکه فایل هنوز در حال پردازش است
-                if active_file.get('status') in ['downloading', 'processing']:
-                    return False
-            return True
+            return self.count_active_files(user_id) < max_files
     
     async def validate_file_size(self, file_size: int) -> bool:
         """اعتبارسنجی حجم فایل"""
         return isinstance(file_size, int) and 0 < file_size <= self.max_file_size_bytes
     
-    async def prepare_user_upload(self, user_id: int, filename: str, file_size: int) -> Optional[Dict]:
+    async def prepare_user_upload(self, user_id: int, filename: str, file_size: int,
+                                  max_files: int = 1) -> Optional[Dict]:
         """آماده‌سازی برای آپلود فایل کاربر"""
         # Input validation
         if not isinstance(user_id, int) or user_id <= 0:
@@ -106,23 +129,20 @@ class UserFileManager:
         async with self._get_user_lock(user_id):
             try:
                 # بررسی امکان آپلود
-                if not await self.can_upload_file(user_id):
-                    raise Exception("کاربر در حال حاضر فایل دیگری در حال پردازش دارد")
+                if self.count_active_files(user_id) >= max_files:
+                    raise Exception(f"حداکثر {max_files} فایل همزمان برای هر کاربر مجاز است")
                 
                 # بررسی حجم فایل
                 if not await self.validate_file_size(file_size):
                     raise Exception(f"حجم فایل بیش از حد مجاز است. حداکثر: {self.max_file_size_bytes // (1024*1024)} مگابایت")
                 
-                # پاکسازی فایل‌های قبلی کاربر
-                await self._cleanup_user_files(user_id)
-                
-                # تولید اطلاعات فایل جدید
+                # تولید اطلاعات فایل جدید در دایرکتوری جداگانه کار
                 file_id = self._generate_file_id(user_id, filename)
-                user_dir = self._get_user_directory(user_id)
+                job_dir = self._get_job_directory(user_id, file_id)
                 
                 # تولید نام فایل امن
                 safe_filename = self._sanitize_filename(filename)
-                file_path = user_dir / f"{file_id}_{safe_filename}"
+                file_path = job_dir / safe_filename
                 
                 file_info = {
                     'file_id': file_id,
@@ -131,33 +151,35 @@ class UserFileManager:
                     'file_size': file_size,
                     'status': 'preparing',
                     'created_at': datetime.now(),
-                    'user_id': user_id
+                    'user_id': user_id,
+                    'cancel_token': CancellationToken()
                 }
                 
                 # ثبت فایل فعال
-                self.active_files[user_id] = file_info
+                self.active_files.setdefault(user_id, {})[file_id] = file_info
                 
-                logger.info(f"Prepared upload for user {user_id}: {filename} ({file_size} bytes)")
+                logger.info(f"Prepared upload {file_id} for user {user_id}: {filename} ({file_size} bytes)")
                 return file_info
                 
             except Exception as e:
                 logger.error(f"Failed to prepare upload for user {user_id}: {str(e)}")
                 raise
     
-    async def start_file_download(self, user_id: int) -> bool:
+    async def start_file_download(self, user_id: int, file_id: Optional[str] = None) -> bool:
         """شروع دانلود فایل"""
         async with self._get_user_lock(user_id):
-            if user_id in self.active_files:
-                self.active_files[user_id]['status'] = 'downloading'
-                self.active_files[user_id]['download_started_at'] = datetime.now()
+            file_info = self._get_file(user_id, file_id)
+            if file_info:
+                file_info['status'] = 'downloading'
+                file_info['download_started_at'] = datetime.now()
                 return True
             return False
     
-    async def complete_file_download(self, user_id: int) -> bool:
+    async def complete_file_download(self, user_id: int, file_id: Optional[str] = None) -> bool:
         """تکمیل دانلود فایل"""
         async with self._get_user_lock(user_id):
-            if user_id in self.active_files:
-                file_info = self.active_files[user_id]
+            file_info = self._get_file(user_id, file_id)
+            if file_info:
                 file_path = Path(file_info['file_path'])
                 
                 # بررسی وجود فایل
@@ -171,142 +193,207 @@ class UserFileManager:
                 if actual_size != expected_size:
                     logger.warning(f"File size mismatch for user {user_id}: expected {expected_size}, got {actual_size}")
                 
-                self.active_files[user_id]['status'] = 'downloaded'
-                self.active_files[user_id]['download_completed_at'] = datetime.now()
-                self.active_files[user_id]['actual_size'] = actual_size
+                file_info['status'] = 'downloaded'
+                file_info['download_completed_at'] = datetime.now()
+                file_info['actual_size'] = actual_size
                 
                 logger.info(f"Download completed for user {user_id}: {file_info['original_filename']}")
                 return True
             return False
     
-    async def start_file_processing(self, user_id: int) -> bool:
+    async def queue_file_processing(self, user_id: int, file_id: Optional[str] = None,
+                                    hold_minutes: int = 0) -> bool:
+        """ثبت فایل دانلود شده در صف ترجمه (hold_minutes: مصونیت از پاکسازی دوره‌ای در انتظار طولانی)"""
+        async with self._get_user_lock(user_id):
+            file_info = self._get_file(user_id, file_id)
+            if file_info and file_info['status'] == 'downloaded':
+                file_info['status'] = 'queued'
+                file_info['queued_at'] = datetime.now()
+                if hold_minutes:
+                    file_info['expires_at'] = datetime.now() + timedelta(minutes=hold_minutes)
+                return True
+            return False
+    
+    async def start_file_processing(self, user_id: int, timeout_minutes: int = 30,
+                                    file_id: Optional[str] = None) -> bool:
         """شروع پردازش فایل"""
         async with self._get_user_lock(user_id):
-            if user_id in self.active_files and self.active_files[user_id]['status'] == 'downloaded':
-                self.active_files[user_id]['status'] = 'processing'
-                self.active_files[user_id]['processing_started_at'] = datetime.now()
+            file_info = self._get_file(user_id, file_id)
+            if file_info and file_info['status'] in ['downloaded', 'queued']:
+                file_info['status'] = 'processing'
+                file_info['processing_started_at'] = datetime.now()
+                file_info['expires_at'] = datetime.now() + timedelta(minutes=timeout_minutes)
                 
-                # تنظیم تسک پاکسازی خودکار (30 دقیقه)
-                self._schedule_cleanup(user_id, delay_minutes=30)
+                # تنظیم تسک پاکسازی خودکار (پیش‌فرض 30 دقیقه)
+                self._schedule_cleanup(user_id, file_info['file_id'], delay_minutes=timeout_minutes)
                 return True
             return False
     
-    async def complete_file_processing(self, user_id: int, output_file_path: str) -> bool:
-        """تکمیل پردازش فایل"""
+    async def complete_file_processing(self, user_id: int, output_file_path: str,
+                                       output_file_paths: Optional[List[str]] = None,
+                                       file_id: Optional[str] = None) -> bool:
+        """تکمیل پردازش فایل (output_file_paths برای خروجی چند زبانه)"""
         async with self._get_user_lock(user_id):
-            if user_id in self.active_files:
-                self.active_files[user_id]['status'] = 'completed'
-                self.active_files[user_id]['processing_completed_at'] = datetime.now()
-                self.active_files[user_id]['output_file_path'] = output_file_path
+            file_info = self._get_file(user_id, file_id)
+            if file_info:
+                file_info['status'] = 'completed'
+                file_info['processing_completed_at'] = datetime.now()
+                file_info['output_file_path'] = output_file_path
+                file_info['output_file_paths'] = output_file_paths or [output_file_path]
                 
                 # تنظیم پاکسازی سریع‌تر (5 دقیقه)
-                self._schedule_cleanup(user_id, delay_minutes=5)
+                self._schedule_cleanup(user_id, file_info['file_id'], delay_minutes=5)
                 
-                logger.info(f"Processing completed for user {user_id}")
+                logger.info(f"Processing of {file_info['file_id']} completed for user {user_id}")
+                return True
+            return False
+    
+    async def update_file_info(self, user_id: int, file_id: Optional[str] = None, **fields) -> bool:
+        """افزودن اطلاعات تکمیلی به فایل فعال کاربر"""
+        async with self._get_user_lock(user_id):
+            file_info = self._get_file(user_id, file_id)
+            if file_info:
+                file_info.update(fields)
                 return True
             return False
     
-    async def get_user_file_info(self, user_id: int) -> Optional[Dict]:
-        """دریافت اطلاعات فایل فعال کاربر"""
+    async def cancel_user_job(self, user_id: int, reason: str = 'user', file_id: Optional[str] = None) -> bool:
+        """لغو کار در حال دانلود یا پردازش کاربر (بدون file_id همه کارهای کاربر)"""
+        if file_id is not None:
+            file_info = self._get_file(user_id, file_id)
+            candidates = [file_info] if file_info else []
+        else:
+            candidates = list(self.active_files.get(user_id, {}).values())
+        
+        cancelled = False
+        for file_info in candidates:
+            token = file_info.get('cancel_token')
+            if file_info['status'] in ACTIVE_STATUSES and token and token.cancel(reason):
+                cancelled = True
+        return cancelled
+    
+    async def get_user_file_info(self, user_id: int, file_id: Optional[str] = None) -> Optional[Dict]:
+        """دریافت اطلاعات فایل فعال کاربر (بدون file_id آخرین فایل)"""
         async with self._get_user_lock(user_id):
-            return self.active_files.get(user_id)
+            return self._get_file(user_id, file_id)
     
-    async def get_user_file_path(self, user_id: int) -> Optional[str]:
+    async def get_user_files(self, user_id: int) -> List[Dict]:
+        """همه فایل‌های فعال کاربر به ترتیب ایجاد"""
+        async with self._get_user_lock(user_id):
+            return list(self.active_files.get(user_id, {}).values())
+    
+    async def get_user_file_path(self, user_id: int, file_id: Optional[str] = None) -> Optional[str]:
         """دریافت مسیر فایل کاربر"""
-        file_info = await self.get_user_file_info(user_id)
-        if file_info and file_info['status'] in ['downloaded', 'processing', 'completed']:
+        file_info = await self.get_user_file_info(user_id, file_id)
+        if file_info and file_info['status'] in ['downloaded', 'queued', 'processing', 'completed']:
             return file_info['file_path']
         return None
     
-    async def cleanup_user_files(self, user_id: int, force: bool = False) -> bool:
-        """پاکسازی فایل‌های کاربر"""
+    async def cleanup_user_files(self, user_id: int, force: bool = False, file_id: Optional[str] = None) -> bool:
+        """پاکسازی فایل‌های کاربر (بدون file_id همه فایل‌ها)"""
         async with self._get_user_lock(user_id):
-            return await self._cleanup_user_files(user_id, force)
+            return await self._cleanup_user_files(user_id, force, file_id)
     
-    async def _cleanup_user_files(self, user_id: int, force: bool = False) -> bool:
+    async def _cleanup_user_files(self, user_id: int, force: bool = False, file_id: Optional[str] = None) -> bool:
         """پاکسازی داخلی فایل‌های کاربر"""
         try:
-            # لغو تسک پاکسازی قبلی
-            if user_id in self.cleanup_tasks:
-                self.cleanup_tasks[user_id].cancel()
-                del self.cleanup_tasks[user_id]
-            
-            # بررسی وضعیت فایل
-            if user_id in self.active_files:
-                file_info = self.active_files[user_id]
-                
-                # اگر فایل در حال پردازش است و force نیست، پاکسازی نکن
-                if not force and file_info['status'] in ['downloading', 'processing']:
-                    logger.info(f"Skipping cleanup for user {user_id}: file is being processed")
-                    return False
-                
-                # پاک کردن فایل‌های ورودی و خروجی
-                input_path = Path(file_info['file_path'])
-                if input_path.exists():
-                    input_path.unlink()
-                    logger.info(f"Deleted input file: {input_path}")
-                
-                output_path = file_info.get('output_file_path')
-                if output_path and Path(output_path).exists():
-                    Path(output_path).unlink()
-                    logger.info(f"Deleted output file: {output_path}")
-                
-                # حذف از فایل‌های فعال
-                del self.active_files[user_id]
+            file_ids = [file_id] if file_id is not None else list(self.active_files.get(user_id, {}))
+            success = all([self._cleanup_file(user_id, current_id, force) for current_id in file_ids])
             
             # پاک کردن دایرکتوری کاربر اگر خالی است
-            user_dir = self._get_user_directory(user_id)
-            if user_dir.exists() and not any(user_dir.iterdir()):
-                user_dir.rmdir()
-                logger.info(f"Deleted empty user directory: {user_dir}")
+            if not self.active_files.get(user_id):
+                self.active_files.pop(user_id, None)
+                user_dir = self._get_user_directory(user_id)
+                if user_dir.exists() and not any(user_dir.iterdir()):
+                    user_dir.rmdir()
+                    logger.info(f"Deleted empty user directory: {user_dir}")
             
             # پاکسازی memory leak: حذف lock و task اگر کاربر دیگر فعال نیست
             self._cleanup_user_resources(user_id)
             
             logger.info(f"Cleanup completed for user {user_id}")
-            return True
-            
+            return success
+        
         except Exception as e:
             logger.error(f"Cleanup failed for user {user_id}: {str(e)}")
             return False
     
+    def _cleanup_file(self, user_id: int, file_id: str, force: bool = False) -> bool:
+        """پاکسازی یک کار کاربر و دایرکتوری آن"""
+        # لغو تسک پاکسازی قبلی (مگر اینکه همین تسک در حال اجرا باشد)
+        task = self.cleanup_tasks.pop(file_id, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        
+        file_info = self.active_files.get(user_id, {}).get(file_id)
+        if file_info is None:
+            return True
+                
+        # اگر فایل در حال پردازش است و force نیست، پاکسازی نکن
+        if not force and file_info['status'] in ['downloading', 'processing']:
+            logger.info(f"Skipping cleanup of {file_id} for user {user_id}: file is being processed")
+            return False
+                
+        # توقف کار در حال اجرا پیش از حذف فایل‌ها
+        if file_info['status'] in ['downloading', 'processing'] and file_info.get('cancel_token'):
+            file_info['cancel_token'].cancel('cleanup')
+                
+        # پاک کردن فایل‌های ورودی و خروجی
+        input_path = Path(file_info['file_path'])
+        if input_path.exists():
+            input_path.unlink()
+            logger.info(f"Deleted input file: {input_path}")
+                
+        output_paths = file_info.get('output_file_paths') or [file_info.get('output_file_path')]
+        for output_path in output_paths:
+            if output_path and Path(output_path).exists():
+                Path(output_path).unlink()
+                logger.info(f"Deleted output file: {output_path}")
+                
+        # حذف دایرکتوری‌های خالی کار (ورودی و خروجی)
+        for directory in {input_path.parent, *(Path(path).parent for path in output_paths if path)}:
+            if directory.exists() and directory != self.base_temp_dir and not any(directory.iterdir()):
+                directory.rmdir()
+        
+        # حذف از فایل‌های فعال
+        del self.active_files[user_id][file_id]
+        return True
+    
     def _cleanup_user_resources(self, user_id: int):
         """پاکسازی منابع حافظه برای کاربر غیرفعال"""
         try:
-            # اگر کاربر فایل فعال ندارد، lock و task را پاک کن
+            # اگر کاربر فایل فعال ندارد، lock را پاک کن
             if user_id not in self.active_files:
                 # پاک کردن lock
                 if user_id in self.user_locks:
                     del self.user_locks[user_id]
                     logger.debug(f"Cleaned up lock for user {user_id}")
                 
-                # پاک کردن cleanup task
-                if user_id in self.cleanup_tasks:
-                    if not self.cleanup_tasks[user_id].done():
-                        self.cleanup_tasks[user_id].cancel()
-                    del self.cleanup_tasks[user_id]
-                    logger.debug(f"Cleaned up task for user {user_id}")
-        
         except Exception as e:
             logger.error(f"Failed to cleanup resources for user {user_id}: {str(e)}")
     
-    def _schedule_cleanup(self, user_id: int, delay_minutes: int = 5):
-        """برنامه‌ریزی پاکسازی خودکار"""
+    def _schedule_cleanup(self, user_id: int, file_id: str, delay_minutes: int = 5):
+        """برنامه‌ریزی پاکسازی خودکار یک کار"""
         async def delayed_cleanup():
             try:
                 await asyncio.sleep(delay_minutes * 60)
-                await self.cleanup_user_files(user_id)
+                file_info = self._get_file(user_id, file_id)
+                if file_info and file_info['status'] == 'processing':
+                    # پایان مهلت پردازش: لغو کار (پاکسازی توسط خود کار انجام می‌شود)
+                    await self.cancel_user_job(user_id, 'timeout', file_id)
+                else:
+                    await self.cleanup_user_files(user_id, file_id=file_id)
             except asyncio.CancelledError:
                 pass
             except Exception as e:
                 logger.error(f"Scheduled cleanup failed for user {user_id}: {str(e)}")
         
         # لغو تسک قبلی
-        if user_id in self.cleanup_tasks:
-            self.cleanup_tasks[user_id].cancel()
+        if file_id in self.cleanup_tasks:
+            self.cleanup_tasks[file_id].cancel()
         
         # ایجاد تسک جدید
-        self.cleanup_tasks[user_id] = asyncio.create_task(delayed_cleanup())
+        self.cleanup_tasks[file_id] = asyncio.create_task(delayed_cleanup())
     
     def _start_periodic_cleanup(self):
         """شروع پاکسازی دوره‌ای"""
@@ -322,17 +409,20 @@ class UserFileManager:
         asyncio.create_task(periodic_cleanup())
     
     async def _cleanup_old_files(self):
-        """پاکسازی فایل‌های قدیمی"""
-        cutoff_time = datetime.now() - timedelta(hours=2)
-        users_to_cleanup = []
+        """پاکسازی فایل‌های قدیمی (کارهایی که مهلتشان هنوز تمام نشده نگه داشته می‌شوند)"""
+        now = datetime.now()
+        cutoff_time = now - timedelta(hours=2)
+        files_to_cleanup = []
         
-        for user_id, file_info in self.active_files.items():
-            if file_info['created_at'] < cutoff_time:
-                users_to_cleanup.append(user_id)
+        for user_id, user_files in self.active_files.items():
+            for file_id, file_info in user_files.items():
+                expires_at = file_info.get('expires_at')
+                if file_info['created_at'] < cutoff_time and not (expires_at and expires_at > now):
+                    files_to_cleanup.append((user_id, file_id))
         
-        for user_id in users_to_cleanup:
-            await self.cleanup_user_files(user_id, force=True)
-            logger.info(f"Force cleaned up old files for user {user_id}")
+        for user_id, file_id in files_to_cleanup:
+            await self.cleanup_user_files(user_id, force=True, file_id=file_id)
+            logger.info(f"Force cleaned up old file {file_id} for user {user_id}")
     
     async def _cleanup_orphaned_resources(self):
         """پاکسازی منابع یتیم (locks و tasks بدون فایل فعال)"""
@@ -349,17 +439,18 @@ class UserFileManager:
                 logger.debug(f"Cleaned up orphaned lock for user {user_id}")
             
             # پیدا کردن tasks یتیم
+            active_file_ids = {file_id for user_files in self.active_files.values() for file_id in user_files}
             orphaned_tasks = []
-            for user_id in list(self.cleanup_tasks.keys()):
-                if user_id not in self.active_files:
-                    orphaned_tasks.append(user_id)
+            for file_id in list(self.cleanup_tasks.keys()):
+                if file_id not in active_file_ids:
+                    orphaned_tasks.append(file_id)
             
             # پاک کردن tasks یتیم
-            for user_id in orphaned_tasks:
-                if not self.cleanup_tasks[user_id].done():
-                    self.cleanup_tasks[user_id].cancel()
-                del self.cleanup_tasks[user_id]
-                logger.debug(f"Cleaned up orphaned task for user {user_id}")
+            for file_id in orphaned_tasks:
+                if not self.cleanup_tasks[file_id].done():
+                    self.cleanup_tasks[file_id].cancel()
+                del self.cleanup_tasks[file_id]
+                logger.debug(f"Cleaned up orphaned task for file {file_id}")
             
             if orphaned_locks or orphaned_tasks:
                 logger.info(f"Cleaned up {len(orphaned_locks)} orphaned locks and {len(orphaned_tasks)} orphaned tasks")
@@ -369,17 +460,19 @@ class UserFileManager:
     
     async def get_system_stats(self) -> Dict:
         """دریافت آمار سیستم"""
-        total_active_files = len(self.active_files)
+        all_files = [file_info for user_files in self.active_files.values() for file_info in user_files.values()]
+        total_active_files = len(all_files)
         total_size = 0
         status_counts = {}
         
-        for file_info in self.active_files.values():
+        for file_info in all_files:
             total_size += file_info.get('actual_size', file_info['file_size'])
             status = file_info['status']
             status_counts[status] = status_counts.get(status, 0) + 1
         
         return {
             'active_files': total_active_files,
+            'active_users': len(self.active_files),
             'total_size_mb': round(total_size / (1024 * 1024), 2),
             'status_breakdown': status_counts,
             'base_directory': str(self.base_temp_dir),
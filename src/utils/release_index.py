@@ -0,0 +1,253 @@
+"""
+Release Fingerprint Index
+حل مشکل ترجمه دوباره نسخه‌های مختلف یک زیرنویس با تایمینگ یا تقسیم‌بندی متفاوت
+"""
+
+import json
+import re
+import itertools
+import uuid
+import zlib
+import logging
+from collections import deque
+from difflib import SequenceMatcher
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Any, Set, Iterable
+
+logger = logging.getLogger(__name__)
+
+class ReleaseIndex:
+    """
+    نمایه اثر انگشت متنی کارهای ترجمه تکمیل شده
+
+    اثر انگشت هر فایل مجموعه‌ای از هش‌های غلتان روی k کلمه متوالی متن
+    نرمال شده زیرنویس‌هاست که با winnowing نمونه‌برداری می‌شود؛ چون هر هش
+    فقط به چند کلمه مجاور وابسته است، جابجایی تایمینگ، تقسیم متفاوت خطوط یا
+    درج چند خط اضافه فقط بخش کوچکی از هش‌ها را تغییر می‌دهد.
+
+    اثر انگشت و ذخیره‌سازی به صورت جریانی روی متن‌ها انجام می‌شوند و فقط
+    پس از یافتن نسخه مشابه، متن کامل فایل برای هم‌ترازی خوانده می‌شود.
+    """
+    
+    TAG_PATTERN = re.compile(r'</?[a-zA-Z][^<>]*>|\{\\[^{}]*\}')
+    WORD_PATTERN = re.compile(r'\w+')
+    HASH_MODULUS = (1 << 61) - 1
+    HASH_BASE = 1000003
+    
+    def __init__(self, index_dir: str, shingle_words: int = 8, window: int = 4,
+                 match_threshold: float = 0.5, retention_days: int = 30):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.shingle_words = shingle_words
+        self.window = window
+        self.match_threshold = self._coerce(match_threshold, 0.5)
+        self.retention_days = self._coerce(retention_days, 30)
+        
+        # هش -> شناسه نسخه‌ها، به تفکیک زبان مقصد
+        self.postings: Dict[str, Dict[int, Set[str]]] = {}
+        self.releases: Dict[str, Dict[str, Any]] = {}
+        self._load_index()
+    
+    @staticmethod
+    def _coerce(value: Any, default: float) -> float:
+        """تبدیل مقدار تنظیمات به عدد؛ مقدار نامعتبر با پیش‌فرض جایگزین می‌شود"""
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            logger.warning(f"Invalid release index setting {value!r}, using {default}")
+            return default
+    
+    def normalize(self, text: str) -> str:
+        """نرمال‌سازی متن زیرنویس برای مقایسه"""
+        return ' '.join(self.WORD_PATTERN.findall(self.TAG_PATTERN.sub(' ', text).lower()))
+    
+    def fingerprint(self, texts: Iterable[str]) -> Set[int]:
+        """محاسبه اثر انگشت متنی یک فایل (یک بار پیمایش متن‌ها با حافظه ثابت)"""
+        k = self.shingle_words
+        modulus, base = self.HASH_MODULUS, self.HASH_BASE
+        drop = pow(base, k - 1, modulus)
+        words = deque()
+        hashes = deque(maxlen=self.window)
+        fingerprint = set()
+        rolling = 0
+        shingles = 0
+        
+        for text in texts:
+            for word in self.normalize(text).split():
+                value = zlib.crc32(word.encode('utf-8'))
+                # هش غلتان چندجمله‌ای روی پنجره k کلمه‌ای
+                if len(words) == k:
+                    rolling = (rolling - words.popleft() * drop) % modulus
+                words.append(value)
+                rolling = (rolling * base + value) % modulus
+                if len(words) < k:
+                    continue
+                
+                # winnowing: کمینه هر پنجره
+                hashes.append(rolling)
+                shingles += 1
+                if len(hashes) == self.window:
+                    fingerprint.add(min(hashes))
+        
+        if 0 < shingles < self.window:
+            fingerprint.add(min(hashes))
+        return fingerprint
+    
+    def find_match(self, fingerprint: Set[int], target_language: str) -> Optional[str]:
+        """یافتن نسخه ذخیره شده با بیشترین هم‌پوشانی اثر انگشت"""
+        postings = self.postings.get(target_language)
+        if not fingerprint or not postings:
+            return None
+        
+        overlap: Dict[str, int] = {}
+        for value in fingerprint:
+            for release_id in postings.get(value, ()):
+                overlap[release_id] = overlap.get(release_id, 0) + 1
+        
+        best_id, best_score = None, self.match_threshold
+        for release_id, shared in overlap.items():
+            size = self.releases[release_id]['size']
+            score = shared / min(len(fingerprint), size)
+            if score >= best_score:
+                best_id, best_score = release_id, score
+        
+        if best_id:
+            logger.info(f"Upload matches release {best_id} ({best_score:.0%} fingerprint overlap)")
+        return best_id
+    
+    def align(self, texts: Iterable[str], target_language: str,
+              fingerprint: Optional[Set[int]] = None) -> Dict[int, str]:
+        """
+        تطبیق زیرنویس‌های فایل جدید با ترجمه نسخه مشابه ذخیره شده
+
+        Args:
+            texts: متن زیرنویس‌ها؛ اگر اثر انگشت داده شود فقط در صورت یافتن نسخه مشابه پیمایش می‌شود
+            target_language: زبان مقصد
+            fingerprint: اثر انگشت از پیش محاسبه شده همین متن‌ها
+        
+        Returns:
+            موقعیت زیرنویس -> ترجمه، فقط برای زیرنویس‌های هم‌تراز شده
+        """
+        if fingerprint is None:
+            texts = list(texts)
+            fingerprint = self.fingerprint(texts)
+        release_id = self.find_match(fingerprint, target_language)
+        if not release_id:
+            return {}
+        return self.align_release(release_id, texts)
+    
+    def align_release(self, release_id: str, texts: Iterable[str]) -> Dict[int, str]:
+        """هم‌ترازی زیرنویس‌ها با ترجمه یک نسخه ذخیره شده"""
+        try:
+            with open(self.index_dir / f"{release_id}.json", 'r', encoding='utf-8') as f:
+                stored = json.load(f)['cues']
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to read release {release_id}: {str(e)}")
+            return {}
+        
+        # هم‌ترازی توالی متن‌های نرمال شده؛ بخش‌های متفاوت ترجمه می‌شوند
+        new_keys = [self.normalize(text) for text in texts]
+        matcher = SequenceMatcher(None, new_keys, [source for source, _ in stored], autojunk=False)
+        aligned = {}
+        for block in matcher.get_matching_blocks():
+            for offset in range(block.size):
+                if new_keys[block.a + offset]:
+                    aligned[block.a + offset] = stored[block.b + offset][1]
+        
+        logger.info(f"Aligned {len(aligned)}/{len(new_keys)} subtitles with release {release_id}")
+        return aligned
+    
+    def store(self, job_id: str, source_texts: Iterable[str], translations: Iterable[str], target_language: str,
+              fingerprint: Optional[Set[int]] = None) -> Optional[str]:
+        """
+        ذخیره اثر انگشت و ترجمه یک کار تکمیل شده
+
+        متن‌ها به صورت جریانی در فایل نسخه نوشته می‌شوند؛ با اثر انگشت از پیش
+        محاسبه شده، source_texts فقط یک بار پیمایش می‌شود.
+        """
+        path = None
+        try:
+            if fingerprint is None:
+                source_texts = list(source_texts)
+                fingerprint = self.fingerprint(source_texts)
+            if not fingerprint:
+                return None
+            
+            # نسخه تکراری دوباره ذخیره نمی‌شود
+            existing = self.find_match(fingerprint, target_language)
+            if existing and self.releases[existing]['size'] == len(fingerprint):
+                return existing
+            
+            release_id = uuid.uuid4().hex[:16]
+            header = {
+                'job_id': job_id,
+                'target_language': target_language,
+                'created_at': datetime.now().isoformat(),
+                'fingerprint': sorted(fingerprint)
+            }
+            path = self.index_dir / f"{release_id}.json"
+            missing = object()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "cues": [')
+                for i, (source, translated) in enumerate(itertools.zip_longest(source_texts, translations,
+                                                                               fillvalue=missing)):
+                    if source is missing or translated is missing:
+                        raise ValueError("source and translation counts differ")
+                    f.write((', ' if i else '') + json.dumps([self.normalize(source), translated], ensure_ascii=False))
+                f.write(']}')
+            
+            self._add_to_index(release_id, target_language, fingerprint)
+            logger.info(f"Stored release fingerprint {release_id} for job {job_id}")
+            return release_id
+        
+        except Exception as e:
+            logger.error(f"Failed to store release fingerprint for job {job_id}: {str(e)}")
+            if path is not None and path.exists():
+                path.unlink()
+            return None
+    
+    def _add_to_index(self, release_id: str, target_language: str, fingerprint: Set[int]):
+        """افزودن اثر انگشت به نمایه حافظه"""
+        self.releases[release_id] = {'target_language': target_language, 'size': len(fingerprint)}
+        postings = self.postings.setdefault(target_language, {})
+        for value in fingerprint:
+            postings.setdefault(value, set()).add(release_id)
+    
+    def _load_index(self):
+        """بارگذاری اثر انگشت‌های ذخیره شده و حذف موارد منقضی"""
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        for path in self.index_dir.glob('*.json'):
+            try:
+                if datetime.fromtimestamp(path.stat().st_mtime) < cutoff:
+                    path.unlink()
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+                self._add_to_index(path.stem, record['target_language'], set(record['fingerprint']))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Failed to load release fingerprint {path}: {str(e)}")
+        
+        if self.releases:
+            logger.info(f"Loaded {len(self.releases)} release fingerprints")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار نمایه اثر انگشت"""
+        return {
+            'releases': len(self.releases),
+            'directory': str(self.index_dir)
+        }
+
+# سینگلتون برای استفاده در سراسر برنامه
+_release_index = None
+
+def get_release_index(index_dir: str = None, match_threshold: float = 0.5, retention_days: int = 30) -> ReleaseIndex:
+    """دریافت نمونه نمایه اثر انگشت نسخه‌ها (Singleton)"""
+    global _release_index
+    if _release_index is None:
+        if index_dir is None:
+            raise ValueError("index_dir must be provided for first initialization")
+        _release_index = ReleaseIndex(index_dir, match_threshold=match_threshold, retention_days=retention_days)
+    return _release_index
\ No newline at end of file
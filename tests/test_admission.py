@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from src.services import admission
+from src.services.admission import AdmissionController
+from src.services.job_queue import TranslationJob, TranslationJobQueue
+from src.utils.file_manager import UserFileManager
+
+async def fill_queue(queue, count):
+    release = asyncio.Event()
+    
+    async def blocked():
+        await release.wait()
+    
+    for user_id in range(1, count + 1):
+        await queue.submit(TranslationJob(user_id, blocked))
+    await asyncio.sleep(0.01)
+    return release
+
+@pytest.mark.asyncio
+async def test_free_tier_is_shed_before_paid_plans(tmp_path, monkeypatch):
+    monkeypatch.setattr(admission, 'current_rss_mb', lambda: 100.0)
+    queue = TranslationJobQueue(workers=1, max_size=10)
+    controller = AdmissionController(queue, UserFileManager(str(tmp_path)), memory_limit_mb=512,
+                                     free_shed_ratio=0.8)
+    release = await fill_queue(queue, 9)  # یکی در حال اجرا، هشت در انتظار
+    
+    free = controller.check(50, 'free')
+    assert not free['allowed']
+    assert free['reason'] == 'queue'
+    assert free['retry_after_seconds'] == 60  # یک کار پیش‌فرض ۶۰ ثانیه‌ای با یک کارگر
+    assert controller.check(51, 'monthly')['allowed']
+    assert not controller.check(52, None)['allowed']
+    assert controller.get_stats()['rejections'] == {'queue:shed': 2}
+    
+    release.set()
+    await queue.stop()
+
+@pytest.mark.asyncio
+async def test_memory_and_user_limits_refuse_everyone(tmp_path, monkeypatch):
+    manager = UserFileManager(str(tmp_path))
+    queue = TranslationJobQueue(workers=2, max_size=100)
+    controller = AdmissionController(queue, manager, max_concurrent_users=2, memory_limit_mb=512)
+    
+    monkeypatch.setattr(admission, 'current_rss_mb', lambda: 600.0)
+    decision = controller.check(1, 'yearly')
+    assert (decision['allowed'], decision['reason']) == (False, 'memory')
+    
+    monkeypatch.setattr(admission, 'current_rss_mb', lambda: 100.0)
+    for user_id in (1, 2):
+        await manager.prepare_user_upload(user_id, "movie.srt", 4, 2)
+    assert controller.check(1, 'yearly')['allowed']  # کاربر فعال کاربر جدیدی حساب نمی‌شود
+    assert controller.check(3, 'yearly')['reason'] == 'users'
\ No newline at end of file
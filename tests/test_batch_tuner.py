@@ -0,0 +1,32 @@
+from src.translation.batch_tuner import BatchSizeTuner
+
+def feed(tuner, count, latency, success=True, unparsed=0):
+    for _ in range(count):
+        size = tuner.batch_size
+        tuner.observe(size, size * 10, latency(size), success=success, unparsed=unparsed)
+
+def test_fixed_size_without_bounds():
+    tuner = BatchSizeTuner(10)
+    feed(tuner, 20, lambda size: 1.0)
+    assert tuner.batch_size == 10
+    assert not tuner.adaptive
+
+def test_grows_while_throughput_improves():
+    tuner = BatchSizeTuner(10, 4, 40, window=4)
+    # هزینه ثابت هر درخواست: بسته‌های بزرگ‌تر بازدهی بیشتری دارند
+    feed(tuner, 40, lambda size: 2.0 + size * 0.05)
+    assert tuner.batch_size == 40
+    assert tuner.get_stats()['batch_adjustments'] > 0
+
+def test_shrinks_on_failures_and_tail_latency():
+    tuner = BatchSizeTuner(20, 4, 40, window=4, target_p95_seconds=10)
+    feed(tuner, 4, lambda size: 1.0, success=False)
+    assert tuner.batch_size == 10
+    assert tuner.last_reason == 'failures'
+    
+    feed(tuner, 4, lambda size: 15.0)
+    assert tuner.batch_size == 5
+    assert tuner.last_reason == 'tail_latency'
+    
+    feed(tuner, 8, lambda size: 1.0, unparsed=3)
+    assert tuner.batch_size == 4
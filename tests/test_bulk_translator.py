@@ -0,0 +1,62 @@
+import pytest
+from src.translation import BulkTranslator, LocalBulkBackend
+from src.translation.bulk import BULK_PENDING
+
+async def upper_responder(messages):
+    """Answer a numbered batch by upper-casing each line, dropping the line 'skip'"""
+    lines = messages[1]['content'].split('\n')
+    if any('fail' in line for line in lines):
+        raise RuntimeError("provider error")
+    return '\n'.join(line.upper() for line in lines if not line.endswith('|skip'))
+
+class SlowLocalBackend(LocalBulkBackend):
+    """Local backend that reports a batch pending for the first polls"""
+    
+    def __init__(self, directory, respond, pending_polls):
+        super().__init__(directory, respond)
+        self.pending_polls = pending_polls
+        self.polls = 0
+    
+    async def poll(self, batch_id):
+        self.polls += 1
+        if self.polls <= self.pending_polls:
+            return BULK_PENDING
+        return await super().poll(batch_id)
+
+@pytest.mark.asyncio
+async def test_bulk_translates_unique_lines_in_one_batch(tmp_path):
+    backend = SlowLocalBackend(str(tmp_path), upper_responder, pending_polls=2)
+    bulk = BulkTranslator(backend, batch_size=2, poll_interval=0)
+    
+    translations = await bulk.translate(["hello", "world", "hello", "again"], "Persian")
+    
+    assert translations == {"hello": "HELLO", "world": "WORLD", "again": "AGAIN"}
+    assert backend.polls == 3
+    assert bulk.get_stats()['batches'] == 1
+    assert bulk.get_stats()['requests'] == 2
+    assert len(list(tmp_path.glob('*.input.jsonl'))) == 1
+
+@pytest.mark.asyncio
+async def test_unanswered_lines_are_left_for_the_online_path(tmp_path):
+    bulk = BulkTranslator(LocalBulkBackend(str(tmp_path), upper_responder), batch_size=2, poll_interval=0)
+    
+    translations = await bulk.translate(["one", "skip", "fail", "two"], "Persian")
+    
+    # "skip" is missing from its reply and the request holding "fail" errored
+    assert translations == {"one": "ONE"}
+    assert bulk.get_stats()['translated_lines'] == 1
+
+@pytest.mark.asyncio
+async def test_batch_that_never_finishes_is_cancelled(tmp_path):
+    backend = SlowLocalBackend(str(tmp_path), upper_responder, pending_polls=1000)
+    cancelled = []
+    
+    async def cancel(batch_id):
+        cancelled.append(batch_id)
+    
+    backend.cancel = cancel
+    bulk = BulkTranslator(backend, poll_interval=0.01, max_wait_seconds=0.03)
+    
+    with pytest.raises(Exception, match="did not complete"):
+        await bulk.translate(["line"], "Persian")
+    assert len(cancelled) == 1
\ No newline at end of file
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from src.utils import CancellationToken, CancellationError
+
+@pytest.mark.asyncio
+async def test_cancel_aborts_running_work():
+    token = CancellationToken()
+    aborted = asyncio.Event()
+    
+    async def long_job():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            aborted.set()
+            raise
+    
+    job = asyncio.create_task(token.run(long_job()))
+    await asyncio.sleep(0.01)
+    assert token.cancel('user')
+    
+    with pytest.raises(CancellationError) as error:
+        await job
+    assert error.value.details['reason'] == 'user'
+    assert aborted.is_set()
+    assert not token.cancel('again')
+
+@pytest.mark.asyncio
+async def test_cancelled_token_refuses_new_work():
+    token = CancellationToken()
+    token.cancel('timeout')
+    
+    async def job():
+        return 1
+    
+    with pytest.raises(CancellationError):
+        await token.run(job())
+
+@pytest.mark.asyncio
+async def test_outer_cancellation_is_not_reported_as_job_cancel():
+    token = CancellationToken()
+    outer = asyncio.create_task(token.run(asyncio.sleep(10)))
+    await asyncio.sleep(0)
+    outer.cancel()
+    
+    with pytest.raises(asyncio.CancelledError):
+        await outer
+    assert not token.cancelled
+
+@pytest.mark.asyncio
+async def test_file_manager_cancels_processing_job(tmp_path):
+    from src.utils.file_manager import UserFileManager
+    
+    manager = UserFileManager(str(tmp_path))
+    file_info = {'status': 'processing', 'cancel_token': CancellationToken()}
+    manager.active_files[7] = {'job1': file_info}
+    
+    assert await manager.cancel_user_job(7, 'user')
+    assert file_info['cancel_token'].reason == 'user'
+    assert not await manager.cancel_user_job(8)
@@ -0,0 +1,48 @@
+import pytest
+from src.translation import BaseTranslator, CascadeTranslator, TranslatorFactory
+from src.translation.cascade_translator import score_complexity
+
+class TierTranslator(BaseTranslator):
+    """Test tier that tags translations with its model name"""
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.model = config['model']
+        self.untranslated = set(config.get('untranslated', []))
+    
+    async def _translate_text_impl(self, text, target_language):
+        return f"{self.model}:{text}"
+    
+    async def _translate_batch_impl(self, texts, target_language):
+        return [text if text in self.untranslated else f"{self.model}:{text}" for text in texts]
+    
+    def get_provider_name(self):
+        return self.model
+
+class LocalCascade(CascadeTranslator):
+    def _create_tier(self, model):
+        untranslated = self.config.get('untranslated', []) if model == self.config['fast_model'] else []
+        return TierTranslator({**self.config, 'model': model, 'untranslated': untranslated})
+
+def test_complexity_score_separates_short_and_long_lines():
+    assert score_complexity("Yes.") < 0.2
+    assert score_complexity("...") == 0.0
+    long_line = "Notwithstanding the Chancellor's objections, we proceed: quietly, carefully, and immediately."
+    assert score_complexity(long_line) > 0.45
+
+@pytest.mark.asyncio
+async def test_cascade_routes_by_complexity_and_escalates_untranslated_lines():
+    long_line = "Notwithstanding the Chancellor's objections, we proceed: quietly, carefully, and immediately."
+    translator = LocalCascade({'model': 'big', 'fast_model': 'small', 'untranslated': ['Hey.']})
+    
+    result = await translator.translate_batch(["Yes.", long_line, "Hey."])
+    
+    assert result == ["small:Yes.", f"big:{long_line}", "big:Hey."]
+    metrics = translator.get_metrics()
+    assert metrics['routed_lines'] == {'fast': 2, 'premium': 2}
+    assert metrics['escalated_lines'] == 1
+    assert metrics['tiers']['fast']['requests'] == 1
+    assert metrics['tiers']['premium']['requests'] == 2
+
+def test_cascade_is_registered_in_factory():
+    assert 'cascade' in TranslatorFactory.get_available_providers()
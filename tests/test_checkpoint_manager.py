@@ -0,0 +1,71 @@
+from src.utils.checkpoint_manager import CheckpointManager
+
+def write_source(path, text="1\n00:00:01,000 --> 00:00:02,000\nHello\n\n"):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def test_checkpoint_resumes_recorded_ranges(tmp_path):
+    manager = CheckpointManager(str(tmp_path / "checkpoints"))
+    source = write_source(tmp_path / "movie.srt")
+    
+    checkpoint = manager.open_checkpoint(1, source, "Persian", total_subtitles=5)
+    checkpoint.record({0: "a", 1: "b", 3: "d"})
+    
+    resumed = manager.open_checkpoint(1, source, "Persian", total_subtitles=5)
+    assert resumed.job_id == checkpoint.job_id
+    assert resumed.resumed_count == 3
+    assert resumed.get(1) == "b"
+    assert resumed.get(2) is None
+
+def test_checkpoint_is_not_reused_for_other_language_or_source(tmp_path):
+    manager = CheckpointManager(str(tmp_path / "checkpoints"))
+    source = write_source(tmp_path / "movie.srt")
+    
+    manager.open_checkpoint(1, source, "Persian").record({0: "a"})
+    
+    assert manager.open_checkpoint(1, source, "Arabic").resumed_count == 0
+    
+    write_source(tmp_path / "movie.srt", "1\n00:00:01,000 --> 00:00:02,000\nChanged\n\n")
+    assert manager.open_checkpoint(1, source, "Persian").resumed_count == 0
+
+def test_truncated_line_is_skipped_and_repaired(tmp_path):
+    manager = CheckpointManager(str(tmp_path / "checkpoints"))
+    source = write_source(tmp_path / "movie.srt")
+    
+    checkpoint = manager.open_checkpoint(1, source, "Persian")
+    checkpoint.record({0: "a"})
+    with open(checkpoint.path, 'a', encoding='utf-8') as f:
+        f.write('{"start": 1, "transl')
+    
+    resumed = manager.open_checkpoint(1, source, "Persian")
+    resumed.record({1: "b"})
+    
+    assert manager.open_checkpoint(1, source, "Persian").resumed_count == 2
+
+def test_discard_removes_checkpoint(tmp_path):
+    manager = CheckpointManager(str(tmp_path / "checkpoints"))
+    source = write_source(tmp_path / "movie.srt")
+    
+    checkpoint = manager.open_checkpoint(1, source, "Persian")
+    checkpoint.discard()
+    
+    assert not checkpoint.path.exists()
+    assert manager.get_stats()['checkpoints'] == 0
+
+def test_concurrent_owners_of_same_source_get_separate_checkpoints(tmp_path):
+    manager = CheckpointManager(str(tmp_path / "checkpoints"))
+    source = write_source(tmp_path / "movie.srt")
+    
+    first = manager.open_checkpoint(1, source, "Persian", owner="file_a")
+    second = manager.open_checkpoint(1, source, "Persian", owner="file_b")
+    first.record({0: "a"})
+    
+    assert second.job_id != first.job_id
+    assert second.path != first.path
+    assert manager.get_stats()['in_use'] == 2
+    
+    manager.release(first)
+    manager.release(second)
+    again = manager.open_checkpoint(1, source, "Persian", owner="file_c")
+    assert again.job_id == first.job_id
+    assert again.resumed_count == 1
\ No newline at end of file
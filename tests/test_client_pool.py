@@ -0,0 +1,55 @@
+import logging
+import pytest
+from src.translation import client_pool
+from src.translation.client_pool import ClientRegistry
+
+@pytest.mark.asyncio
+async def test_clients_are_shared_per_endpoint_and_key():
+    registry = ClientRegistry(max_connections=4, max_keepalive_connections=2)
+
+    first = registry.acquire("key-a")
+    second = registry.acquire("key-a")
+    other_key = registry.acquire("key-b")
+    other_url = registry.acquire("key-a", "http://localhost:8000/v1")
+
+    assert first is second
+    assert first is not other_key
+    assert first is not other_url
+
+    stats = registry.get_stats()
+    assert stats['clients'] == 3
+    assert stats['created'] == 3
+    assert stats['reused'] == 1
+    assert stats['max_connections'] == 4
+
+    await registry.close_all()
+
+@pytest.mark.asyncio
+async def test_release_closes_client_after_last_reference():
+    registry = ClientRegistry()
+
+    client = registry.acquire("key-a")
+    registry.acquire("key-a")
+
+    await registry.release(client)
+    assert registry.get_stats()['clients'] == 1
+
+    await registry.release(client)
+    stats = registry.get_stats()
+    assert stats['clients'] == 0
+    assert stats['closed'] == 1
+    assert client.is_closed()
+
+def test_registry_limits_apply_once_and_conflicts_are_logged(monkeypatch, caplog):
+    monkeypatch.setattr(client_pool, '_client_registry', None)
+
+    registry = client_pool.get_client_registry(max_connections=50)
+    with caplog.at_level(logging.WARNING, logger=client_pool.__name__):
+        assert client_pool.get_client_registry() is registry
+        assert not caplog.records
+        assert client_pool.get_client_registry(max_connections=50, keepalive_expiry=5) is registry
+
+    assert registry.limits.max_connections == 50
+    assert registry.limits.keepalive_expiry == 30.0
+    assert 'keepalive_expiry' in caplog.text
+    assert 'max_connections' not in caplog.text
\ No newline at end of file
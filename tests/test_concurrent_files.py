@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.utils.file_manager import UserFileManager
+
+async def upload(manager, user_id, filename, max_files):
+    file_info = await manager.prepare_user_upload(user_id, filename, 4, max_files)
+    await manager.start_file_download(user_id, file_info['file_id'])
+    Path(file_info['file_path']).write_text("test")
+    await manager.complete_file_download(user_id, file_info['file_id'])
+    return file_info
+
+@pytest.mark.asyncio
+async def test_user_runs_several_jobs_up_to_plan_limit(tmp_path):
+    manager = UserFileManager(str(tmp_path))
+    first = await upload(manager, 5, "episode1.srt", max_files=2)
+    second = await upload(manager, 5, "episode1.srt", max_files=2)
+    
+    assert first['file_id'] != second['file_id']
+    assert Path(first['file_path']).parent != Path(second['file_path']).parent
+    assert not await manager.can_upload_file(5, max_files=2)
+    with pytest.raises(Exception):
+        await manager.prepare_user_upload(5, "episode3.srt", 4, 2)
+    
+    await manager.start_file_processing(5, file_id=first['file_id'])
+    await manager.complete_file_processing(5, first['file_path'], file_id=first['file_id'])
+    assert (await manager.get_user_file_info(5, second['file_id']))['status'] == 'downloaded'
+    assert await manager.can_upload_file(5, max_files=2)
+    assert (await manager.get_system_stats())['active_files'] == 2
+
+@pytest.mark.asyncio
+async def test_cleanup_and_cancel_target_one_job(tmp_path):
+    manager = UserFileManager(str(tmp_path))
+    first = await upload(manager, 6, "a.srt", max_files=3)
+    second = await upload(manager, 6, "b.srt", max_files=3)
+    await manager.start_file_processing(6, file_id=second['file_id'])
+    
+    assert await manager.cancel_user_job(6, 'user', second['file_id'])
+    assert not first['cancel_token'].cancelled
+    
+    assert await manager.cleanup_user_files(6, file_id=first['file_id'])
+    assert not Path(first['file_path']).parent.exists()
+    assert [info['file_id'] for info in await manager.get_user_files(6)] == [second['file_id']]
+    
+    await manager.cleanup_user_files(6, force=True)
+    assert await manager.get_user_files(6) == []
+    assert not (tmp_path / "user_6").exists()
+
+@pytest.mark.asyncio
+async def test_old_file_sweep_spares_jobs_within_their_time_limit(tmp_path):
+    manager = UserFileManager(str(tmp_path))
+    stale = await upload(manager, 8, "old.srt", max_files=2)
+    bulk = await upload(manager, 8, "bulk.srt", max_files=2)
+    await manager.queue_file_processing(8, bulk['file_id'], hold_minutes=24 * 60)
+    for file_info in (stale, bulk):
+        file_info['created_at'] -= timedelta(hours=3)
+    
+    await manager._cleanup_old_files()
+    
+    assert [info['file_id'] for info in await manager.get_user_files(8)] == [bulk['file_id']]
+    assert bulk['expires_at'] > datetime.now()
\ No newline at end of file
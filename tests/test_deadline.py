@@ -0,0 +1,54 @@
+import asyncio
+import time
+import pytest
+from src.translation import BaseTranslator, Deadline
+
+class StuckTranslator(BaseTranslator):
+    """Test translator whose requests hang until cancelled"""
+    
+    async def _translate_text_impl(self, text, target_language):
+        return text
+    
+    async def _translate_batch_impl(self, texts, target_language):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return texts
+    
+    def get_provider_name(self):
+        return "Stuck"
+
+def test_request_timeout_is_capped_by_time_left():
+    deadline = Deadline(5)
+    assert deadline.timeout(60) <= 5
+    assert deadline.timeout(1) == 1
+    assert Deadline().timeout(60) == 60
+    assert Deadline().timeout() is None
+    assert not deadline.expired
+
+@pytest.mark.asyncio
+async def test_stuck_request_fails_at_job_deadline():
+    translator = StuckTranslator({'batch_size': 5, 'max_concurrency': 2, 'timeout_seconds': 60})
+    translator.cancelled = 0
+    
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await translator.translate_batch(["one", "two"], "Persian", deadline=Deadline(0.05))
+    
+    assert time.monotonic() - started < 1
+    assert translator.cancelled == 1
+    assert translator.metrics.totals['failures'] == 1
+    assert translator.dispatcher.active == 0
+
+@pytest.mark.asyncio
+async def test_expired_deadline_sends_no_request():
+    translator = StuckTranslator({'batch_size': 5})
+    translator.cancelled = 0
+    deadline = Deadline(0.01)
+    await asyncio.sleep(0.02)
+    
+    with pytest.raises(TimeoutError):
+        await translator.translate_batch(["one"], "Persian", deadline=deadline)
+    assert translator.metrics.totals['requests'] == 0
\ No newline at end of file
@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from src.translation import BaseTranslator
+
+class StallingTranslator(BaseTranslator):
+    """Test translator whose first call for a marked batch stalls"""
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.calls = 0
+        self.cancelled = 0
+    
+    async def _translate_text_impl(self, text, target_language):
+        return text
+    
+    async def _translate_batch_impl(self, texts, target_language):
+        self.calls += 1
+        if texts[0] == "slow" and self.calls == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return [f"fa:{text}" for text in texts]
+    
+    def get_provider_name(self):
+        return "Stalling"
+
+def warm_up(translator, requests=40, latency=0.01):
+    for _ in range(requests):
+        translator.metrics.record_batch(lines=1, estimated_tokens=5, latency_seconds=latency)
+
+@pytest.mark.asyncio
+async def test_slow_batch_is_hedged_and_loser_cancelled():
+    translator = StallingTranslator({'batch_size': 1, 'hedge_requests': True})
+    warm_up(translator)
+    
+    result = await asyncio.wait_for(translator.translate_batch(["slow"]), timeout=2)
+    await asyncio.sleep(0)
+    
+    assert result == ["fa:slow"]
+    assert translator.metrics.totals['hedges'] == 1
+    assert translator.metrics.totals['hedge_wins'] == 1
+    assert translator.cancelled == 1
+
+@pytest.mark.asyncio
+async def test_hedges_respect_budget_and_need_history():
+    translator = StallingTranslator({'batch_size': 1, 'hedge_requests': True, 'hedge_budget_ratio': 0.05})
+    
+    # بدون سابقه تأخیر، درخواست تکراری ارسال نمی‌شود
+    assert translator.metrics.latency_percentile_for_size(95, 1) is None
+    
+    warm_up(translator, requests=10)
+    translator.metrics.totals['hedges'] = 1
+    task = asyncio.create_task(translator.translate_batch(["slow"]))
+    await asyncio.sleep(0.1)
+    
+    assert not task.done()
+    assert translator.calls == 1
+    task.cancel()
+
+@pytest.mark.asyncio
+async def test_cancel_before_hedge_delay_cancels_primary_request():
+    translator = StallingTranslator({'batch_size': 1, 'hedge_requests': True})
+    warm_up(translator, latency=1.0)
+    
+    task = asyncio.create_task(translator.translate_batch(["slow"]))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0)
+    
+    assert translator.calls == 1
+    assert translator.cancelled == 1
+
+@pytest.mark.asyncio
+async def test_hedge_needs_a_free_slot_of_its_own():
+    translator = StallingTranslator({'batch_size': 1, 'hedge_requests': True, 'max_concurrency': 1})
+    warm_up(translator)
+    
+    task = asyncio.create_task(translator.translate_batch(["slow"]))
+    await asyncio.sleep(0.1)
+    
+    # اسلات تنها در اختیار درخواست اصلی است
+    assert translator.calls == 1
+    assert translator.dispatcher.active == 1
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    
+    translator = StallingTranslator({'batch_size': 1, 'hedge_requests': True, 'max_concurrency': 2})
+    warm_up(translator)
+    assert await asyncio.wait_for(translator.translate_batch(["slow"]), timeout=2) == ["fa:slow"]
+    await asyncio.sleep(0)
+    assert translator.metrics.totals['hedges'] == 1
+    assert translator.dispatcher.active == 0
\ No newline at end of file
@@ -0,0 +1,56 @@
+from src.translation import BaseTranslator, JobEstimator
+from src.translation.tokens import estimate_tokens
+
+class EchoTranslator(BaseTranslator):
+    """Test translator returning its input"""
+    
+    async def _translate_text_impl(self, text, target_language):
+        return text
+    
+    async def _translate_batch_impl(self, texts, target_language):
+        return list(texts)
+    
+    def get_provider_name(self):
+        return "Echo"
+
+def test_token_approximation_weights_non_latin_text_higher():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hello there") == 3
+    assert estimate_tokens("سلام دوست من") > estimate_tokens("Hi my friend")
+
+def test_estimate_follows_packing_and_concurrency():
+    translator = EchoTranslator({'batch_size': 4, 'max_concurrency': 2})
+    translator.cache[translator._get_cache_key("cached", "Persian")] = "ذخیره"
+    
+    texts = [f"line {i}" for i in range(10)] + ["line 0", "cached"]
+    estimate = JobEstimator(translator, default_tokens_per_second=10).estimate(texts, "Persian")
+    
+    assert estimate['total_lines'] == 12
+    assert estimate['cached_lines'] == 1
+    assert estimate['unique_lines'] == 10
+    assert estimate['requests'] == 3
+    assert estimate['throughput_source'] == 'default'
+    assert estimate['input_tokens'] > estimate['unique_lines']
+    assert estimate['eta_seconds'] > 0
+
+def test_estimate_uses_measured_throughput():
+    translator = EchoTranslator({'batch_size': 10, 'max_concurrency': 1})
+    translator.metrics.record_batch(lines=10, estimated_tokens=100, latency_seconds=1.0)
+    
+    estimate = JobEstimator(translator).estimate(["x" * 40] * 1 + [f"y{i}" * 20 for i in range(9)], "Persian")
+    
+    assert estimate['throughput_source'] == 'measured'
+    assert estimate['requests'] == 1
+    assert translator.metrics.snapshot()['latency_p50'] == 1.0
+
+def test_estimate_without_target_languages_is_zero():
+    translator = EchoTranslator({'batch_size': 4})
+    
+    estimate = JobEstimator(translator).estimate_languages(["line 1", "line 2"], [])
+    
+    assert estimate['total_lines'] == 2
+    assert estimate['requests'] == 0
+    assert estimate['total_tokens'] == 0
+    assert estimate['estimated_cost_usd'] == 0
+    assert estimate['eta_seconds'] == 0
+    assert estimate['target_languages'] == []
\ No newline at end of file
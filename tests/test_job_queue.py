@@ -0,0 +1,228 @@
+import asyncio
+import pytest
+from src.services.job_queue import TranslationJob, TranslationJobQueue
+from src.translation import Deadline
+from src.utils import TranslationError
+
+@pytest.mark.asyncio
+async def test_workers_bound_concurrency_and_positions():
+    queue = TranslationJobQueue(workers=2, max_size=10)
+    release = asyncio.Event()
+    running = []
+    peak = []
+    
+    def make_job(user_id):
+        async def run():
+            running.append(user_id)
+            peak.append(len(running))
+            await release.wait()
+            running.remove(user_id)
+        return TranslationJob(user_id, run)
+    
+    positions = [await queue.submit(make_job(user_id)) for user_id in (1, 2, 3)]
+    await asyncio.sleep(0.01)
+    
+    assert positions == [1, 2, 3]
+    assert queue.position(1) == 0
+    assert queue.position(3) == 1
+    assert queue.get_stats()['running'] == 2
+    
+    release.set()
+    await asyncio.sleep(0.01)
+    assert max(peak) == 2
+    assert queue.get_stats()['completed'] == 3
+    await queue.stop()
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_and_failed_job_keeps_worker():
+    queue = TranslationJobQueue(workers=1, max_size=1)
+    release = asyncio.Event()
+    
+    async def blocked():
+        await release.wait()
+        raise RuntimeError("provider down")
+    
+    async def noop():
+        pass
+    
+    await queue.submit(TranslationJob(1, blocked))
+    await asyncio.sleep(0.01)
+    await queue.submit(TranslationJob(2, noop))
+    with pytest.raises(TranslationError):
+        await queue.submit(TranslationJob(3, noop))
+    
+    release.set()
+    await asyncio.sleep(0.01)
+    stats = queue.get_stats()
+    assert (stats['failed'], stats['completed'], stats['rejected']) == (1, 1, 1)
+    await queue.stop()
+
+@pytest.mark.asyncio
+async def test_only_successful_jobs_teach_the_eta_scale():
+    queue = TranslationJobQueue(workers=1)
+    
+    async def fails_at_once():
+        raise TranslationError("ترجمه لغو شد", "TRANSLATION_CANCELLED")
+    
+    await queue.submit(TranslationJob(1, fails_at_once, eta_seconds=600))
+    await asyncio.sleep(0.01)
+    assert queue.eta_scale == 1.0
+    
+    async def quick():
+        pass
+    
+    await queue.submit(TranslationJob(2, quick, eta_seconds=600))
+    await asyncio.sleep(0.01)
+    assert queue.eta_scale < 1.0
+    await queue.stop()
+
+@pytest.mark.asyncio
+async def test_running_cancels_are_counted_apart_from_failures():
+    queue = TranslationJobQueue(workers=1)
+    
+    async def cancelled():
+        raise TranslationError("ترجمه لغو شد", "TRANSLATION_CANCELLED")
+    
+    async def timed_out():
+        raise TranslationError("زمان مجاز پردازش به پایان رسید", "TRANSLATION_TIMEOUT")
+    
+    await queue.submit(TranslationJob(1, cancelled))
+    await queue.submit(TranslationJob(2, timed_out))
+    await asyncio.sleep(0.01)
+    
+    stats = queue.get_stats()
+    assert (stats['completed'], stats['failed'], stats['cancelled']) == (0, 1, 1)
+    assert queue.avg_run_seconds is not None
+    await queue.stop()
+
+@pytest.mark.asyncio
+async def test_cancel_removes_waiting_job():
+    queue = TranslationJobQueue(workers=1)
+    release = asyncio.Event()
+    cancelled = []
+    ran = []
+    
+    async def blocked():
+        await release.wait()
+    
+    async def run():
+        ran.append(True)
+    
+    async def on_cancel(reason):
+        cancelled.append(reason)
+    
+    await queue.submit(TranslationJob(1, blocked))
+    await queue.submit(TranslationJob(2, run, on_cancel))
+    
+    assert queue.cancel(2, 'user')
+    assert not queue.cancel(2, 'user')
+    release.set()
+    await asyncio.sleep(0.01)
+    
+    assert cancelled == ['user']
+    assert ran == []
+    assert queue.position(2) is None
+    await queue.stop()
+
+@pytest.mark.asyncio
+async def test_higher_plans_first_and_aging_prevents_starvation():
+    queue = TranslationJobQueue(workers=1, aging_seconds=60)
+    release = asyncio.Event()
+    order = []
+    
+    async def blocked():
+        await release.wait()
+    
+    def make_job(user_id, plan):
+        async def run():
+            order.append(plan)
+        return TranslationJob(user_id, run, plan_type=plan)
+    
+    await queue.submit(TranslationJob(1, blocked, plan_type='yearly'))
+    await asyncio.sleep(0.01)
+    old_free = make_job(2, 'free')
+    old_free.enqueued_at -= 150  # بیش از دو دوره انتظار
+    await queue.submit(old_free)
+    await queue.submit(make_job(3, 'free'))
+    await queue.submit(make_job(4, 'monthly'))
+    assert await queue.submit(make_job(5, 'yearly')) == 2
+    assert queue.position(3) == 4
+    assert queue.get_stats()['tiers']['free']['queued'] == 2
+    
+    release.set()
+    await asyncio.sleep(0.01)
+    
+    assert order == ['free', 'yearly', 'monthly', 'free']
+    assert queue.get_stats()['tiers']['yearly']['served'] == 2
+    await queue.stop()
+
+@pytest.mark.asyncio
+async def test_deadlines_reorder_reject_and_drop_jobs():
+    queue = TranslationJobQueue(workers=1, urgent_seconds=5)
+    release = asyncio.Event()
+    order = []
+    dropped = []
+    
+    async def blocked():
+        await release.wait()
+    
+    def make_job(user_id, plan, seconds=None, eta=None):
+        async def run():
+            order.append(user_id)
+        
+        async def on_cancel(reason):
+            dropped.append((user_id, reason))
+        return TranslationJob(user_id, run, on_cancel, plan_type=plan,
+                              deadline=Deadline(seconds) if seconds else None, eta_seconds=eta)
+    
+    with pytest.raises(TranslationError) as error:
+        await queue.submit(make_job(9, 'yearly', seconds=10, eta=30))
+    assert error.value.error_code == 'DEADLINE_INFEASIBLE'
+    
+    await queue.submit(TranslationJob(1, blocked))
+    await asyncio.sleep(0.01)
+    await queue.submit(make_job(2, 'yearly'))
+    await queue.submit(make_job(3, 'free', seconds=60, eta=57))  # سه ثانیه زمان آزاد
+    await queue.submit(make_job(4, 'monthly', seconds=60, eta=59.9))
+    assert queue.position(3) == 2
+    
+    await asyncio.sleep(0.15)  # کار ۴ دیگر به موقع تمام نمی‌شود
+    release.set()
+    await asyncio.sleep(0.01)
+    
+    assert order == [3, 2]
+    assert dropped == [(4, 'deadline')]
+    stats = queue.get_stats()
+    assert (stats['rejected'], stats['expired']) == (1, 1)
+    await queue.stop()
+
+@pytest.mark.asyncio
+async def test_parked_job_waits_outside_the_worker_pool():
+    queue = TranslationJobQueue(workers=1)
+    batch_done = asyncio.Event()
+    order = []
+    
+    async def wait_for_batch():
+        await batch_done.wait()
+    
+    def make_job(user_id):
+        async def run():
+            order.append(user_id)
+        return TranslationJob(user_id, run)
+    
+    queue.park(make_job(1), wait_for_batch)
+    await queue.submit(make_job(2))
+    await asyncio.sleep(0.01)
+    assert order == [2]
+    assert queue.get_stats()['parked'] == 1
+    
+    batch_done.set()
+    await asyncio.sleep(0.01)
+    assert order == [2, 1]
+    assert queue.parked == 0
+    
+    queue.park(make_job(3), asyncio.Event().wait)
+    assert queue.cancel(3)
+    await asyncio.sleep(0.01)
+    assert order == [2, 1]
+    await queue.stop()
\ No newline at end of file
@@ -0,0 +1,31 @@
+from src.subtitle import LineClassifier, MarkupTokenizer
+
+def test_lines_in_target_script_are_skipped():
+    classifier = LineClassifier("Persian")
+    
+    assert classifier.classify("سلام، حالت چطوره؟") == 'target_script'
+    assert classifier.classify("How are you?") is None
+    assert classifier.classify("OK, I'll go") is None
+
+def test_lines_without_translatable_content_are_skipped():
+    classifier = LineClassifier("Persian")
+    
+    assert classifier.classify("10:30") == 'no_letters'
+    assert classifier.classify("$1,000,000!") == 'no_letters'
+    assert classifier.classify("www.opensubtitles.org") == 'url'
+    assert classifier.classify("Subtitles by explosiveskull www.example.com") == 'credit'
+    assert classifier.classify("Subtitles are hard to read") is None
+
+def test_latin_target_disables_script_detection():
+    classifier = LineClassifier("French")
+    
+    assert classifier.classify("Bonjour tout le monde") is None
+    assert classifier.classify("2024") == 'no_letters'
+
+def test_tokenizer_passes_classified_lines_through():
+    tokenizer = MarkupTokenizer(LineClassifier("Persian"))
+    
+    batch = tokenizer.prepare_batch(["<i>سلام</i>", "Hello", "1984"])
+    
+    assert batch.texts == ["Hello"]
+    assert batch.restore(["درود"]) == ["<i>سلام</i>", "درود", "1984"]
@@ -0,0 +1,42 @@
+from src.subtitle import MarkupTokenizer
+
+def test_wrapping_tags_are_kept_out_of_model_input():
+    tokenizer = MarkupTokenizer()
+    
+    extracted = tokenizer.extract('{\\an8}<i>Where are you going?</i>')
+    
+    assert extracted.core == 'Where are you going?'
+    assert tokenizer.restore('کجا میری؟', extracted) == '{\\an8}<i>کجا میری؟</i>'
+
+def test_inline_tags_use_placeholders_and_survive_reordering():
+    tokenizer = MarkupTokenizer()
+    
+    extracted = tokenizer.extract('It is <font color="#ffff00">really</font> you')
+    
+    assert extracted.core == 'It is {0}really{1} you'
+    assert tokenizer.restore('{0}واقعاً{1} خودتی', extracted) == '<font color="#ffff00">واقعاً</font> خودتی'
+
+def test_dropped_placeholders_are_restored_around_text():
+    tokenizer = MarkupTokenizer()
+    
+    extracted = tokenizer.extract('Go <b>now</b>!')
+    
+    assert tokenizer.restore('همین حالا برو!', extracted) == '<b>همین حالا برو!</b>'
+
+def test_markup_only_and_sfx_lines_bypass_translation():
+    tokenizer = MarkupTokenizer()
+    
+    batch = tokenizer.prepare_batch(['♪', '<i>[door slams]</i>', '(SIGHS)', 'Hello', '<i></i>'])
+    
+    assert batch.texts == ['Hello']
+    assert batch.skipped == 4
+    assert batch.restore(['سلام']) == ['♪', '<i>[door slams]</i>', '(SIGHS)', 'سلام', '<i></i>']
+
+def test_parenthesized_dialogue_is_still_translated():
+    tokenizer = MarkupTokenizer()
+    
+    batch = tokenizer.prepare_batch(["(I told you so, didn't I?)", '(whispering) Come here', '[phone buzzing]',
+                                     '(THUNDER RUMBLING IN THE DISTANCE, DOGS BARKING)', '(♪ soft piano music ♪)'])
+    
+    assert batch.texts == ["(I told you so, didn't I?)", '(whispering) Come here']
+    assert batch.skipped == 3
\ No newline at end of file
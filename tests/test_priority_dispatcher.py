@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from src.translation import PriorityDispatcher, JobFlow, PRIORITY_INTERACTIVE, PRIORITY_PREMIUM, PRIORITY_FREE
+
+@pytest.mark.asyncio
+async def test_freed_slots_go_to_highest_lane_first():
+    dispatcher = PriorityDispatcher(1)
+    order = []
+    
+    async def request(name, priority):
+        async with dispatcher.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0)
+    
+    await dispatcher.acquire(PRIORITY_FREE)
+    tasks = [
+        asyncio.create_task(request("free", PRIORITY_FREE)),
+        asyncio.create_task(request("premium", PRIORITY_PREMIUM)),
+        asyncio.create_task(request("preview", PRIORITY_INTERACTIVE))
+    ]
+    await asyncio.sleep(0)
+    assert dispatcher.get_stats()['waiting'] == {'interactive': 1, 'premium': 1, 'free': 1}
+    
+    dispatcher.release()
+    await asyncio.gather(*tasks)
+    
+    assert order == ["preview", "premium", "free"]
+    assert dispatcher.active == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    dispatcher = PriorityDispatcher(1)
+    await dispatcher.acquire()
+    
+    waiter = asyncio.create_task(dispatcher.acquire(PRIORITY_FREE))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    
+    dispatcher.release()
+    assert dispatcher.active == 0
+    await asyncio.wait_for(dispatcher.acquire(PRIORITY_FREE), timeout=1)
+    assert dispatcher.active == 1
+
+@pytest.mark.asyncio
+async def test_small_job_is_interleaved_with_large_backlog():
+    dispatcher = PriorityDispatcher(1)
+    order = []
+    large, small = JobFlow("large"), JobFlow("small")
+    
+    async def request(name, flow):
+        async with dispatcher.slot(PRIORITY_PREMIUM, flow, cost=10):
+            order.append(name)
+            await asyncio.sleep(0)
+    
+    await dispatcher.acquire()
+    tasks = [asyncio.create_task(request("large", large)) for _ in range(6)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(request("small", small)) for _ in range(2)]
+    await asyncio.sleep(0)
+    
+    dispatcher.release()
+    await asyncio.gather(*tasks)
+    
+    assert order[:4].count("small") == 2
+    assert order[-1] == "large"
+
+@pytest.mark.asyncio
+async def test_slots_are_shared_by_weight():
+    dispatcher = PriorityDispatcher(1)
+    order = []
+    heavy, light = JobFlow("yearly", weight=3), JobFlow("free", weight=1)
+    
+    async def request(name, flow):
+        async with dispatcher.slot(PRIORITY_PREMIUM, flow, cost=10):
+            order.append(name)
+            await asyncio.sleep(0)
+    
+    await dispatcher.acquire()
+    tasks = [asyncio.create_task(request("free", light)) for _ in range(4)]
+    tasks += [asyncio.create_task(request("yearly", heavy)) for _ in range(6)]
+    await asyncio.sleep(0)
+    
+    dispatcher.release()
+    await asyncio.gather(*tasks)
+    
+    assert order[:4].count("yearly") == 3
\ No newline at end of file
@@ -0,0 +1,35 @@
+from src.translation import PromptTemplate, TranslatorMetrics
+
+def test_batch_prompt_has_no_per_line_boilerplate():
+    prompts = PromptTemplate()
+    messages = prompts.batch_messages(["Hello.", "Where is {0}it{1}?"], "Persian")
+    
+    assert messages[1]['content'] == "1|Hello.\n2|Where is {0}it{1}?"
+    assert messages[0]['content'] == prompts.batch_messages(["Other"], "Persian")[0]['content']
+    assert "{0}" in messages[0]['content']
+
+def test_reply_is_matched_by_number():
+    prompts = PromptTemplate()
+    texts = ["one", "two", "three"]
+    reply = "3|سه\n1. یک\nادامه\n7|اضافه"
+    
+    assert prompts.parse_batch(reply, texts) == ["یک ادامه", "two", "سه"]
+
+def test_overhead_per_useful_token_drops_with_larger_batches():
+    prompts = PromptTemplate()
+    texts = [f"This is subtitle line number {i}." for i in range(40)]
+    
+    single = prompts.measure_job(texts, "Persian", 1)
+    packed = prompts.measure_job(texts, "Persian", 20)
+    
+    assert single['requests'] == 40 and packed['requests'] == 2
+    assert single['useful_tokens'] == packed['useful_tokens']
+    assert packed['overhead_per_useful_token'] < single['overhead_per_useful_token']
+    assert packed['overhead_per_useful_token'] < 1
+
+def test_metrics_report_prompt_overhead():
+    metrics = TranslatorMetrics()
+    assert metrics.snapshot()['prompt_overhead_per_useful_token'] is None
+    
+    metrics.record_prompt(useful_tokens=80, overhead_tokens=40)
+    assert metrics.snapshot()['prompt_overhead_per_useful_token'] == 0.5
\ No newline at end of file
@@ -0,0 +1,41 @@
+from src.utils.release_index import ReleaseIndex
+
+SOURCE = [
+    "Where were you last night?",
+    "<i>I was at the old warehouse by the docks.</i>",
+    "You promised you would call me before midnight.",
+    "My phone died, I am sorry.",
+    "We have to tell the captain everything tomorrow.",
+    "He is not going to like any of this.",
+    "Then we tell him together, first thing in the morning.",
+    "Fine. Get some sleep."
+]
+TRANSLATED = [f"ترجمه {i}" for i in range(len(SOURCE))]
+
+def test_matching_release_aligns_shifted_copy(tmp_path):
+    index = ReleaseIndex(str(tmp_path))
+    assert index.store("job1", SOURCE, TRANSLATED, "Persian")
+    
+    # نسخه دیگر: بدون تگ، یک خط اضافه و یک خط دو تکه
+    other = (["[thunder rumbling]"] + [text.replace("<i>", "").replace("</i>", "") for text in SOURCE[:5]]
+             + ["He is not going", "to like any of this."] + SOURCE[6:])
+    aligned = index.align(other, "Persian")
+    
+    assert aligned[1] == "ترجمه 0"
+    assert aligned[2] == "ترجمه 1"
+    assert aligned[9] == "ترجمه 7"
+    assert 0 not in aligned and 6 not in aligned and 7 not in aligned
+
+def test_unrelated_file_or_language_does_not_match(tmp_path):
+    index = ReleaseIndex(str(tmp_path))
+    index.store("job1", SOURCE, TRANSLATED, "Persian")
+    
+    assert index.align(SOURCE, "Arabic") == {}
+    assert index.align([f"completely different line number {i} here" for i in range(10)], "Persian") == {}
+
+def test_index_reloads_from_disk(tmp_path):
+    ReleaseIndex(str(tmp_path)).store("job1", SOURCE, TRANSLATED, "Persian")
+    
+    reloaded = ReleaseIndex(str(tmp_path))
+    assert reloaded.get_stats()['releases'] == 1
+    assert len(reloaded.align(SOURCE, "Persian")) == len(SOURCE)
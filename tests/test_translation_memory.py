@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from src.translation import BaseTranslator, TranslationMemory
+
+class CountingTranslator(BaseTranslator):
+    """Test translator counting the lines sent to the provider"""
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.sent = []
+    
+    async def _translate_text_impl(self, text, target_language):
+        return f"fa:{text}"
+    
+    async def _translate_batch_impl(self, texts, target_language):
+        self.sent.extend(texts)
+        return [f"fa:{text}" for text in texts]
+    
+    def get_provider_name(self):
+        return "Counting"
+
+def test_only_identical_lines_reuse_stored_translation():
+    memory = TranslationMemory(threshold=0.8)
+    memory.add_batch([("We need to get out of here right now!", "باید همین الان از اینجا بریم!"),
+                      ("You can bring your friends.", "می‌تونی دوستاتو بیاری.")], "Persian")
+    
+    hits = memory.lookup_batch([
+        "We need to  get out of here right now!",
+        "We need to get out of here right now?",
+        "we need to get out of here right now!",
+        "You cannot bring your friends."
+    ], "Persian")
+    
+    assert hits == {0: "باید همین الان از اینجا بریم!"}
+    assert memory.get_stats()['exact_hits'] == 1
+    assert memory.get_stats()['fuzzy_hits'] == 0
+    assert memory.lookup_batch(["We need to get out of here right now!"], "Arabic") == {}
+
+def test_similarity_threshold_controls_fuzzy_reuse():
+    strict = TranslationMemory(threshold=0.95, fuzzy_reuse=True)
+    loose = TranslationMemory(threshold=0.6, fuzzy_reuse=True)
+    for memory in (strict, loose):
+        memory.add_batch([("I told you we should have stayed home", "بهت گفتم باید خونه می‌موندیم")], "Persian")
+    
+    line = "I told you we should have stayed at home"
+    assert strict.lookup_batch([line], "Persian") == {}
+    assert loose.lookup_batch([line], "Persian") == {0: "بهت گفتم باید خونه می‌موندیم"}
+    assert loose.get_stats()['fuzzy_hits'] == 1
+
+def test_memory_persists_and_evicts_oldest(tmp_path):
+    memory = TranslationMemory(str(tmp_path), max_entries=2)
+    memory.add_batch([("one line", "یک"), ("two lines", "دو"), ("three lines", "سه")], "Persian")
+    assert not (tmp_path / "persian.jsonl").exists()
+    memory.flush()
+    
+    reloaded = TranslationMemory(str(tmp_path), max_entries=2)
+    assert reloaded.lookup_batch(["one line", "three lines"], "Persian") == {1: "سه"}
+
+@pytest.mark.asyncio
+async def test_translator_skips_provider_for_memory_hits():
+    memory = TranslationMemory(threshold=0.8)
+    first = CountingTranslator({'batch_size': 5})
+    first.set_memory(memory)
+    await first.translate_batch(["Hello there, General Kenobi.", "Run!"], "Persian")
+    
+    second = CountingTranslator({'batch_size': 5})
+    second.set_memory(memory)
+    result = await second.translate_batch(["Hello there,  General Kenobi.", "hello there general kenobi"], "Persian")
+    
+    assert result == ["fa:Hello there, General Kenobi.", "fa:hello there general kenobi"]
+    assert second.sent == ["hello there general kenobi"]
+
+@pytest.mark.asyncio
+async def test_translator_flushes_memory_writes_off_the_event_loop(tmp_path):
+    memory = TranslationMemory(str(tmp_path), flush_lines=2)
+    translator = CountingTranslator({'batch_size': 1})
+    translator.set_memory(memory)
+    
+    await translator.translate_batch(["first", "second"], "Persian")
+    for _ in range(50):
+        if memory.get_stats()['unsaved_lines'] == 0:
+            break
+        await asyncio.sleep(0.01)
+    
+    assert memory.get_stats()['unsaved_lines'] == 0
+    assert len((tmp_path / "persian.jsonl").read_text(encoding='utf-8').splitlines()) == 2
\ No newline at end of file
@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from src.services.translation_pipeline import TranslationPipeline, PipelineTarget
+from src.subtitle import SRTParser
+from src.translation import BaseTranslator
+
+class SlowUpperTranslator(BaseTranslator):
+    """Test translator whose later batches finish before earlier ones"""
+    
+    async def _translate_text_impl(self, text, target_language):
+        return text.upper()
+    
+    async def _translate_batch_impl(self, texts, target_language):
+        await asyncio.sleep(0.01 if texts[0] == "line 1" else 0)
+        return [text.upper() for text in texts]
+    
+    def get_provider_name(self):
+        return "SlowUpper"
+
+def write_srt(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(1, count + 1):
+            f.write(f"{i}\n00:00:{i % 60:02d},000 --> 00:00:{i % 60:02d},500\nline {i}\n\n")
+
+@pytest.mark.asyncio
+async def test_pipeline_writes_cues_in_original_order(tmp_path):
+    input_path = tmp_path / "input.srt"
+    output_path = tmp_path / "output.srt"
+    write_srt(input_path, 23)
+    
+    progress = []
+    
+    async def on_progress(written):
+        progress.append(written)
+    
+    translator = SlowUpperTranslator({'batch_size': 5, 'max_concurrency': 3})
+    pipeline = TranslationPipeline(SRTParser(), translator, "Persian", batch_size=5)
+    stats = await pipeline.run(str(input_path), str(output_path), on_progress)
+    
+    written = SRTParser().parse_file(str(output_path))
+    assert stats['total_subtitles'] == 23
+    assert stats['batches'] == 5
+    assert [entry['index'] for entry in written] == list(range(1, 24))
+    assert written[0]['text'] == "LINE 1"
+    assert written[0]['start_time'] == "00:00:01,000"
+    assert progress[-1] == 23
+
+@pytest.mark.asyncio
+async def test_pipeline_resumes_from_checkpoint(tmp_path):
+    from src.utils.checkpoint_manager import CheckpointManager
+    
+    input_path = tmp_path / "input.srt"
+    output_path = tmp_path / "output.srt"
+    write_srt(input_path, 8)
+    
+    manager = CheckpointManager(str(tmp_path / "checkpoints"))
+    checkpoint = manager.open_checkpoint(1, str(input_path), "Persian")
+    checkpoint.record({position: f"saved {position}" for position in range(5)})
+    
+    translator = SlowUpperTranslator({'batch_size': 5})
+    pipeline = TranslationPipeline(SRTParser(), translator, "Persian", batch_size=5, checkpoint=checkpoint)
+    stats = await pipeline.run(str(input_path), str(output_path))
+    
+    written = SRTParser().parse_file(str(output_path))
+    assert stats['resumed_subtitles'] == 5
+    assert [entry['text'] for entry in written] == [f"saved {i}" for i in range(5)] + ["LINE 6", "LINE 7", "LINE 8"]
+    assert manager.open_checkpoint(1, str(input_path), "Persian").resumed_count == 8
+
+class TaggingTranslator(BaseTranslator):
+    """Test translator that prefixes each line with its target language"""
+    
+    async def _translate_text_impl(self, text, target_language):
+        return f"{target_language}: {text}"
+    
+    async def _translate_batch_impl(self, texts, target_language):
+        self.calls.append((target_language, len(texts)))
+        return [f"{target_language}: {text}" for text in texts]
+    
+    def get_provider_name(self):
+        return "Tagging"
+
+@pytest.mark.asyncio
+async def test_pipeline_fans_out_one_parse_to_several_languages(tmp_path):
+    input_path = tmp_path / "input.srt"
+    write_srt(input_path, 12)
+    
+    translator = TaggingTranslator({'batch_size': 5, 'max_concurrency': 2})
+    translator.calls = []
+    parser = SRTParser()
+    parsed = []
+    original_iter = parser.iter_file
+    
+    def counting_iter(*args, **kwargs):
+        parsed.append(args[0])
+        return original_iter(*args, **kwargs)
+    
+    parser.iter_file = counting_iter
+    targets = [
+        PipelineTarget("Persian", str(tmp_path / "fa.srt")),
+        PipelineTarget("English", str(tmp_path / "en.srt"))
+    ]
+    progress = []
+    
+    async def on_progress(written):
+        progress.append(written)
+    
+    pipeline = TranslationPipeline(parser, translator, "Persian", batch_size=5)
+    results = await pipeline.run_targets(str(input_path), targets, on_progress)
+    
+    assert len(parsed) == 1
+    assert sorted(translator.calls) == sorted([(lang, size) for lang in ("Persian", "English") for size in (5, 5, 2)])
+    assert results["Persian"]["total_subtitles"] == results["English"]["total_subtitles"] == 12
+    assert SRTParser().parse_file(str(tmp_path / "fa.srt"))[0]['text'] == "Persian: line 1"
+    assert SRTParser().parse_file(str(tmp_path / "en.srt"))[11]['text'] == "English: line 12"
+    assert progress[-1] == 12
+
+def test_entry_count_ignores_arrows_in_cue_text_and_sniffs_encoding(tmp_path):
+    path = tmp_path / "arrows.srt"
+    path.write_text(
+        "1\n00:00:01,000 --> 00:00:02,000\nGo left --> then right\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nسلام دنیا\n\n",
+        encoding='utf-8'
+    )
+    parser = SRTParser()
+    # نمونه کوتاه وسط یک کاراکتر دوبایتی فارسی بریده می‌شود
+    parser.ENCODING_SNIFF_BYTES = len("1\n00:00:01,000 --> 00:00:02,000\nGo left --> then right\n\n2\n00:00:03,000 --> 00:00:04,000\nس".encode('utf-8')) - 1
+    
+    assert parser.count_entries(str(path)) == 2
+    assert parser.original_encoding == 'utf-8'
+    assert [entry['text'] for batch in parser.iter_file(str(path)) for entry in batch][1] == "سلام دنیا"
\ No newline at end of file
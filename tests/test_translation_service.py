@@ -2,8 +2,26 @@ import pytest
 import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 from src.services.translation_service import TranslationService
+from src.translation import BaseTranslator
 from src.utils import TranslationError, FileProcessingError
 
+class IdleTranslator(BaseTranslator):
+    """Translator that records when its connections are released"""
+    
+    closed = False
+    
+    async def _translate_text_impl(self, text, target_language):
+        return text
+    
+    async def _translate_batch_impl(self, texts, target_language):
+        return list(texts)
+    
+    async def close(self):
+        self.closed = True
+    
+    def get_provider_name(self):
+        return "Idle"
+
 @pytest.fixture
 def mock_dependencies():
     with patch('src.services.translation_service.SRTParser') as mock_parser, \
@@ -14,6 +32,9 @@ def mock_dependencies():
          patch('src.services.translation_service.get_error_handler') as mock_error_handler, \
          patch('src.services.translation_service.InputValidator') as mock_validator:
         
+        # تنظیمات پویا مقدار پیش‌فرض هر کلید را برمی‌گردانند
+        mock_dynamic.return_value.get.side_effect = lambda key, default=None: default
+        
         mock_translator = AsyncMock()
         mock_translator.translate_batch = AsyncMock(return_value=["translated text"])
         mock_factory.create_translator.return_value = mock_translator
@@ -71,6 +92,7 @@ async def test_get_user_preview_success(mock_dependencies):
 async def test_cleanup_user_data(mock_dependencies):
     service = TranslationService()
     mock_dependencies['file_manager'].return_value.cleanup_user_files = AsyncMock(return_value=True)
+    mock_dependencies['file_manager'].return_value.cancel_user_job = AsyncMock(return_value=False)
     
     result = await service.cleanup_user_data(123)
     assert result is True
@@ -81,6 +103,21 @@ async def test_change_translator_success(mock_dependencies):
     service.change_translator("new_provider", {})
     mock_dependencies['factory'].create_translator.assert_called_once_with("new_provider", {})
 
+@pytest.mark.asyncio
+async def test_replaced_translator_is_closed_after_its_jobs_finish(mock_dependencies):
+    service = TranslationService()
+    previous = IdleTranslator({})
+    service.translator = previous
+    
+    async with previous.in_use():
+        service.change_translator("new_provider", {})
+        await asyncio.sleep(0)
+        assert not previous.closed
+        assert len(service._retiring) == 1
+    
+    await asyncio.gather(*service._retiring)
+    assert previous.closed
+
 # Run tests
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
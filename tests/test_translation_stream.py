@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from src.translation import BaseTranslator, OpenAITranslator, JobFlow
+
+class EchoTranslator(BaseTranslator):
+    """Test translator that upper-cases text and records each batch"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.batches = []
+
+    async def _translate_text_impl(self, text, target_language):
+        return text.upper()
+
+    async def _translate_batch_impl(self, texts, target_language):
+        self.batches.append(list(texts))
+        return [text.upper() for text in texts]
+
+    def get_provider_name(self):
+        return "Echo"
+
+@pytest.mark.asyncio
+async def test_translate_stream_yields_every_index():
+    translator = EchoTranslator({'batch_size': 2})
+    texts = ["a", "b", "c", "d", "e"]
+
+    results = {}
+    async for index, translation in translator.translate_stream(texts):
+        results[index] = translation
+
+    assert results == {0: "A", 1: "B", 2: "C", 3: "D", 4: "E"}
+    assert [len(batch) for batch in translator.batches] == [2, 2, 1]
+
+@pytest.mark.asyncio
+async def test_translate_batch_deduplicates_and_caches():
+    translator = EchoTranslator({'batch_size': 10})
+
+    first = await translator.translate_batch(["hi", "bye", "hi"])
+    second = await translator.translate_batch(["bye", "hi"])
+
+    assert first == ["HI", "BYE", "HI"]
+    assert second == ["BYE", "HI"]
+    assert translator.batches == [["hi", "bye"]]
+
+class FakeCompletions:
+    """Stand-in for client.chat.completions reporting 10 prompt and 5 completion tokens per call"""
+
+    async def create(self, messages=None, **kwargs):
+        await asyncio.sleep(0)
+        return SimpleNamespace(
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+            choices=[SimpleNamespace(message=SimpleNamespace(content="1. ok"))]
+        )
+
+@pytest.mark.asyncio
+async def test_concurrent_jobs_count_only_their_own_requests_and_tokens():
+    translator = OpenAITranslator({'api_key': 'test-key', 'batch_size': 1, 'max_concurrency': 2})
+    real_client = translator.client
+    translator.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    small, large = JobFlow("small"), JobFlow("large")
+
+    await asyncio.gather(
+        translator.translate_batch(["a", "b"], flow=small),
+        translator.translate_batch(["c", "d", "e", "f"], flow=large)
+    )
+
+    assert (small.requests, small.total_tokens) == (2, 30)
+    assert (large.requests, large.total_tokens) == (4, 60)
+    assert translator.metrics.totals['requests'] == 6
+    translator.client = real_client
+    await translator.close()
\ No newline at end of file
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from src.translation import OpenAITranslator, TranslationMemory
+
+class FakeModels:
+    """Stand-in for client.models that counts list calls"""
+    
+    def __init__(self, fail_every=0, hang=False):
+        self.calls = 0
+        self.fail_every = fail_every
+        self.hang = hang
+    
+    async def list(self, timeout=None):
+        self.calls += 1
+        if self.hang:
+            await asyncio.sleep(60)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise ConnectionError("unreachable")
+        return []
+
+class FakeClient:
+    def __init__(self, models):
+        self.models = models
+        self.options = {}
+    
+    def with_options(self, **options):
+        self.options = options
+        return self
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_one_connection_per_concurrent_request():
+    translator = OpenAITranslator({'api_key': 'test-key', 'max_concurrency': 3})
+    real_client = translator.client
+    translator.client = FakeClient(FakeModels(fail_every=3))
+    
+    report = await translator.warm_up()
+    
+    assert translator.client.models.calls == 3
+    assert translator.client.options == {'max_retries': 0}
+    assert report['connections'] == 2
+    translator.client = real_client
+    await translator.close()
+
+@pytest.mark.asyncio
+async def test_warm_up_gives_up_on_unresponsive_provider():
+    translator = OpenAITranslator({'api_key': 'test-key', 'max_concurrency': 2, 'warm_up_timeout_seconds': 0.05})
+    real_client = translator.client
+    translator.client = FakeClient(FakeModels(hang=True))
+    
+    report = await asyncio.wait_for(translator.warm_up(), 5)
+    
+    assert report['connections'] == 0
+    translator.client = real_client
+    await translator.close()
+
+def test_hot_entries_are_most_recent_first(tmp_path):
+    memory = TranslationMemory(str(tmp_path))
+    memory.add_batch([("first line", "یک"), ("second line", "دو"), ("third line", "سه")], "Persian")
+    memory.lookup_batch(["first line"], "Persian")
+    
+    assert memory.hot_entries("Persian", 2) == [("first line", "یک"), ("third line", "سه")]
+    assert memory.hot_entries("English", 2) == []
+
+@pytest.mark.asyncio
+async def test_primed_lines_are_served_from_cache(tmp_path):
+    memory = TranslationMemory(str(tmp_path))
+    memory.add_batch([("first line", "یک"), ("second line", "دو")], "Persian")
+    translator = OpenAITranslator({'api_key': 'test-key'})
+    real_client = translator.client
+    translator.client = None  # هر درخواست به سرویس‌دهنده خطا می‌دهد
+    
+    assert translator.prime_cache(memory.hot_entries("Persian", 10), "Persian") == 2
+    assert await translator.translate_batch(["first line", "second line"], "Persian") == ["یک", "دو"]
+    translator.client = real_client
+    await translator.close()
\ No newline at end of file